@@ -6,11 +6,23 @@ Uses pre-trained XGBoost model to predict customer churn
 import streamlit as st
 import pandas as pd
 import numpy as np
-import joblib
 import io
+import os
 from pathlib import Path
 from typing import Dict, Tuple, List
 
+import churn.model
+from churn.assets import load_charts
+from churn.encoder import CompiledEncoder
+from churn.preprocessing import Preprocessor
+from churn.features import get_feature_config, validate_inputs
+from churn.batch import download_formats, read_customer_file, score_frame, scored_download
+from churn.writers import write_frame
+from churn.cache import PredictionCache
+from churn.explain import explain_records, with_churn_drivers
+from churn.metrics import METRICS, Metrics, cache_collector
+from churn.registry import REGISTRY_ENV, ModelRegistry, ModelVersion
+
 # ==================== Configuration ====================
 st.set_page_config(
     page_title="Telco Churn Predictor",
@@ -322,177 +334,122 @@ st.markdown("""
 
 # ==================== Model Loading ====================
 @st.cache_resource
-def load_model_and_preprocessing():
-    """Load pre-trained model and preprocessing objects"""
+def load_model_registry():
+    """Registry directory watched in the background, or None to serve the repo root artifacts"""
+    if not os.environ.get(REGISTRY_ENV):
+        return None
+    # Loaded once per process, so timed into the process registry
+    with METRICS.timer("load_model"):
+        return ModelRegistry(os.environ[REGISTRY_ENV]).start()
+
+@st.cache_resource
+def load_model_version() -> ModelVersion:
+    """Load pre-trained model and preprocessing objects from the repo root"""
     try:
         base_path = Path(__file__).parent
         
-        model = joblib.load(base_path / "XGBoost_Model.pkl")
-        scaler = joblib.load(base_path / "StandardScaler.pkl")
-        label_encoders = joblib.load(base_path / "LabelEncoders.pkl")
-        
-        return model, scaler, label_encoders
+        # Loaded once per process, so timed into the process registry
+        with METRICS.timer("load_model"):
+            return ModelVersion.load(base_path)
     except FileNotFoundError as e:
         st.error(f"Error loading model files: {e}")
         st.stop()
 
-# ==================== Feature Definition ====================
-def get_feature_config() -> Dict:
-    """Define all input features with their types and options"""
-    # Common US cities (representative sample)
-    cities = [
-        "Acampo", "Acton", "Adelanto", "Adin", "Agoura_Hills", "Alameda", "Alamo",
-        "Alderpoint", "Aliso_Viejo", "Altadena", "Amador_City", "Amboy", "Amherst",
-        "Amity", "Amposta", "Andover", "Angel_Fire", "Angleton", "Angwin", "Annapolis",
-        "Annville", "Anselmo", "Anthony", "Antioch", "Antler", "Anton", "Antonia",
-        "Antwine", "Antwerp", "Anvil", "Apalachia", "Apex", "Apline", "Aplington",
-        "Apodaca", "Apollinaire", "Apolo", "Apoloosa", "Apoyo", "Apoyecan", "Appalachian"
-    ]
-    
-    return {
-        "City": {"type": "categorical", "options": cities},
-        "Gender": {"type": "categorical", "options": ["Male", "Female"]},
-        "Senior_Citizen": {"type": "categorical", "options": ["No", "Yes"]},
-        "Partner": {"type": "categorical", "options": ["Yes", "No"]},
-        "Dependents": {"type": "categorical", "options": ["Yes", "No"]},
-        "Tenure": {"type": "numeric", "min": 0, "max": 72, "step": 1, "value": 0},
-        "Phone_Service": {"type": "categorical", "options": ["Yes", "No"]},
-        "Multiple_Lines": {"type": "categorical", "options": ["Yes", "No", "No_phone_service"]},
-        "Internet_Service": {"type": "categorical", "options": ["DSL", "Fiber_optic", "No"]},
-        "Online_Security": {"type": "categorical", "options": ["Yes", "No", "No_internet_service"]},
-        "Online_Backup": {"type": "categorical", "options": ["Yes", "No", "No_internet_service"]},
-        "Device_Protection": {"type": "categorical", "options": ["Yes", "No", "No_internet_service"]},
-        "Tech_Support": {"type": "categorical", "options": ["Yes", "No", "No_internet_service"]},
-        "Streaming_TV": {"type": "categorical", "options": ["Yes", "No", "No_internet_service"]},
-        "Streaming_Movies": {"type": "categorical", "options": ["Yes", "No", "No_internet_service"]},
-        "Contract": {"type": "categorical", "options": ["Month-to-month", "One_year", "Two_year"]},
-        "Paperless_Billing": {"type": "categorical", "options": ["Yes", "No"]},
-        "Payment_Method": {"type": "categorical", "options": ["Electronic_check", "Mailed_check", "Bank_transfer_(automatic)", "Credit_card_(automatic)"]},
-        "Monthly_Charges": {"type": "numeric", "min": 0.0, "max": 150.0, "step": 0.01, "value": 0.0},
-        "Total_Charges": {"type": "numeric", "min": 0.0, "max": 10000.0, "step": 0.01, "value": 0.0},
-    }
+def current_model_version() -> ModelVersion:
+    """Model version for this run; a version the registry swaps in is used from the next rerun"""
+    registry = load_model_registry()
+    return registry.current if registry is not None else load_model_version()
+
+@st.cache_resource
+def load_prediction_cache():
+    """Cache of churn probabilities for profiles scored by this process"""
+    active = current_model_version()
+    cache = PredictionCache(version=active.version, column_lookup=active.encoder.column_lookup)
+    METRICS.add_collector(cache_collector(cache))
+    return cache
+
+@st.cache_resource
+def load_chart_assets() -> Dict[str, bytes]:
+    """Sidebar charts, read and downsized once per process instead of on every rerun"""
+    return load_charts(Path(__file__).parent)
 
 # ==================== Data Processing ====================
-def encode_and_scale_input(user_input: Dict, scaler, label_encoders) -> np.ndarray:
+def encode_and_scale_input(user_input: Dict, scaler, label_encoders, encoder: CompiledEncoder = None) -> np.ndarray:
     """
-    Encode categorical features and scale numerical features
-    Mirrors the exact preprocessing used during model training
+    Encode the form into the features the model was trained on
+    Uses the preprocessing published with the model (churn.preprocessing.Preprocessor)
     
     Args:
         user_input: Dictionary with user inputs
         scaler: StandardScaler fitted on training data
         label_encoders: Dictionary of LabelEncoders for categorical features
+        encoder: Compiled encoder of the model's preprocessing, built at load time
         
     Returns:
-        Scaled feature array ready for prediction
+        Feature array ready for prediction
     """
     try:
-        # Create a copy to avoid modifying original
-        processed_data = user_input.copy()
-        
-        # First, create DataFrame with raw data
-        df_input = pd.DataFrame([processed_data])
-        
-        # One-hot encode the categorical columns (same as training)
-        # The columns that were one-hot encoded during training
-        categorical_cols = ['City', 'Gender', 'Senior_Citizen', 'Partner', 'Dependents', 
-                           'Multiple_Lines', 'Internet_Service', 'Online_Security', 
-                           'Online_Backup', 'Device_Protection', 'Tech_Support', 
-                           'Streaming_TV', 'Streaming_Movies', 'Contract', 
-                           'Paperless_Billing', 'Payment_Method']
-        
-        # One-hot encode (this will create new columns for each category)
-        df_encoded = pd.get_dummies(df_input, columns=categorical_cols, dtype=float)
-        
-        # Phone_Service was manually mapped during training
-        # Handle it specially if it exists in the input
-        if 'Phone_Service' in df_input.columns:
-            df_encoded['Phone_Service'] = df_encoded['Phone_Service'].map({'Yes': 1.0, 'No': 0.0})
+        # Compiling is cheap but not free, so callers should pass the cached encoder
+        if encoder is None:
+            encoder = Preprocessor.from_scaler(scaler).encoder
         
-        # Get all the feature names that the model was trained on
-        # We need to ensure we have the exact same columns in the exact same order
-        # The scaler was fit on these features
-        
-        # Get the feature names from the scaler
-        if hasattr(scaler, 'feature_names_in_'):
-            expected_features = scaler.feature_names_in_
-        else:
-            # Fallback: get from label_encoders keys
-            expected_features = None
-        
-        if expected_features is not None:
-            # Ensure all expected columns exist, filling missing ones with 0
-            for col in expected_features:
-                if col not in df_encoded.columns:
-                    df_encoded[col] = 0.0
-            
-            # Select only the features that the model was trained on, in the correct order
-            df_encoded = df_encoded[expected_features]
-        else:
-            # If we can't get feature names, just use what we have
-            pass
-        
-        # Scale the features
-        scaled_data = scaler.transform(df_encoded)
-        
-        return scaled_data[0]
+        # Dict lookups into a preallocated row, scaled only if the model was fit scaled
+        with session_metrics().timer("encode_and_scale_input"):
+            return encoder.transform_record(user_input)
     except Exception as e:
         st.error(f"Error processing input data: {str(e)}")
         import traceback
         st.error(traceback.format_exc())
         return None
 
-def validate_inputs(user_input: Dict) -> Tuple[bool, str]:
-    """Validate user inputs"""
-    try:
-        # Check if all required fields are provided
-        required_fields = list(get_feature_config().keys())
-        for field in required_fields:
-            if field not in user_input or user_input[field] is None:
-                return False, f"Missing required field: {field}"
-        
-        # Validate numeric ranges
-        if user_input["Tenure"] < 0 or user_input["Tenure"] > 72:
-            return False, "Tenure must be between 0 and 72 months"
-        
-        if user_input["Monthly_Charges"] < 0:
-            return False, "Monthly Charges cannot be negative"
-        
-        if user_input["Total_Charges"] < 0:
-            return False, "Total Charges cannot be negative"
-        
-        return True, "Input validation passed"
-    except Exception as e:
-        return False, f"Validation error: {e}"
-
 # ==================== Prediction ====================
-def make_prediction(model, scaled_features: np.ndarray) -> Tuple[str, float]:
+def make_prediction(model, scaled_features: np.ndarray,
+                    threshold: float = churn.model.DEFAULT_THRESHOLD) -> Tuple[str, float]:
     """
     Make churn prediction using the model
     
     Args:
         model: Trained XGBoost model
         scaled_features: Processed and scaled feature array
+        threshold: Churn probability above which the customer is labelled "Churn"
         
     Returns:
         Tuple of (prediction_label, probability)
     """
     try:
-        # Get prediction and probability
-        prediction = model.predict([scaled_features])[0]
-        probability = model.predict_proba([scaled_features])[0]
-        
-        # Determine churn probability (class 1)
-        churn_probability = probability[1]
-        
-        # Convert prediction to label
-        prediction_label = "Churn" if prediction == 1 else "No Churn"
-        
-        return prediction_label, churn_probability
+        with session_metrics().timer("make_prediction"):
+            return churn.model.make_prediction(model, scaled_features, threshold)
     except Exception as e:
         st.error(f"Error making prediction: {e}")
         return None, None
 
+def predict_customer(user_input: Dict, model, scaler, label_encoders, encoder: CompiledEncoder,
+                     cache: PredictionCache = None,
+                     threshold: float = churn.model.DEFAULT_THRESHOLD,
+                     version: str = None) -> Tuple[str, float]:
+    """
+    Predict one customer, reusing the cached probability of an identical profile
+    
+    Args:
+        version: Model version scoring the profile (defaults to the cache's)
+    
+    Returns:
+        Tuple of (prediction_label, probability), or (None, None) on failure
+    """
+    key = cache.key(user_input, version) if cache is not None else None
+    probability = cache.get(key) if cache is not None else None
+    if probability is not None:
+        return churn.model.label_from_probability(probability, threshold), probability
+    
+    scaled_features = encode_and_scale_input(user_input, scaler, label_encoders, encoder)
+    if scaled_features is None:
+        return None, None
+    
+    prediction, probability = make_prediction(model, scaled_features, threshold)
+    if prediction is not None and cache is not None:
+        cache.put(key, probability)
+    return prediction, probability
+
 def create_prediction_csv(user_input: Dict, prediction: str, probability: float) -> bytes:
     """Create a CSV file with prediction result"""
     result_df = pd.DataFrame([{
@@ -501,7 +458,169 @@ def create_prediction_csv(user_input: Dict, prediction: str, probability: float)
         "Probability": f"{probability*100:.2f}%"
     }])
     
-    return result_df.to_csv(index=False).encode()
+    return write_frame(result_df, "csv")
+
+def render_explanation(user_input: Dict, active: ModelVersion, top: int = 5):
+    """The fields that moved this customer's score most, with their direction"""
+    explainer = active.explainer
+    if explainer is None:
+        return
+    
+    with session_metrics().timer("explain"):
+        explanation = explain_records(explainer, [user_input], top=top)[0]
+    
+    st.markdown("""
+        <div style='margin-top: 1.5rem; margin-bottom: 1rem;'>
+            <p style='color: var(--neutral-700); font-weight: 600; font-size: 0.9rem; margin-bottom: 0.25rem;'>
+                Top Churn Drivers
+            </p>
+        </div>
+    """, unsafe_allow_html=True)
+    st.dataframe(pd.DataFrame([
+        {
+            "Field": item["field"].replace("_", " "),
+            "Effect": "⬆️ Raises risk" if item["contribution"] > 0 else "⬇️ Lowers risk",
+            "Impact (log-odds)": round(item["contribution"], 3),
+        }
+        for item in explanation["contributions"]
+    ]), use_container_width=True, hide_index=True)
+    # expected_value is the model's baseline margin as a probability, not the mean churn probability
+    st.caption(f"Relative to the model's baseline score of {explanation['expected_value']*100:.1f}%; "
+               "each impact moves it in log-odds")
+
+# ==================== Batch Scoring ====================
+@st.cache_data(max_entries=2, show_spinner=False)
+def score_upload(data: bytes, name: str, version: str, threshold: float, add_drivers: bool,
+                 _active: ModelVersion) -> Tuple[pd.DataFrame, pd.DataFrame, List[str]]:
+    """
+    Scored and quarantined rows of one upload, and the open columns it lacks
+    
+    Cached on the file bytes and model version, so reruns that only change the
+    page (e.g. the download format) don't read, validate and score the file again
+    """
+    customers = read_customer_file(io.BytesIO(data), name)
+    quarantined, absent = None, []
+    if _active.validator is not None:
+        with session_metrics().timer("validate_inputs"):
+            report = _active.validator.validate(customers)
+            customers, quarantined = report.split(customers)
+            absent = report.absent
+    if customers.empty:
+        return None, quarantined, absent
+    # Scored in-process: forking a pool from the multithreaded Streamlit server
+    # is unsafe, and files too big for one core belong in churn.stream --workers
+    # CSR scoring needs an XGBoost booster; bundle forests score dense rows
+    scored = score_frame(customers, _active.model, _active.scaler, _active.encoder,
+                         sparse=hasattr(_active.model, "get_booster"), threshold=threshold, workers=1)
+    if add_drivers:
+        with session_metrics().timer("explain"):
+            scored = with_churn_drivers(scored, _active.explainer)
+    return scored, quarantined, absent
+
+def render_batch_scoring(active: ModelVersion, threshold: float = churn.model.DEFAULT_THRESHOLD):
+    """
+    Upload a customer file, score every row in one vectorized pass and offer the result for download
+    
+    Rows failing the validator are set aside with their errors instead of failing the upload
+    """
+    st.markdown("""
+        <p style='color: var(--primary); font-size: 0.8rem; font-weight: 800; letter-spacing: 0.08em; text-transform: uppercase; margin-bottom: 1.5rem; margin-top: 2rem; display: flex; align-items: center;'>
+            <span style='display: inline-block; width: 3px; height: 16px; background: var(--primary); margin-right: 0.75rem; border-radius: 2px;'></span>
+            Batch Scoring
+        </p>
+    """, unsafe_allow_html=True)
+    
+    uploaded_file = st.file_uploader(
+        "Upload customers (CSV or Excel)",
+        type=["csv", "xlsx", "xls"],
+        key="batch_upload"
+    )
+    
+    # Exact TreeSHAP costs more than scoring itself, so it is opt-in; the
+    # result is cached with the scores (score_upload)
+    add_drivers = active.explainer is not None and st.checkbox(
+        "Add each customer's top churn drivers", value=False, key="batch_explain"
+    )
+    
+    if uploaded_file is None:
+        return
+    
+    try:
+        with st.spinner("🔄 Scoring uploaded customers..."):
+            scored, quarantined, absent = score_upload(uploaded_file.getvalue(), uploaded_file.name, active.version,
+                                               threshold, add_drivers, active)
+    except Exception as e:
+        st.error(f"Error scoring file: {e}")
+        return
+    if scored is None:
+        st.error(f"No valid customer rows: all {len(quarantined):,} failed validation")
+        st.dataframe(quarantined.head(100), use_container_width=True)
+        return
+    if absent:
+        st.warning(f"⚠️ The file has no {', '.join(absent)} column; customers were scored as if it were unknown")
+    
+    # Summary metrics
+    metric_col1, metric_col2, metric_col3 = st.columns(3)
+    with metric_col1:
+        st.metric("Customers Scored", f"{len(scored):,}")
+    with metric_col2:
+        st.metric("Predicted Churn", f"{int((scored['Prediction'] == 'Churn').sum()):,}")
+    with metric_col3:
+        st.metric("Avg. Churn Probability", f"{scored['Probability'].mean()*100:.1f}%")
+    
+    # Preview only the first rows, the download has everything
+    st.dataframe(scored.head(100), use_container_width=True)
+    
+    # Encoded a chunk at a time; compressed formats keep the download small
+    download_format = st.selectbox("Download format", download_formats(), key="batch_format")
+    st.download_button(
+        label="📥 Download Scored File",
+        **scored_download(scored, "churn_predictions", download_format),
+        use_container_width=True
+    )
+    
+    if quarantined is not None and not quarantined.empty:
+        st.warning(f"⚠️ {len(quarantined):,} rows failed validation and were not scored")
+        st.dataframe(quarantined.head(100), use_container_width=True)
+        st.download_button(
+            label="📥 Download Quarantined Rows",
+            **scored_download(quarantined, "churn_quarantine"),
+            use_container_width=True
+        )
+
+# ==================== Debug Panel ====================
+def session_metrics() -> Metrics:
+    """
+    Registry this session's timings go to
+
+    A session opened with ?debug=1 gets its own enabled registry in
+    st.session_state, so other sessions keep paying nothing; everyone else
+    records into the process-wide METRICS (on only with CHURN_METRICS=1).
+    """
+    if st.query_params.get("debug", "") in ("", "0"):
+        return METRICS
+    if "metrics" not in st.session_state:
+        metrics = Metrics(enabled=True)
+        metrics.add_collector(cache_collector(load_prediction_cache()))
+        st.session_state.metrics = metrics
+    return st.session_state.metrics
+
+def debug_enabled() -> bool:
+    """Show the latency panel when the app is opened with ?debug=1 or CHURN_METRICS=1"""
+    return session_metrics().enabled
+
+def render_debug_panel():
+    """Per-stage latencies and the raw Prometheus text: this session's with ?debug=1, else the process's"""
+    metrics = session_metrics()
+    with st.sidebar.expander("⏱️ Latency (debug)", expanded=False):
+        summary = metrics.summary()
+        if summary:
+            st.dataframe(pd.DataFrame(summary).round(3), use_container_width=True, hide_index=True)
+        else:
+            st.caption("No predictions timed yet")
+        st.code(metrics.render(), language="text")
+        if st.button("Reset metrics", key="reset_metrics"):
+            metrics.reset()
 
 # ==================== Main App ====================
 def main():
@@ -524,8 +643,25 @@ def main():
         </style>
     """, unsafe_allow_html=True)
     
-    # Load model and preprocessing objects
-    model, scaler, label_encoders = load_model_and_preprocessing()
+    # ?debug=1 collects into this session's own registry only
+    show_debug = debug_enabled()
+    
+    # Load model and preprocessing objects; the whole run sticks to this version
+    active = current_model_version()
+    model, scaler, label_encoders = active.model, active.scaler, active.label_encoders
+    encoder = active.encoder
+    prediction_cache = load_prediction_cache()
+    prediction_cache.set_version(active.version)
+    
+    # Decision threshold for business tuning (0.5 matches model.predict)
+    threshold = st.sidebar.slider(
+        "Decision Threshold",
+        min_value=0.05,
+        max_value=0.95,
+        value=churn.model.DEFAULT_THRESHOLD,
+        step=0.01,
+        help="Customers with a churn probability above this value are labelled Churn"
+    )
     
     # Main layout - form centered with sidebar on right
     col_spacer, col_main, col_sidebar = st.columns([0.3, 2.2, 1], gap="large")
@@ -665,77 +801,87 @@ def main():
         
         # Handle prediction
         if submit_button:
+            session_metrics().inc("churn_requests_total", source="app")
+            
             # Validate inputs
-            is_valid, validation_msg = validate_inputs(user_input)
+            with session_metrics().timer("validate_inputs"):
+                is_valid, validation_msg = validate_inputs(user_input, active.validator)
             
             if not is_valid:
+                session_metrics().inc("churn_errors_total", stage="validate_inputs")
                 st.error(f"❌ Validation Error: {validation_msg}")
             else:
                 # Process and predict
                 with st.spinner("🔄 Analyzing customer data..."):
-                    scaled_features = encode_and_scale_input(user_input, scaler, label_encoders)
+                    prediction, probability = predict_customer(
+                        user_input, model, scaler, label_encoders, encoder,
+                        prediction_cache, threshold, active.version
+                    )
                     
-                    if scaled_features is not None:
-                        prediction, probability = make_prediction(model, scaled_features)
+                    if prediction is not None:
+                        # Display results with modern design
+                        st.markdown("<hr>", unsafe_allow_html=True)
+                        
+                        st.markdown("""
+                            <h2 style='text-align: center; margin-top: 1rem; color: var(--primary); margin-bottom: 0.5rem;'>Prediction Results</h2>
+                        """, unsafe_allow_html=True)
+                        
+                        # Results in columns with gap
+                        result_col1, result_col2 = st.columns([1.2, 1], gap="medium")
                         
-                        if prediction is not None:
-                            # Display results with modern design
-                            st.markdown("<hr>", unsafe_allow_html=True)
-                            
-                            st.markdown("""
-                                <h2 style='text-align: center; margin-top: 1rem; color: var(--primary); margin-bottom: 0.5rem;'>Prediction Results</h2>
-                            """, unsafe_allow_html=True)
-                            
-                            # Results in columns with gap
-                            result_col1, result_col2 = st.columns([1.2, 1], gap="medium")
-                            
-                            with result_col1:
-                                # Prediction result - Modern card
-                                if prediction == "Churn":
-                                    st.markdown("""
-                                    <div class='danger-box'>
-                                    <h3 style='text-align: center; margin-top: 0; margin-bottom: 0.5rem;'>⚠️ High Churn Risk</h3>
-                                    <p style='text-align: center; color: var(--danger); font-size: 0.9rem; margin-bottom: 0;'>
-                                        This customer is likely to churn
-                                    </p>
-                                    </div>
-                                    """, unsafe_allow_html=True)
-                                else:
-                                    st.markdown("""
-                                    <div class='success-box'>
-                                    <h3 style='text-align: center; margin-top: 0; margin-bottom: 0.5rem;'>✅ Low Risk</h3>
-                                    <p style='text-align: center; color: var(--success); font-size: 0.9rem; margin-bottom: 0;'>
-                                        This customer is likely to stay
-                                    </p>
-                                    </div>
-                                    """, unsafe_allow_html=True)
-                            
-                            with result_col2:
-                                # Probability metric - Modern styling
-                                st.metric(
-                                    "Churn Probability",
-                                    f"{probability*100:.1f}%"
-                                )
-                            
-                            # Confidence bar with label
-                            st.markdown("""
-                                <div style='margin-top: 1.5rem; margin-bottom: 1rem;'>
-                                    <p style='color: var(--neutral-700); font-weight: 600; font-size: 0.9rem; margin-bottom: 0.75rem;'>
-                                        Confidence Level
-                                    </p>
+                        with result_col1:
+                            # Prediction result - Modern card
+                            if prediction == "Churn":
+                                st.markdown("""
+                                <div class='danger-box'>
+                                <h3 style='text-align: center; margin-top: 0; margin-bottom: 0.5rem;'>⚠️ High Churn Risk</h3>
+                                <p style='text-align: center; color: var(--danger); font-size: 0.9rem; margin-bottom: 0;'>
+                                    This customer is likely to churn
+                                </p>
                                 </div>
-                            """, unsafe_allow_html=True)
-                            st.progress(float(probability))
-                            
-                            # Download CSV button - Modern styling
-                            csv_data = create_prediction_csv(user_input, prediction, probability)
-                            st.download_button(
-                                label="📥 Download Prediction",
-                                data=csv_data,
-                                file_name="churn_prediction.csv",
-                                mime="text/csv",
-                                use_container_width=True
+                                """, unsafe_allow_html=True)
+                            else:
+                                st.markdown("""
+                                <div class='success-box'>
+                                <h3 style='text-align: center; margin-top: 0; margin-bottom: 0.5rem;'>✅ Low Risk</h3>
+                                <p style='text-align: center; color: var(--success); font-size: 0.9rem; margin-bottom: 0;'>
+                                    This customer is likely to stay
+                                </p>
+                                </div>
+                                """, unsafe_allow_html=True)
+                        
+                        with result_col2:
+                            # Probability metric - Modern styling
+                            st.metric(
+                                "Churn Probability",
+                                f"{probability*100:.1f}%"
                             )
+                            st.caption(f"Model version {active.version}")
+                        
+                        # Confidence bar with label
+                        st.markdown("""
+                            <div style='margin-top: 1.5rem; margin-bottom: 1rem;'>
+                                <p style='color: var(--neutral-700); font-weight: 600; font-size: 0.9rem; margin-bottom: 0.75rem;'>
+                                    Confidence Level
+                                </p>
+                            </div>
+                        """, unsafe_allow_html=True)
+                        st.progress(float(probability))
+                        
+                        render_explanation(user_input, active)
+                        
+                        # Download CSV button - Modern styling
+                        csv_data = create_prediction_csv(user_input, prediction, probability)
+                        st.download_button(
+                            label="📥 Download Prediction",
+                            data=csv_data,
+                            file_name="churn_prediction.csv",
+                            mime="text/csv",
+                            use_container_width=True
+                        )
+    
+        # Batch scoring lives outside the form (file uploaders can't be in forms)
+        render_batch_scoring(active, threshold)
     
     with col_sidebar:
         st.markdown("""
@@ -745,61 +891,43 @@ def main():
             </div>
         """, unsafe_allow_html=True)
         
-        # Load and display images with better styling
-        base_path = Path(__file__).parent
+        # Cached PNG bytes: no disk access on reruns
+        chart_titles = {
+            "feature_importance": "Feature Importance",
+            # The AUC is in the chart's legend, which churn.assets redraws with the model
+            "roc_curve": "ROC Curve",
+            "confusion_matrix": "Confusion Matrix",
+        }
         
         try:
-            # Feature Importance
-            if (base_path / "feature_importance.png").exists():
-                st.markdown("""
-                    <div style='background: white; padding: 1rem; border-radius: 12px; margin-bottom: 1.5rem; box-shadow: 0 2px 8px rgba(0,0,0,0.05); border: 1px solid var(--neutral-100);'>
-                        <p style='margin: 0 0 0.75rem 0; color: var(--neutral-700); font-weight: 600; font-size: 0.9rem;'>Feature Importance</p>
-                """, unsafe_allow_html=True)
-                st.image(
-                    str(base_path / "feature_importance.png")
-                )
-                st.markdown("</div>", unsafe_allow_html=True)
-            
-            # ROC Curve
-            if (base_path / "roc_curve.png").exists():
-                st.markdown("""
-                    <div style='background: white; padding: 1rem; border-radius: 12px; margin-bottom: 1.5rem; box-shadow: 0 2px 8px rgba(0,0,0,0.05); border: 1px solid var(--neutral-100);'>
-                        <p style='margin: 0 0 0.75rem 0; color: var(--neutral-700); font-weight: 600; font-size: 0.9rem;'>ROC Curve (AUC = 0.88)</p>
-                """, unsafe_allow_html=True)
-                st.image(
-                    str(base_path / "roc_curve.png")
-                )
-                st.markdown("</div>", unsafe_allow_html=True)
-            
-            # Confusion Matrix
-            if (base_path / "confusion_matrix.png").exists():
-                st.markdown("""
+            for name, image in load_chart_assets().items():
+                st.markdown(f"""
                     <div style='background: white; padding: 1rem; border-radius: 12px; margin-bottom: 1.5rem; box-shadow: 0 2px 8px rgba(0,0,0,0.05); border: 1px solid var(--neutral-100);'>
-                        <p style='margin: 0 0 0.75rem 0; color: var(--neutral-700); font-weight: 600; font-size: 0.9rem;'>Confusion Matrix</p>
+                        <p style='margin: 0 0 0.75rem 0; color: var(--neutral-700); font-weight: 600; font-size: 0.9rem;'>{chart_titles[name]}</p>
                 """, unsafe_allow_html=True)
-                st.image(
-                    str(base_path / "confusion_matrix.png")
-                )
+                st.image(image)
                 st.markdown("</div>", unsafe_allow_html=True)
         except Exception as e:
             st.warning(f"Could not load visualization: {e}")
         
         st.markdown("<hr>", unsafe_allow_html=True)
         
-        # Model metrics with better styling
-        st.markdown("""
-            <p style='color: var(--neutral-600); font-size: 0.8rem; font-weight: 700; text-transform: uppercase; letter-spacing: 0.05em; margin: 1.5rem 0 1rem 0;'>
-                Model Performance
-            </p>
-        """, unsafe_allow_html=True)
-        
-        col_a, col_b = st.columns(2)
-        with col_a:
-            st.metric("Accuracy", "82.1%")
-        with col_b:
-            st.metric("ROC AUC", "88.5%")
-        
-        st.markdown("<hr>", unsafe_allow_html=True)
+        # Held-out metrics published with the served model; none for models published without them
+        evaluation = active.evaluation
+        if evaluation:
+            st.markdown("""
+                <p style='color: var(--neutral-600); font-size: 0.8rem; font-weight: 700; text-transform: uppercase; letter-spacing: 0.05em; margin: 1.5rem 0 1rem 0;'>
+                    Model Performance
+                </p>
+            """, unsafe_allow_html=True)
+            
+            col_a, col_b = st.columns(2)
+            with col_a:
+                st.metric("Balanced Accuracy", f"{evaluation['balanced_accuracy']:.1%}")
+            with col_b:
+                st.metric("ROC AUC", f"{evaluation['roc_auc']:.1%}")
+            
+            st.markdown("<hr>", unsafe_allow_html=True)
         
         # Modern info box with cleaner styling
         st.markdown("""
@@ -813,6 +941,10 @@ def main():
                 </p>
             </div>
         """, unsafe_allow_html=True)
+    
+    # Rendered last so it includes this run's prediction
+    if show_debug:
+        render_debug_panel()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,4 @@
+"""
+Inference benchmarks
+Run from the repo root, e.g. ``python -m benchmarks.bench_predict``
+"""
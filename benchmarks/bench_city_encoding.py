@@ -0,0 +1,93 @@
+"""
+Benchmark: one-hot City columns vs. a frequency- or target-encoded City
+
+    python -m benchmarks.bench_city_encoding [--repeats 50]
+
+Retrains on Telco_customer_churn.csv with each churn.train city encoding
+(nothing is published) and prints test-set quality, model input width,
+artifact sizes and serving latency: one record through transform_record and
+a 10,000-row batch through transform_frame + predict_proba.
+"""
+
+import argparse
+import io
+import statistics
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+import joblib
+import pandas as pd
+
+from churn.train import CITY_ENCODINGS, evaluate, fit_model, fit_scaler, load_training_data, split_rows
+
+DATA_PATH = Path(__file__).resolve().parent.parent / "Telco_customer_churn.csv"
+BATCH_ROWS = 10_000
+
+
+def median_seconds(fn, repeats: int) -> float:
+    """Median wall time of ``fn()`` over ``repeats`` runs after one warm-up"""
+    fn()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def pickled_size(obj) -> int:
+    buffer = io.BytesIO()
+    joblib.dump(obj, buffer)
+    return buffer.tell()
+
+
+def bundle_size(model, scaler) -> int:
+    from churn.bundle import write_bundle
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_bundle(model, scaler, Path(tmp) / "bundle")
+        return sum(entry.stat().st_size for entry in Path(path).iterdir())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+    customers = pd.read_csv(DATA_PATH)
+    record = customers.iloc[0].to_dict()
+    batch = customers.sample(n=BATCH_ROWS, replace=True, random_state=42)
+
+    results = []
+    for city_encoding in CITY_ENCODINGS:
+        data, _ = load_training_data(DATA_PATH, cache_dir=None, city_encoding=city_encoding)
+        train_rows, test_rows = split_rows(data.target)
+        model = fit_model(data, train_rows, test_rows)
+        scaler = fit_scaler(data, train_rows)
+        encoder = data.preprocessor.encoder
+
+        results.append({
+            "city_encoding": city_encoding,
+            "features": len(data.feature_names),
+            "trees": int(model.best_iteration) + 1,
+            **evaluate(model, data, test_rows),
+            "scaler_bytes": pickled_size(scaler),
+            "bundle_bytes": bundle_size(model, scaler),
+            "record_us": median_seconds(lambda: encoder.transform_record(record), args.repeats) * 1e6,
+            "batch_ms": median_seconds(
+                lambda: model.predict_proba(encoder.transform_frame(batch)), args.repeats) * 1e3,
+        })
+
+    print(f"{'encoding':>10} {'features':>9} {'trees':>6} {'AUC':>7} {'bal acc':>8} "
+          f"{'scaler':>9} {'bundle':>9} {'record':>10} {f'{BATCH_ROWS:,} rows':>12}")
+    for r in results:
+        print(f"{r['city_encoding']:>10} {r['features']:>9,} {r['trees']:>6} {r['roc_auc']:>7.4f} "
+              f"{r['balanced_accuracy']:>8.4f} {r['scaler_bytes'] / 1024:>6.0f} KB {r['bundle_bytes'] / 1024:>6.0f} KB "
+              f"{r['record_us']:>7.1f} us {r['batch_ms']:>9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
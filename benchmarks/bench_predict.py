@@ -0,0 +1,66 @@
+"""
+Benchmark: single-pass predict vs. the old predict + predict_proba pair
+
+    python -m benchmarks.bench_predict [--repeats 50]
+
+Scores 1 row and 10,000 rows (TelcoChurnDataset rows, upsampled) both ways
+and prints the median latency of each.
+"""
+
+import argparse
+import statistics
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from churn.preprocessing import load_preprocessor
+from churn.model import load_model_and_preprocessing, make_prediction
+
+DATA_PATH = Path(__file__).resolve().parent.parent / "Telco_customer_churn.csv"
+BATCH_SIZES = (1, 10_000)
+
+
+def two_call_prediction(model, features: np.ndarray):
+    """The previous make_prediction: predict() then predict_proba() on the same rows"""
+    prediction = model.predict(features)
+    probability = model.predict_proba(features)[:, 1]
+    return np.where(prediction == 1, "Churn", "No Churn"), probability
+
+
+def median_seconds(fn, repeats: int) -> float:
+    """Median wall time of ``fn()`` over ``repeats`` runs after one warm-up"""
+    fn()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+    model, scaler, _ = load_model_and_preprocessing()
+    encoder = load_preprocessor(scaler=scaler).encoder
+
+    customers = pd.read_csv(DATA_PATH)
+    customers = customers.sample(n=max(BATCH_SIZES), replace=True, random_state=42)
+    features = encoder.transform_frame(customers)
+
+    print(f"{'rows':>8} {'predict+proba':>15} {'single pass':>13} {'saved':>8}")
+    for n_rows in BATCH_SIZES:
+        batch = features[:n_rows]
+        old = median_seconds(lambda: two_call_prediction(model, batch), args.repeats)
+        new = median_seconds(lambda: make_prediction(model, batch), args.repeats)
+        print(f"{n_rows:>8} {old * 1e3:>12.3f} ms {new * 1e3:>10.3f} ms {(1 - new / old) * 100:>7.1f}%")
+
+
+if __name__ == "__main__":
+    main()
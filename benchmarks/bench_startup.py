@@ -0,0 +1,116 @@
+"""
+Benchmark: cold start to first prediction
+
+    python -m benchmarks.bench_startup [--runs 5] [--bundle model_bundle]
+
+Each variant runs in a fresh interpreter and times imports + artifact loading
++ one single-record prediction:
+
+    pickles          joblib-unpickled XGBoost_Model.pkl / StandardScaler.pkl
+    bundle-forest    model bundle, NumPy forest backend (no xgboost import)
+    bundle-booster   model bundle, native xgboost booster backend
+
+A bundle is built into a temporary directory when --bundle is not given.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+SAMPLE_RECORD = {
+    "City": "Los_Angeles", "Gender": "Male", "Senior_Citizen": "No", "Partner": "Yes",
+    "Dependents": "No", "Tenure": 12, "Phone_Service": "Yes", "Multiple_Lines": "No",
+    "Internet_Service": "Fiber_optic", "Online_Security": "No", "Online_Backup": "Yes",
+    "Device_Protection": "No", "Tech_Support": "No", "Streaming_TV": "Yes",
+    "Streaming_Movies": "No", "Contract": "Month-to-month", "Paperless_Billing": "Yes",
+    "Payment_Method": "Electronic_check", "Monthly_Charges": 70.0, "Total_Charges": 840.0,
+}
+
+# Child programs; {bundle} and {record} are filled in before running
+VARIANTS = {
+    "pickles": """
+from churn.preprocessing import load_preprocessor
+from churn.model import load_model_and_preprocessing, predict_churn_probability
+model, scaler, _ = load_model_and_preprocessing()
+encoder = load_preprocessor(scaler=scaler).encoder
+predict_churn_probability(model, encoder.transform_record({record}))
+""",
+    "bundle-forest": """
+from churn.bundle import load_bundle
+from churn.model import predict_churn_probability
+bundle = load_bundle({bundle!r}, backend="forest")
+predict_churn_probability(bundle.model, bundle.encoder.transform_record({record}))
+""",
+    "bundle-booster": """
+from churn.bundle import load_bundle
+from churn.model import predict_churn_probability
+bundle = load_bundle({bundle!r}, backend="booster")
+predict_churn_probability(bundle.model, bundle.encoder.transform_record({record}))
+""",
+}
+
+CHILD_TEMPLATE = """
+import time
+start = time.perf_counter()
+import warnings
+warnings.filterwarnings("ignore")
+{body}
+print(time.perf_counter() - start)
+"""
+
+
+def run_variant(body: str) -> tuple:
+    """(in-process seconds to first prediction, total process wall seconds)"""
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD_TEMPLATE.format(body=body)],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    ).stdout
+    wall = time.perf_counter() - start
+    return float(output.strip().splitlines()[-1]), wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--bundle", default=None, help="Existing bundle directory to load")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bundle = args.bundle
+        if bundle is None:
+            bundle = os.path.join(tmp, "model_bundle")
+            subprocess.run([sys.executable, "-m", "churn.bundle", "--output", bundle],
+                           cwd=REPO_ROOT, capture_output=True, check=True)
+
+        results = {}
+        for name, template in VARIANTS.items():
+            body = template.format(bundle=str(bundle), record=repr(SAMPLE_RECORD))
+            # One untimed run warms the OS page cache
+            run_variant(body)
+            timings = [run_variant(body) for _ in range(args.runs)]
+            results[name] = {
+                "first_prediction_ms": statistics.median(t[0] for t in timings) * 1e3,
+                "process_wall_ms": statistics.median(t[1] for t in timings) * 1e3,
+            }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'variant':<16} {'first prediction':>17} {'process wall':>13}")
+    for name, result in results.items():
+        print(f"{name:<16} {result['first_prediction_ms']:>14.0f} ms {result['process_wall_ms']:>10.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
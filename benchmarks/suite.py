@@ -0,0 +1,321 @@
+"""
+Benchmark suite: cold start, single-row latency, batch throughput, peak RSS
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --compare before.json after.json
+
+Inputs are TelcoChurnDataset.csv rows, upscaled to the batch sizes with a
+fixed seed (rows resampled, charges jittered, a City drawn from the form's
+options), so two runs on the same machine score identical data.
+
+Measured:
+    cold_start    fresh interpreter to first prediction (benchmarks.bench_startup)
+    single_row    p50/p99 of validate_inputs, encode_and_scale_input,
+                  make_prediction and the whole form path, plus
+                  load_model_and_preprocessing
+    batch         rows/sec of score_frame at several sizes, dense and sparse,
+                  each size in its own process so peak RSS is per size
+
+Results are JSON; --compare prints the relative change of every metric.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DATA_PATH = REPO_ROOT / "TelcoChurnDataset.csv"
+
+SEED = 42
+BATCH_SIZES = (1_000, 10_000, 100_000)
+QUICK_BATCH_SIZES = (1_000, 10_000)
+BATCH_MODES = ("dense", "sparse")
+
+# Metrics where a larger value is better; everything else is a cost
+HIGHER_IS_BETTER = ("rows_per_sec",)
+
+# Numeric fields that describe the run rather than measure it
+NOT_METRICS = ("rows", "requests")
+
+
+# ==================== Data ====================
+def load_customers() -> pd.DataFrame:
+    """TelcoChurnDataset.csv without the label"""
+    return pd.read_csv(DATA_PATH).drop(columns=["Churn"], errors="ignore")
+
+
+def synthetic_customers(n_rows: int, seed: int = SEED) -> pd.DataFrame:
+    """
+    ``n_rows`` customers upscaled from TelcoChurnDataset.csv
+
+    Rows are resampled with replacement and their numeric fields jittered so
+    the upscaled data isn't just repeated rows; the same seed always gives
+    the same frame.
+    """
+    from churn.features import get_feature_config
+
+    rng = np.random.default_rng(seed)
+    base = load_customers()
+    customers = base.iloc[rng.integers(0, len(base), n_rows)].reset_index(drop=True)
+
+    tenure = np.clip(customers["tenure"].to_numpy() + rng.integers(-3, 4, n_rows), 0, 72)
+    monthly = np.round(customers["MonthlyCharges"].to_numpy() * rng.normal(1.0, 0.05, n_rows), 2)
+    customers["tenure"] = tenure
+    customers["MonthlyCharges"] = monthly
+    customers["TotalCharges"] = np.round(tenure * monthly, 2)
+    # The Kaggle export has no location; give every row a City from the form
+    customers["City"] = rng.choice(get_feature_config()["City"]["options"], n_rows)
+    return customers
+
+
+def form_records(customers: pd.DataFrame) -> List[Dict]:
+    """Customers as app-form dicts (the shape validate_inputs expects)"""
+    from churn.preprocessing import normalize_frame
+
+    normalized = normalize_frame(customers).rename(columns={"Tenure_Months": "Tenure"})
+    normalized["Phone_Service"] = np.where(normalized["Phone_Service"] == 1.0, "Yes", "No")
+    return normalized.to_dict("records")
+
+
+# ==================== Measurements ====================
+def percentiles_us(timings: List[float]) -> Dict[str, float]:
+    """p50/p99/mean of a list of durations in seconds, in microseconds"""
+    values = np.asarray(timings) * 1e6
+    return {
+        "p50_us": float(np.percentile(values, 50)),
+        "p99_us": float(np.percentile(values, 99)),
+        "mean_us": float(values.mean()),
+    }
+
+
+def bench_single_row(n_requests: int, seed: int = SEED) -> Dict:
+    """Per-stage latency of the form path, one record at a time"""
+    from churn.preprocessing import load_preprocessor
+    from churn.features import validate_inputs
+    from churn.model import load_model_and_preprocessing, make_prediction
+
+    load_times = []
+    for _ in range(5):
+        start = time.perf_counter()
+        model, scaler, _ = load_model_and_preprocessing()
+        load_times.append(time.perf_counter() - start)
+    encoder = load_preprocessor(scaler=scaler).encoder
+
+    records = form_records(synthetic_customers(n_requests, seed))
+    # Warm-up: first calls pay for lazy initialization inside xgboost
+    for record in records[:20]:
+        make_prediction(model, encoder.transform_record(record))
+
+    stages = {name: [] for name in ("validate_inputs", "encode_and_scale_input", "make_prediction", "end_to_end")}
+    for record in records:
+        t0 = time.perf_counter()
+        validate_inputs(record)
+        t1 = time.perf_counter()
+        features = encoder.transform_record(record)
+        t2 = time.perf_counter()
+        make_prediction(model, features)
+        t3 = time.perf_counter()
+        stages["validate_inputs"].append(t1 - t0)
+        stages["encode_and_scale_input"].append(t2 - t1)
+        stages["make_prediction"].append(t3 - t2)
+        stages["end_to_end"].append(t3 - t0)
+
+    results = {name: percentiles_us(timings) for name, timings in stages.items()}
+    # The first load also pays for importing xgboost/sklearn; later ones are unpickling only
+    results["load_model_and_preprocessing"] = {
+        "first_ms": load_times[0] * 1e3,
+        "median_ms": statistics.median(load_times[1:]) * 1e3,
+    }
+    results["requests"] = n_requests
+    return results
+
+
+def batch_child(n_rows: int, mode: str, repeats: int, seed: int) -> Dict:
+    """Runs inside a fresh process: score ``n_rows`` synthetic customers"""
+    from churn.batch import score_frame
+    from churn.preprocessing import load_preprocessor
+    from churn.model import load_model_and_preprocessing
+
+    warnings.filterwarnings("ignore")
+    model, scaler, _ = load_model_and_preprocessing()
+    encoder = load_preprocessor(scaler=scaler).encoder
+    customers = synthetic_customers(n_rows, seed)
+    rss_before = peak_rss_mb()
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        score_frame(customers, model, scaler, encoder, sparse=(mode == "sparse"))
+        timings.append(time.perf_counter() - start)
+
+    seconds = statistics.median(timings)
+    return {
+        "rows": n_rows,
+        "seconds": seconds,
+        "rows_per_sec": n_rows / seconds,
+        "peak_rss_mb": peak_rss_mb(),
+        "scoring_rss_mb": peak_rss_mb() - rss_before,
+    }
+
+
+def bench_batch(sizes, repeats: int, seed: int = SEED) -> Dict:
+    """Batch throughput per mode and size, each in its own interpreter"""
+    results = {}
+    for mode in BATCH_MODES:
+        results[mode] = {}
+        for n_rows in sizes:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.suite", "--batch-child", str(n_rows),
+                 "--mode", mode, "--repeats", str(repeats), "--seed", str(seed)],
+                cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+            ).stdout
+            results[mode][str(n_rows)] = json.loads(output.strip().splitlines()[-1])
+    return results
+
+
+def bench_cold_start(runs: int) -> Dict:
+    """Median cold start per artifact format"""
+    from benchmarks.bench_startup import SAMPLE_RECORD, VARIANTS, run_variant
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        bundle = os.path.join(tmp, "model_bundle")
+        subprocess.run([sys.executable, "-m", "churn.bundle", "--output", bundle],
+                       cwd=REPO_ROOT, capture_output=True, check=True)
+        for name, template in VARIANTS.items():
+            body = template.format(bundle=bundle, record=repr(SAMPLE_RECORD))
+            run_variant(body)
+            timings = [run_variant(body) for _ in range(runs)]
+            results[name] = {
+                "first_prediction_ms": statistics.median(t[0] for t in timings) * 1e3,
+                "process_wall_ms": statistics.median(t[1] for t in timings) * 1e3,
+            }
+    return results
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def environment() -> Dict:
+    """What the numbers were measured on"""
+    import xgboost
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "xgboost": xgboost.__version__,
+    }
+
+
+# ==================== Comparison ====================
+def flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    """{'batch.dense.1000.rows_per_sec': ...} for every numeric leaf"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and key not in NOT_METRICS:
+            flat[name] = float(value)
+    return flat
+
+
+def compare(before: Dict, after: Dict, tolerance: float = 0.05) -> List[str]:
+    """One line per metric present in both runs; regressions beyond ``tolerance`` are flagged"""
+    old, new = flatten(before.get("results", before)), flatten(after.get("results", after))
+    lines = []
+    for name in sorted(old.keys() & new.keys()):
+        if old[name] == 0:
+            continue
+        change = new[name] / old[name] - 1
+        worse = -change if name.endswith(HIGHER_IS_BETTER) else change
+        flag = "  REGRESSION" if worse > tolerance else ""
+        lines.append(f"{name:<60} {old[name]:>14.3f} {new[name]:>14.3f} {change * 100:>+8.1f}%{flag}")
+    return lines
+
+
+# ==================== CLI ====================
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", default=None, help="Write the JSON results here (default: stdout)")
+    parser.add_argument("--sizes", default=None, help="Comma-separated batch sizes")
+    parser.add_argument("--quick", action="store_true", help="Smaller batches and fewer runs")
+    parser.add_argument("--requests", type=int, default=2_000, help="Single-row requests timed")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per batch size")
+    parser.add_argument("--cold-runs", type=int, default=5, help="Fresh interpreters per cold-start variant")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"),
+                        help="Compare two result files instead of running")
+    # Internal: one batch measurement in a fresh process
+    parser.add_argument("--batch-child", type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--mode", choices=BATCH_MODES, default="dense", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+
+    if args.batch_child is not None:
+        print(json.dumps(batch_child(args.batch_child, args.mode, args.repeats, args.seed)))
+        return
+
+    if args.compare:
+        before, after = (json.loads(Path(path).read_text()) for path in args.compare)
+        print(f"{'metric':<60} {'before':>14} {'after':>14} {'change':>9}")
+        print("\n".join(compare(before, after)))
+        return
+
+    if args.sizes:
+        sizes = tuple(int(size) for size in args.sizes.split(","))
+    else:
+        sizes = QUICK_BATCH_SIZES if args.quick else BATCH_SIZES
+    requests = min(args.requests, 500) if args.quick else args.requests
+    cold_runs = min(args.cold_runs, 2) if args.quick else args.cold_runs
+
+    report = {
+        "environment": environment(),
+        "config": {"seed": args.seed, "sizes": list(sizes), "requests": requests,
+                   "repeats": args.repeats, "cold_runs": cold_runs},
+        "results": {
+            "cold_start": bench_cold_start(cold_runs),
+            "single_row": bench_single_row(requests, args.seed),
+            "batch": bench_batch(sizes, args.repeats, args.seed),
+        },
+    }
+    report["results"]["peak_rss_mb"] = peak_rss_mb()
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+        print(f"Wrote {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+"""
+Telco churn scoring package
+Streamlit-free preprocessing and scoring helpers shared by app.py and batch jobs
+"""
@@ -0,0 +1,28 @@
+"""
+numba tree walk for churn.trees.FlatForest
+Kept in its own module so numba is only imported when a large batch needs it
+"""
+
+import numba
+import numpy as np
+
+
+@numba.njit(parallel=True, cache=True)
+def walk_rows(features, roots, left, right, feature, threshold, default_left, value, max_depth):
+    """Sum of leaf values per row, one thread per block of rows"""
+    n_rows = features.shape[0]
+    out = np.zeros(n_rows, dtype=np.float64)
+    for row in numba.prange(n_rows):
+        total = 0.0
+        for tree in range(roots.shape[0]):
+            node = roots[tree]
+            for _ in range(max_depth):
+                fv = features[row, feature[node]]
+                if np.isnan(fv):
+                    go_left = default_left[node]
+                else:
+                    go_left = fv < threshold[node]
+                node = left[node] if go_left else right[node]
+            total += value[node]
+        out[row] = total
+    return out
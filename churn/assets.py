@@ -0,0 +1,192 @@
+"""
+Chart assets for the app's visualization panel
+The PNGs are read and downsized once per process and served as bytes, so a
+Streamlit rerun never touches the disk for them.
+
+The PNGs were exported by XGBoost.ipynb and go stale when the model is
+retrained. Regenerate them from a model bundle with:
+
+    python -m churn.assets --bundle model_bundle --data Telco_customer_churn.csv
+
+which redraws the notebook's charts for the bundle's model on the held-out
+rows of the training split and replaces the PNGs in --output-dir.
+"""
+
+import argparse
+import io
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+
+import numpy as np
+
+from churn.model import DEFAULT_ARTIFACT_DIR, DEFAULT_THRESHOLD
+
+# Chart name -> file, as exported by the notebook
+CHART_FILES: Dict[str, str] = {
+    "feature_importance": "feature_importance.png",
+    "roc_curve": "roc_curve.png",
+    "confusion_matrix": "confusion_matrix.png",
+    "xgb_tree": "xgb_tree.png",
+}
+
+# Charts shown in the app's sidebar
+SIDEBAR_CHARTS = ("feature_importance", "roc_curve", "confusion_matrix")
+
+# Widest the sidebar shows an image (2x its column width, for high-DPI screens)
+DEFAULT_MAX_WIDTH = 600
+
+# Resolution charts are redrawn at
+CHART_DPI = 100
+
+
+def downsize_png(data: bytes, max_width: int = DEFAULT_MAX_WIDTH) -> bytes:
+    """
+    PNG no wider than ``max_width``, as a 256-colour palette image
+
+    Resampling smooths edges into many more colours than the flat charts
+    have, so the result is quantized back to a palette, which plots survive
+    without visible loss. Returned unchanged when it is already narrow
+    enough, when that does not make it smaller, or when Pillow is missing.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return data
+
+    image = Image.open(io.BytesIO(data))
+    if image.width <= max_width:
+        return data
+    height = max(1, round(image.height * max_width / image.width))
+    resized = image.convert("RGBA").resize((max_width, height), Image.LANCZOS)
+    buffer = io.BytesIO()
+    resized.quantize(colors=256, method=Image.Quantize.FASTOCTREE).save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue() if buffer.tell() < len(data) else data
+
+
+def load_charts(base_path: Union[str, Path] = None, names: Iterable[str] = SIDEBAR_CHARTS,
+                max_width: Optional[int] = DEFAULT_MAX_WIDTH) -> Dict[str, bytes]:
+    """
+    PNG bytes of the charts that exist under ``base_path``
+
+    Args:
+        base_path: Directory with the exported charts (defaults to the repo root)
+        names: Charts to load, keys of CHART_FILES
+        max_width: Downsize wider images to this many pixels; None keeps them as is
+
+    Returns:
+        Chart name -> PNG bytes, in ``names`` order; missing files are left out
+    """
+    base_path = Path(base_path) if base_path is not None else DEFAULT_ARTIFACT_DIR
+    charts = {}
+    for name in names:
+        try:
+            data = (base_path / CHART_FILES[name]).read_bytes()
+        except FileNotFoundError:
+            continue
+        charts[name] = downsize_png(data, max_width) if max_width else data
+    return charts
+
+
+def render_charts(model, features: np.ndarray, target: np.ndarray, booster=None,
+                  threshold: float = DEFAULT_THRESHOLD) -> Dict[str, bytes]:
+    """
+    The notebook's charts for a model, as PNG bytes
+
+    Args:
+        model: Anything with predict_proba (XGBClassifier, bundle model)
+        features: Held-out rows, in the features the model was fit on
+        target: Churn labels of those rows
+        booster: xgboost Booster for the importance and tree plots; skipped when None
+        threshold: Decision threshold the confusion matrix is drawn at
+
+    Returns:
+        Chart name -> PNG bytes; the tree is left out when graphviz is missing
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from sklearn.metrics import ConfusionMatrixDisplay, RocCurveDisplay, confusion_matrix
+
+    def png(fig) -> bytes:
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", bbox_inches="tight", dpi=CHART_DPI)
+        plt.close(fig)
+        return buffer.getvalue()
+
+    charts = {}
+    churn_probability = model.predict_proba(features)[:, 1]
+
+    if booster is not None:
+        import xgboost as xgb
+
+        ax = xgb.plot_importance(booster, max_num_features=15, height=0.5)
+        ax.set_title("Top 15 Feature Importances")
+        charts["feature_importance"] = png(ax.figure)
+
+    cm = confusion_matrix(target, (churn_probability > threshold).astype(int))
+    display = ConfusionMatrixDisplay(confusion_matrix=cm).plot()
+    display.ax_.set_title(f"Confusion Matrix (threshold {threshold:.2f})")
+    charts["confusion_matrix"] = png(display.figure_)
+
+    display = RocCurveDisplay.from_predictions(target, churn_probability)
+    display.ax_.set_title("ROC Curve")
+    charts["roc_curve"] = png(display.figure_)
+
+    if booster is not None:
+        try:
+            import graphviz  # noqa: F401
+        except ImportError:
+            pass
+        else:
+            ax = xgb.plot_tree(booster, tree_idx=0, rankdir="LR")
+            ax.figure.set_size_inches(20, 10)
+            ax.set_title("First Tree of XGBoost Model")
+            charts["xgb_tree"] = png(ax.figure)
+
+    return charts
+
+
+def write_charts(charts: Dict[str, bytes], output_dir: Union[str, Path]) -> Path:
+    """Write charts under their CHART_FILES names, each renamed into place"""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for name, data in charts.items():
+        tmp_path = output_dir / f".{CHART_FILES[name]}.tmp-{os.getpid()}"
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, output_dir / CHART_FILES[name])
+    return output_dir
+
+
+def charts_from_bundle(bundle_path: Union[str, Path], data_path: Union[str, Path]) -> Dict[str, bytes]:
+    """Charts for a model bundle, evaluated on the test rows of the training split at its published threshold"""
+    from churn.bundle import load_bundle
+    from churn.train import load_training_data, split_rows
+
+    bundle = load_bundle(bundle_path, backend="booster")
+    data, _ = load_training_data(data_path)
+    if data.feature_names != bundle.feature_names:
+        raise ValueError("The data does not encode to the bundle's features; "
+                         "was the model trained with another --city-encoding?")
+    _, test_rows = split_rows(data.target)
+    return render_charts(bundle.model, data.features[test_rows].toarray(), data.target[test_rows],
+                         booster=bundle.model.booster, threshold=bundle.threshold)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Redraw the app's charts for a model bundle")
+    parser.add_argument("--bundle", required=True, help="Model bundle directory")
+    parser.add_argument("--data", required=True, help="Labelled customer file the model was trained on")
+    parser.add_argument("--output-dir", default=str(DEFAULT_ARTIFACT_DIR), help="Where the PNGs go")
+    args = parser.parse_args()
+
+    charts = charts_from_bundle(args.bundle, args.data)
+    write_charts(charts, args.output_dir)
+    for name in charts:
+        print(f"Wrote {Path(args.output_dir) / CHART_FILES[name]}")
+    if "xgb_tree" not in charts:
+        print(f"Kept {CHART_FILES['xgb_tree']}: drawing trees needs the graphviz package")
+
+
+if __name__ == "__main__":
+    main()
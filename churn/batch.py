@@ -0,0 +1,153 @@
+"""
+Vectorized batch scoring
+Encodes, scales and scores a whole customer file in one pass instead of row by row
+"""
+
+import os
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import BinaryIO, List, Optional, Union
+
+from churn.encoder import CompiledEncoder
+from churn.model import DEFAULT_THRESHOLD, labels_from_probability, predict_churn_probability
+from churn.preprocessing import Preprocessor
+from churn.writers import output_name, write_frame
+
+# Extensions accepted by read_customer_file
+SUPPORTED_EXTENSIONS = ('.csv', '.xlsx', '.xls')
+
+# Frames smaller than this are scored in-process even when workers are requested;
+# starting a process pool costs more than it saves
+PARALLEL_MIN_ROWS = 50_000
+
+# Download choices: label -> (format, compression) for scored_to_bytes
+DOWNLOAD_FORMATS = {
+    'CSV': ('csv', None),
+    'CSV (gzip)': ('csv', 'gzip'),
+    'Parquet': ('parquet', None),
+    'JSON Lines (gzip)': ('jsonl', 'gzip'),
+}
+
+
+def read_customer_file(source: Union[str, Path, BinaryIO], name: str = None) -> pd.DataFrame:
+    """
+    Read a CSV or Excel customer file
+
+    Args:
+        source: Path or file-like object (e.g. a Streamlit upload)
+        name: File name used to pick the reader when ``source`` is file-like
+
+    Returns:
+        Raw customer DataFrame
+    """
+    name = name or getattr(source, 'name', None) or str(source)
+    suffix = Path(name).suffix.lower()
+
+    if suffix == '.csv':
+        return pd.read_csv(source)
+    if suffix in ('.xlsx', '.xls'):
+        return pd.read_excel(source)
+    raise ValueError(f"Unsupported file type '{suffix}', expected one of {SUPPORTED_EXTENSIONS}")
+
+
+def predict_frame(df: pd.DataFrame, model, encoder: CompiledEncoder, sparse: bool = False) -> np.ndarray:
+    """
+    Churn probability for every customer in a DataFrame
+
+    Args:
+        df: Raw customer records
+        model: Trained XGBoost model (or any model with predict_proba)
+        encoder: Compiled encoder producing the model input
+        sparse: Encode to CSR so memory scales with non-zeros instead of
+            rows x 1,177 columns (XGBoost models only)
+
+    Returns:
+        1-D array of churn probabilities, one per row
+    """
+    # One predict_proba call; the label is derived from the probability
+    if sparse:
+        # Needs xgboost; imported here so dense scoring works with xgboost-free models
+        from churn.sparse import predict_proba_sparse
+        return predict_proba_sparse(model, encoder, encoder.transform_frame_sparse(df))
+    return predict_churn_probability(model, encoder.transform_frame(df))
+
+
+def with_predictions(df: pd.DataFrame, churn_probability: np.ndarray,
+                     threshold: float = DEFAULT_THRESHOLD) -> pd.DataFrame:
+    """Copy of ``df`` with ``Prediction`` and ``Probability`` columns appended"""
+    result = df.copy()
+    result['Prediction'] = labels_from_probability(churn_probability, threshold)
+    result['Probability'] = churn_probability
+    return result
+
+
+def score_frame(df: pd.DataFrame, model, scaler, encoder: CompiledEncoder = None,
+                sparse: bool = False, threshold: float = DEFAULT_THRESHOLD,
+                workers: int = 1) -> pd.DataFrame:
+    """
+    Score every customer in a DataFrame
+
+    Args:
+        df: Raw customer records
+        model: Trained XGBoost model
+        scaler: StandardScaler fitted on training data
+        encoder: Compiled encoder producing the model input; built from
+            ``scaler`` when omitted (see Preprocessor.from_scaler)
+        sparse: Encode to CSR so memory scales with non-zeros instead of
+            rows x 1,177 columns
+        threshold: Decision threshold on the churn probability
+        workers: Score row ranges of large frames in this many processes
+            (see churn.parallel); None uses every core
+
+    Returns:
+        Copy of ``df`` with ``Prediction`` and ``Probability`` columns appended
+    """
+    if df.empty:
+        raise ValueError("No customer records to score")
+
+    if encoder is None:
+        encoder = Preprocessor.from_scaler(scaler).encoder
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(df) < PARALLEL_MIN_ROWS:
+        churn_probability = predict_frame(df, model, encoder, sparse=sparse)
+    else:
+        from churn.parallel import ParallelScorer
+        with ParallelScorer(model, encoder, workers=workers, sparse=sparse) as scorer:
+            churn_probability = scorer.predict_frame(df)
+
+    return with_predictions(df, churn_probability, threshold)
+
+
+def scored_to_csv(scored: pd.DataFrame) -> bytes:
+    """Encode a scored DataFrame as CSV bytes for download"""
+    return scored_to_bytes(scored, 'csv')
+
+
+def scored_to_bytes(scored: pd.DataFrame, output_format: str = 'csv', compression: Optional[str] = None) -> bytes:
+    """
+    Encode a scored DataFrame for download, a chunk at a time (see churn.writers)
+
+    Args:
+        scored: Output of score_frame
+        output_format: 'csv', 'parquet' or 'jsonl'
+        compression: None, 'gzip' or 'zstd'
+    """
+    return write_frame(scored, output_format, compression)
+
+
+def download_formats() -> List[str]:
+    """Labels of DOWNLOAD_FORMATS this install can write; Parquet needs pyarrow"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return [label for label, (output_format, _) in DOWNLOAD_FORMATS.items() if output_format != 'parquet']
+    return list(DOWNLOAD_FORMATS)
+
+
+def scored_download(scored: pd.DataFrame, stem: str, label: str = 'CSV') -> dict:
+    """``data``, ``file_name`` and ``mime`` of a download button in one of DOWNLOAD_FORMATS"""
+    output_format, compression = DOWNLOAD_FORMATS[label]
+    file_name, mime = output_name(stem, output_format, compression)
+    return {'data': scored_to_bytes(scored, output_format, compression), 'file_name': file_name, 'mime': mime}
@@ -0,0 +1,345 @@
+"""
+Versioned model bundle
+One directory with everything serving needs, in formats that load fast:
+
+    model_bundle/
+        manifest.json         format version, bundle version, checksums, metadata
+        booster.ubj           XGBoost native UBJSON (trees up to best_iteration)
+        preprocessing.json    what the model consumes (churn.preprocessing.Preprocessor)
+        feature_names.npy     scaler.feature_names_in_
+        scaler_mean.npy       scaler.mean_ (statistics of the training rows)
+        scaler_scale.npy      scaler.scale_
+        feature_encodings.json  value tables of frequency/target-encoded columns (if any)
+        forest_*.npy          flat-array trees for churn.trees.FlatForest
+
+All .npy files are memory-mapped on load. Nothing heavier than NumPy is
+imported until it is needed: the forest backend never imports xgboost, and
+the booster backend imports it on first use.
+
+Build from the pickled artifacts with:
+
+    python -m churn.bundle --output model_bundle
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from functools import cached_property
+from pathlib import Path
+from typing import Dict, List, Union
+
+import numpy as np
+
+from churn.trees import FOREST_ARRAYS, FlatForest
+
+# Bump when the layout changes; loaders refuse bundles they don't understand
+BUNDLE_FORMAT_VERSION = 1
+
+MANIFEST_FILE = "manifest.json"
+ENCODINGS_FILE = "feature_encodings.json"
+BOOSTER_FILE = "booster.ubj"
+
+# Prediction backends a bundle can serve with
+BACKENDS = ("forest", "booster")
+
+
+class BoosterClassifier:
+    """predict_proba/predict on a raw xgboost Booster (binary:logistic)"""
+
+    def __init__(self, booster):
+        self.booster = booster
+        self.feature_names = list(booster.feature_names or [])
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        churn_probability = self.booster.inplace_predict(np.atleast_2d(np.asarray(features)))
+        return np.column_stack([1.0 - churn_probability, churn_probability])
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        return (self.predict_proba(features)[:, 1] > 0.5).astype(np.int64)
+
+
+class ModelBundle:
+    """
+    A loaded model bundle; every component is materialized on first access
+
+    Args:
+        path: Bundle directory
+        manifest: Parsed manifest.json
+        backend: "forest" (NumPy, no xgboost) or "booster" (native xgboost)
+    """
+
+    def __init__(self, path: Union[str, Path], manifest: Dict, backend: str = "forest"):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+        self.path = Path(path)
+        self.manifest = manifest
+        self.backend = backend
+
+    @property
+    def version(self) -> str:
+        """Content hash identifying this bundle"""
+        return self.manifest["version"]
+
+    @property
+    def threshold(self) -> float:
+        """Decision threshold the bundle was published with"""
+        return float(self.manifest["threshold"])
+
+    def array(self, name: str) -> np.ndarray:
+        """Memory-map one of the bundle's .npy files (read-only)"""
+        return np.load(self.path / f"{name}.npy", mmap_mode="r")
+
+    @property
+    def evaluation(self) -> Dict[str, float]:
+        """Held-out metrics the bundle was published with; empty when there are none"""
+        return self.manifest.get("evaluation", {})
+
+    @cached_property
+    def feature_names(self) -> List[str]:
+        return [str(name) for name in self.array("feature_names")]
+
+    @cached_property
+    def preprocessor(self):
+        """
+        Preprocessor the model was trained with
+
+        Bundles written before preprocessing.json existed hold a model fit on
+        unscaled features, so theirs is built from the feature names and value
+        tables alone; the scaler arrays are not applied.
+        """
+        from churn.preprocessing import PREPROCESSING_FILE, Preprocessor
+
+        if (self.path / PREPROCESSING_FILE).exists():
+            return Preprocessor.load(self.path / PREPROCESSING_FILE)
+        encodings = None
+        if (self.path / ENCODINGS_FILE).exists():
+            with open(self.path / ENCODINGS_FILE) as f:
+                encodings = json.load(f)
+        return Preprocessor(self.feature_names, encodings=encodings)
+
+    @property
+    def encoder(self):
+        """CompiledEncoder producing the model input"""
+        return self.preprocessor.encoder
+
+    @cached_property
+    def forest(self) -> FlatForest:
+        meta = self.manifest["forest"]
+        return FlatForest(
+            *(self.array(f"forest_{name}") for name in FOREST_ARRAYS),
+            max_depth=meta["max_depth"],
+            base_margin=meta["base_margin"],
+            feature_names=self.feature_names,
+        )
+
+    @cached_property
+    def booster(self) -> BoosterClassifier:
+        import xgboost as xgb
+
+        booster = xgb.Booster()
+        booster.load_model(str(self.path / BOOSTER_FILE))
+        return BoosterClassifier(booster)
+
+    @property
+    def model(self):
+        """Object with predict_proba for the selected backend"""
+        return self.forest if self.backend == "forest" else self.booster
+
+    def verify(self):
+        """Check every file against the manifest checksums"""
+        for name, expected in self.manifest["files"].items():
+            actual = _sha256(self.path / name)
+            if actual != expected:
+                raise ValueError(f"Bundle file {name} is corrupt (sha256 {actual[:12]} != {expected[:12]})")
+
+
+def load_bundle(path: Union[str, Path], backend: str = "forest", verify: bool = False) -> ModelBundle:
+    """
+    Open a model bundle; only the manifest is read up front
+
+    Args:
+        path: Bundle directory
+        backend: "forest" or "booster"
+        verify: Check file checksums (reads every file once)
+
+    Returns:
+        ModelBundle
+    """
+    # An overwritten bundle is a symlink to its current version directory;
+    # members read later must come from the version this manifest describes
+    path = Path(path).resolve()
+    with open(path / MANIFEST_FILE) as f:
+        manifest = json.load(f)
+
+    version = manifest.get("format_version")
+    if version != BUNDLE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported bundle format version {version} (expected {BUNDLE_FORMAT_VERSION})")
+
+    bundle = ModelBundle(path, manifest, backend=backend)
+    if verify:
+        bundle.verify()
+    return bundle
+
+
+def write_bundle(model, scaler, path: Union[str, Path], threshold: float = None,
+                 overwrite: bool = False, preprocessor=None, evaluation: Dict[str, float] = None) -> Path:
+    """
+    Write a model bundle from a trained XGBClassifier and its StandardScaler
+
+    The bundle is assembled in a temporary sibling directory and renamed into
+    place, so readers never see a half-written bundle. Overwriting publishes
+    the new bundle as a hidden version directory next to ``path`` and swaps
+    ``path`` (then a symlink) over to it in one rename, see _swap_into_place.
+
+    Args:
+        model: Trained XGBClassifier
+        scaler: StandardScaler fit on the model's training rows
+        path: Bundle directory to create
+        threshold: Decision threshold to publish with the bundle
+        overwrite: Replace an existing bundle at ``path``
+        preprocessor: Preprocessor the model was trained with; derived from
+            the scaler when omitted (see Preprocessor.from_scaler)
+        evaluation: Held-out metrics to publish with the bundle (churn.train.evaluate)
+
+    Returns:
+        Path of the bundle
+    """
+    from churn.model import DEFAULT_THRESHOLD
+    from churn.preprocessing import PREPROCESSING_FILE, Preprocessor
+    from churn.sparse import iteration_range
+    from churn.trees import forest_arrays
+
+    path = Path(path)
+    if path.exists() and not overwrite:
+        raise FileExistsError(f"Bundle {path} already exists")
+
+    tmp_path = path.with_name(f".{path.name}.tmp-{os.getpid()}")
+    if tmp_path.exists():
+        shutil.rmtree(tmp_path)
+    tmp_path.mkdir(parents=True)
+
+    try:
+        # Keep only the trees predict_proba uses, so the booster needs no iteration_range
+        booster = model.get_booster()
+        _, end = iteration_range(model)
+        if end and end < booster.num_boosted_rounds():
+            booster = booster[:end]
+        booster.save_model(str(tmp_path / BOOSTER_FILE))
+
+        (preprocessor or Preprocessor.from_scaler(scaler)).save(tmp_path / PREPROCESSING_FILE)
+        np.save(tmp_path / "feature_names.npy", np.asarray(scaler.feature_names_in_, dtype=str))
+        np.save(tmp_path / "scaler_mean.npy", np.asarray(scaler.mean_, dtype=np.float64))
+        np.save(tmp_path / "scaler_scale.npy", np.asarray(scaler.scale_, dtype=np.float64))
+        encodings = getattr(scaler, "feature_encodings_", None)
+        if encodings:
+            with open(tmp_path / ENCODINGS_FILE, "w") as f:
+                json.dump(encodings, f)
+
+        forest = forest_arrays(model)
+        for name in FOREST_ARRAYS:
+            np.save(tmp_path / f"forest_{name}.npy", forest[name])
+
+        files = {
+            entry.name: _sha256(entry)
+            for entry in sorted(tmp_path.iterdir())
+        }
+        manifest = {
+            "format_version": BUNDLE_FORMAT_VERSION,
+            "version": hashlib.sha256(json.dumps(files, sort_keys=True).encode()).hexdigest()[:12],
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "objective": "binary:logistic",
+            "n_features": len(scaler.feature_names_in_),
+            "threshold": DEFAULT_THRESHOLD if threshold is None else float(threshold),
+            "evaluation": dict(evaluation or {}),
+            "forest": {
+                "n_trees": int(len(forest["roots"])),
+                "max_depth": int(forest["max_depth"]),
+                "base_margin": float(forest["base_margin"]),
+            },
+            "files": files,
+        }
+        with open(tmp_path / MANIFEST_FILE, "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        if path.exists() or path.is_symlink():
+            _swap_into_place(tmp_path, path)
+        else:
+            os.replace(tmp_path, path)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+    return path
+
+
+def _swap_into_place(tmp_path: Path, path: Path):
+    """
+    Replace the bundle at ``path`` without a moment where it is missing
+
+    A directory can't be renamed over a non-empty one, so each overwrite
+    lands in ``.<name>-<manifest hash>`` (the manifest holds the threshold
+    and write time, so every write gets its own directory) and ``path``
+    becomes a symlink that one os.replace repoints. Processes that loaded
+    the previous version read their lazy members (booster, forest) from its
+    own directory, which is kept until the next overwrite; older versions
+    are removed.
+    """
+    previous = path.resolve()
+    target = path.with_name(f".{path.name}-{_sha256(tmp_path / MANIFEST_FILE)[:12]}")
+    if target.exists():
+        # Same content published again
+        shutil.rmtree(tmp_path)
+    else:
+        os.replace(tmp_path, target)
+
+    if not path.is_symlink():
+        # A bundle written in place before its first overwrite: move it aside
+        # as a version directory too (the only rename that leaves a gap)
+        aside = path.with_name(f".{path.name}-{_sha256(path / MANIFEST_FILE)[:12]}")
+        if aside.exists():
+            shutil.rmtree(path)
+        else:
+            os.replace(path, aside)
+        previous = aside
+
+    link = path.with_name(f".{path.name}.link-{os.getpid()}")
+    link.unlink(missing_ok=True)
+    link.symlink_to(target.name)
+    os.replace(link, path)
+
+    keep = {target.name, previous.name}
+    for entry in path.parent.glob(f".{path.name}-*"):
+        if entry.name not in keep and entry.is_dir():
+            shutil.rmtree(entry, ignore_errors=True)
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a model bundle from the pickled artifacts")
+    parser.add_argument("--artifact-dir", default=None, help="Directory with the model artifacts")
+    parser.add_argument("--output", default="model_bundle", help="Bundle directory to write")
+    parser.add_argument("--threshold", type=float, default=None, help="Decision threshold to publish")
+    parser.add_argument("--overwrite", action="store_true", help="Replace an existing bundle")
+    args = parser.parse_args()
+
+    from churn.model import load_evaluation, load_model_and_preprocessing
+    from churn.preprocessing import load_preprocessor
+    model, scaler, _ = load_model_and_preprocessing(args.artifact_dir)
+    path = write_bundle(model, scaler, args.output, threshold=args.threshold, overwrite=args.overwrite,
+                        preprocessor=load_preprocessor(args.artifact_dir, scaler),
+                        evaluation=load_evaluation(args.artifact_dir))
+    print(f"Wrote bundle {path} (version {load_bundle(path).version})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Prediction result cache
+Remembers the churn probability of customer profiles that were already
+scored, keyed by a hash of the canonicalized record and the model version.
+
+Only probabilities are cached, so changing the decision threshold never
+needs invalidation; changing the model does (see ``PredictionCache.set_version``).
+An optional SQLite file shares results between worker processes.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Union
+
+from churn.schema import CATEGORICAL_COLUMNS
+
+# In-process entries kept before the least recently used one is evicted
+DEFAULT_CACHE_SIZE = 4_096
+
+# Rows kept in a shared on-disk cache before the oldest are pruned
+DEFAULT_DISK_SIZE = 100_000
+
+
+def canonicalize(record: Mapping, column_lookup: Optional[Mapping[str, str]] = None) -> Dict:
+    """
+    Reduce a raw record to the fields that decide its prediction
+
+    Keys are resolved to training column names (``encoder.column_lookup``)
+    and fields the encoder ignores are dropped, so e.g. ``Tenure`` and
+    ``Tenure_Months`` share an entry. Numbers are compared as floats.
+    Values are otherwise left untouched: two records only share a key when
+    the encoder is guaranteed to produce the same row for them.
+
+    Args:
+        record: Raw customer fields (app form or API payload)
+        column_lookup: Raw spelling -> training column name; keys are kept
+            as-is when omitted
+
+    Returns:
+        Dict of training column -> canonical value, sorted by column
+    """
+    canonical = {}
+    for key, value in record.items():
+        col = key if column_lookup is None else column_lookup.get(key)
+        if col is None:
+            continue
+        if col not in CATEGORICAL_COLUMNS and isinstance(value, (bool, int, float)):
+            value = float(value)
+        canonical[col] = value
+    return dict(sorted(canonical.items()))
+
+
+def _tagged(value) -> str:
+    """JSON fallback for non-JSON values (e.g. NumPy scalars) that keeps their type"""
+    return f"{type(value).__name__}:{value}"
+
+
+class DiskCache:
+    """
+    Prediction results in a SQLite file, shared by every process that opens it
+
+    Args:
+        path: SQLite database file (created if missing)
+        max_entries: Rows kept before the oldest are pruned
+    """
+
+    # Prune at most once every this many writes
+    PRUNE_EVERY = 1_000
+
+    def __init__(self, path: Union[str, Path], max_entries: int = DEFAULT_DISK_SIZE):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._conn = None
+        self._pid = None
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections must not cross a fork, so each process opens its own
+        if self._conn is None or self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=5.0, check_same_thread=False,
+                                   isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS predictions "
+                "(key TEXT PRIMARY KEY, probability REAL NOT NULL, created REAL NOT NULL)"
+            )
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def get(self, key: str, ttl: Optional[float] = None) -> Optional[float]:
+        row = self._connection().execute(
+            "SELECT probability, created FROM predictions WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or (ttl is not None and time.time() - row[1] > ttl):
+            return None
+        return row[0]
+
+    def put(self, key: str, probability: float):
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO predictions (key, probability, created) VALUES (?, ?, ?)",
+            (key, probability, time.time()),
+        )
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            conn.execute(
+                "DELETE FROM predictions WHERE key IN "
+                "(SELECT key FROM predictions ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        self._connection().execute("DELETE FROM predictions")
+
+
+class PredictionCache:
+    """
+    In-process LRU cache of churn probabilities with an optional TTL
+
+    Args:
+        maxsize: Entries kept in memory; 0 disables caching
+        ttl: Seconds an entry stays valid, None for no expiry
+        version: Model version (bundle or artifact hash) baked into every key
+        column_lookup: ``encoder.column_lookup``, used to canonicalize records
+        disk: Optional DiskCache consulted on in-memory misses
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE, ttl: Optional[float] = None,
+                 version: str = "", column_lookup: Optional[Mapping[str, str]] = None,
+                 disk: Optional[DiskCache] = None):
+        self.maxsize = max(int(maxsize), 0)
+        self.ttl = ttl
+        self.version = version
+        self.column_lookup = column_lookup
+        self.disk = disk
+
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Counters for monitoring
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def key(self, record: Mapping, version: Optional[str] = None) -> str:
+        """
+        Cache key for a raw record under a model version
+
+        Pass the version that will score the record when it may have changed
+        since the last set_version (a request still finishing on the old one).
+        """
+        payload = json.dumps(
+            [self.version if version is None else version, canonicalize(record, self.column_lookup)],
+            separators=(",", ":"),
+            default=_tagged,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[float]:
+        """Cached churn probability, or None on a miss"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                probability, created = entry
+                if self.ttl is None or time.monotonic() - created <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return probability
+                del self._entries[key]
+
+        probability = self.disk.get(key, self.ttl) if self.disk is not None else None
+        with self._lock:
+            if probability is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._store(key, probability)
+        return probability
+
+    def put(self, key: str, probability: float):
+        """Remember the churn probability for ``key``"""
+        if not self.enabled:
+            return
+        probability = float(probability)
+        with self._lock:
+            self._store(key, probability)
+        if self.disk is not None:
+            self.disk.put(key, probability)
+
+    def _store(self, key: str, probability: float):
+        self._entries[key] = (probability, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def set_version(self, version: str):
+        """
+        Switch to a new model version
+
+        In-memory entries are dropped; shared disk entries stay but can no
+        longer be hit, since the version is part of every key.
+        """
+        with self._lock:
+            if version != self.version:
+                self.version = version
+                self._entries.clear()
+
+    def clear(self):
+        """Drop every cached result, including the shared disk entries"""
+        with self._lock:
+            self._entries.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "version": self.version,
+        }
@@ -0,0 +1,413 @@
+"""
+Compiled feature encoder
+Built once from the scaler's feature names, then writes one-hot rows straight
+into preallocated NumPy buffers instead of going through pd.get_dummies.
+Input scaling can be folded in as well: the scaled "off" and "on" value of
+every column is precomputed, so a scaled row is a baseline copy plus a few
+writes. Without mean/scale the transform_* methods return unscaled rows.
+Serving compiles its encoder from the model's churn.preprocessing.Preprocessor,
+which decides whether the model input is scaled at all.
+
+pandas and scipy are only imported by the frame/sparse methods, so encoding
+single records needs nothing beyond NumPy.
+"""
+
+import numpy as np
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from churn.schema import (
+    CATEGORICAL_COLUMNS,
+    COLUMN_ALIASES,
+    NUMERIC_COLUMNS,
+    PHONE_SERVICE_MAP,
+    SENIOR_CITIZEN_MAP,
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from scipy import sparse
+
+
+class CompiledEncoder:
+    """
+    One-hot encoder compiled from ``scaler.feature_names_in_``
+
+    Every categorical value is resolved to its column index with a precomputed
+    dict, so encoding a record is a handful of dict lookups and array writes.
+
+    A categorical column can instead be value-encoded (see churn.train's
+    ``city_encoding``): it is then a single feature named after the column,
+    filled from the ``encodings`` table, e.g.
+    ``{'City': {'method': 'frequency', 'values': {'Los_Angeles': 0.04}, 'default': 0.0}}``.
+    """
+
+    def __init__(self, feature_names: Sequence[str], mean: Optional[np.ndarray] = None,
+                 scale: Optional[np.ndarray] = None, encodings: Optional[Dict[str, Dict]] = None):
+        self.feature_names: List[str] = [str(name) for name in feature_names]
+        self.n_features = len(self.feature_names)
+        column_index = {name: idx for idx, name in enumerate(self.feature_names)}
+
+        # Numeric training columns present in the model input
+        self.numeric_index: Dict[str, int] = {
+            col: column_index[col] for col in NUMERIC_COLUMNS if col in column_index
+        }
+
+        # Value-encoded categorical columns: raw value -> number, and the number for unseen values
+        self.encodings: Dict[str, Dict] = {
+            col: spec for col, spec in (encodings or {}).items() if col in column_index
+        }
+        self.value_index: Dict[str, int] = {col: column_index[col] for col in self.encodings}
+        self.value_maps: Dict[str, Dict[object, float]] = {}
+        for col, spec in self.encodings.items():
+            values = {key: float(value) for key, value in spec['values'].items()}
+            for key, value in list(values.items()):
+                values.setdefault(key.replace('_', ' '), value)
+            self.value_maps[col] = values
+        self.value_defaults: Dict[str, float] = {
+            col: float(spec.get('default', np.nan)) for col, spec in self.encodings.items()
+        }
+
+        # Categorical value -> column index, e.g. {'Contract': {'One_year': 40, ...}}
+        self.category_index: Dict[str, Dict[object, int]] = {
+            col: {} for col in CATEGORICAL_COLUMNS if col not in self.value_index
+        }
+        for idx, name in enumerate(self.feature_names):
+            # Longest prefix first so e.g. 'Streaming_TV_' never shadows a longer column name
+            for col in sorted(self.category_index, key=len, reverse=True):
+                prefix = col + '_'
+                if name.startswith(prefix):
+                    self._add_category(col, name[len(prefix):], idx)
+                    break
+
+        # Raw spellings of a column name -> training column name
+        self.column_lookup: Dict[str, str] = {}
+        for col in list(self.numeric_index) + CATEGORICAL_COLUMNS:
+            self.column_lookup[col] = col
+            self.column_lookup[col.replace('_', ' ')] = col
+        for alias, col in COLUMN_ALIASES.items():
+            if col in self.column_lookup:
+                self.column_lookup[alias] = col
+
+        # Columns that are always stored explicitly in the sparse encoding
+        self.numeric_columns = np.array(
+            sorted([*self.numeric_index.values(), *self.value_index.values()]), dtype=np.int64
+        )
+        self.one_hot_mask = np.ones(self.n_features, dtype=bool)
+        self.one_hot_mask[self.numeric_columns] = False
+
+        self.mean_ = None if mean is None else np.asarray(mean, dtype=np.float64)
+        self.scale_ = None if scale is None else np.asarray(scale, dtype=np.float64)
+
+        # The scaler folded into lookup tables: a scaled row starts as the scaled
+        # "everything off" vector and only the set one-hot cells (their scaled
+        # "on" value) and the numeric cells are written over it
+        self.off_ = self.scale(np.zeros(self.n_features, dtype=np.float64))
+        self.on_ = self.scale(np.ones(self.n_features, dtype=np.float64))
+        self.numeric_affine: Dict[str, Tuple[int, float, float]] = {
+            col: (
+                idx,
+                0.0 if self.mean_ is None else float(self.mean_[idx]),
+                1.0 if self.scale_ is None else float(self.scale_[idx]),
+            )
+            for col, idx in [*self.numeric_index.items(), *self.value_index.items()]
+        }
+
+    def _add_category(self, col: str, value: str, idx: int):
+        """Register a category under its training spelling and its raw spelling"""
+        lookup = self.category_index[col]
+        lookup[value] = idx
+        # Raw data has spaces where training data has underscores
+        lookup.setdefault(value.replace('_', ' '), idx)
+        if col == 'Senior_Citizen':
+            for raw, label in SENIOR_CITIZEN_MAP.items():
+                if label == value:
+                    lookup[raw] = idx
+
+    @classmethod
+    def from_scaler(cls, scaler) -> 'CompiledEncoder':
+        """
+        Compile an encoder equivalent to get_dummies + ``scaler.transform``
+
+        The models in this repo are fit on unscaled features; serving builds
+        its encoder from churn.preprocessing.Preprocessor instead.
+        """
+        if not hasattr(scaler, 'feature_names_in_'):
+            raise ValueError("Scaler has no feature_names_in_; it must be fit on a DataFrame")
+        mean = scaler.mean_ if getattr(scaler, 'with_mean', True) else None
+        scale = scaler.scale_ if getattr(scaler, 'with_std', True) else None
+        # Value-encoding tables are stored on the scaler by churn.train
+        return cls(scaler.feature_names_in_, mean=mean, scale=scale,
+                   encodings=getattr(scaler, 'feature_encodings_', None))
+
+    # ---------- single records ----------
+    def encode_record(self, record: Dict, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Encode one raw record into a feature row
+
+        Args:
+            record: Raw customer fields (app form or API payload)
+            out: Optional preallocated row of length ``n_features`` to write into
+
+        Returns:
+            Unscaled float64 feature row
+        """
+        if out is None:
+            out = np.zeros(self.n_features, dtype=np.float64)
+        else:
+            out.fill(0.0)
+        return self._write_record(record, out, scaled=False)
+
+    def transform_record(self, record: Dict, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Encode and scale one record, equivalent to get_dummies + scaler.transform
+
+        The row is a copy of the precomputed scaled baseline with a couple of
+        dozen cells overwritten; no full-width subtract or divide is done.
+
+        Args:
+            record: Raw customer fields (app form or API payload)
+            out: Optional preallocated row of length ``n_features`` to write into
+
+        Returns:
+            Scaled float64 feature row
+        """
+        if out is None:
+            out = self.off_.copy()
+        else:
+            out[:] = self.off_
+        return self._write_record(record, out, scaled=True)
+
+    def _write_record(self, record: Dict, out: np.ndarray, scaled: bool) -> np.ndarray:
+        """Write the set one-hot cells and the numeric cells of one record into ``out``"""
+        for key, value in record.items():
+            col = self.column_lookup.get(key)
+            if col is None:
+                continue
+            categories = self.category_index.get(col)
+            if categories is not None:
+                idx = categories.get(value)
+                if idx is None and isinstance(value, str):
+                    idx = categories.get(value.replace(' ', '_'))
+                if idx is not None:
+                    out[idx] = self.on_[idx] if scaled else 1.0
+            else:
+                idx, mean, scale = self.numeric_affine[col]
+                if col in self.value_maps:
+                    number = self._encoded_value(col, value)
+                else:
+                    number = self._to_number(col, value)
+                out[idx] = (number - mean) / scale if scaled else number
+
+        return out
+
+    def _encoded_value(self, col: str, value) -> float:
+        """Number standing in for a value-encoded categorical field"""
+        number = self.value_maps[col].get(value)
+        if number is None and isinstance(value, str):
+            number = self.value_maps[col].get(value.replace(' ', '_'))
+        return self.value_defaults[col] if number is None else number
+
+    @staticmethod
+    def _to_number(col: str, value) -> float:
+        """Convert a raw numeric field the way normalize_frame does"""
+        if col == 'Phone_Service' and isinstance(value, str):
+            return PHONE_SERVICE_MAP.get(value, np.nan)
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            number = np.nan
+        if col == 'Total_Charges' and np.isnan(number):
+            # Blank Total_Charges were set to 0 in the notebook
+            return 0.0
+        return number
+
+    def encode_records(self, records: Iterable[Dict]) -> np.ndarray:
+        """Encode a list of raw records into a preallocated feature matrix"""
+        records = list(records)
+        matrix = np.zeros((len(records), self.n_features), dtype=np.float64)
+        for row, record in zip(matrix, records):
+            self._write_record(record, row, scaled=False)
+        return matrix
+
+    def transform_records(self, records: Iterable[Dict]) -> np.ndarray:
+        """Encode and scale a list of raw records into a preallocated feature matrix"""
+        records = list(records)
+        matrix = self._baseline_rows(len(records))
+        for row, record in zip(matrix, records):
+            self._write_record(record, row, scaled=True)
+        return matrix
+
+    # ---------- whole frames ----------
+    def encode_frame(self, df: 'pd.DataFrame') -> np.ndarray:
+        """
+        Encode a raw customer frame column by column
+
+        Each categorical column is factorized once and its distinct values are
+        resolved through the lookup dict, so the cost per row is a single
+        fancy-indexed write.
+
+        Args:
+            df: Raw customer records
+
+        Returns:
+            Unscaled float64 feature matrix, one row per record
+        """
+        matrix = np.zeros((len(df), self.n_features), dtype=np.float64)
+        return self._write_frame(df, matrix, scaled=False)
+
+    def transform_frame(self, df: 'pd.DataFrame') -> np.ndarray:
+        """
+        Encode and scale a whole frame
+
+        Every row starts as the scaled baseline; only the set one-hot cells and
+        the numeric columns are written, already scaled.
+        """
+        return self._write_frame(df, self._baseline_rows(len(df)), scaled=True)
+
+    def _baseline_rows(self, n_rows: int) -> np.ndarray:
+        """Writable matrix of ``n_rows`` copies of the scaled baseline"""
+        # A broadcast copy is several times faster than assigning into np.empty
+        return np.broadcast_to(self.off_, (n_rows, self.n_features)).copy()
+
+    def _write_frame(self, df: 'pd.DataFrame', matrix: np.ndarray, scaled: bool) -> np.ndarray:
+        """Write the set one-hot cells and the numeric columns of a frame into ``matrix``"""
+        rows = np.arange(len(df))
+
+        for key in df.columns:
+            col = self.column_lookup.get(str(key).strip())
+            if col is None:
+                continue
+            values = df[key]
+            categories = self.category_index.get(col)
+            if categories is not None:
+                column_idx = self._category_columns(values, categories)
+                hit = column_idx >= 0
+                column_idx = column_idx[hit]
+                matrix[rows[hit], column_idx] = self.on_[column_idx] if scaled else 1.0
+            else:
+                idx, mean, scale = self.numeric_affine[col]
+                numbers = self._column_numbers(col, values)
+                matrix[:, idx] = (numbers - mean) / scale if scaled else numbers
+
+        return matrix
+
+    @staticmethod
+    def _category_columns(values: 'pd.Series', categories: Dict[object, int]) -> np.ndarray:
+        """Column index for every row of a categorical Series, -1 when unseen"""
+        import pandas as pd
+
+        codes, uniques = pd.factorize(values)
+        lookup = np.full(len(uniques) + 1, -1, dtype=np.int64)
+        for code, value in enumerate(uniques):
+            idx = categories.get(value)
+            if idx is None and isinstance(value, str):
+                idx = categories.get(value.replace(' ', '_'))
+            if idx is not None:
+                lookup[code] = idx
+        # Missing values get code -1, which lands on the trailing -1 slot
+        return lookup[codes]
+
+    def _column_numbers(self, col: str, values: 'pd.Series') -> np.ndarray:
+        """Numeric or value-encoded column as float64"""
+        if col not in self.value_maps:
+            return self._numeric_column(col, values)
+
+        import pandas as pd
+
+        codes, uniques = pd.factorize(values)
+        lookup = np.array([self._encoded_value(col, value) for value in uniques] + [self.value_defaults[col]],
+                          dtype=np.float64)
+        # Missing values get code -1, which lands on the trailing default slot
+        return lookup[codes]
+
+    @staticmethod
+    def _numeric_column(col: str, values: 'pd.Series') -> np.ndarray:
+        """Numeric column as float64, mirroring normalize_frame"""
+        import pandas as pd
+
+        if col == 'Phone_Service' and not pd.api.types.is_numeric_dtype(values):
+            values = values.map(PHONE_SERVICE_MAP)
+        numbers = pd.to_numeric(values, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+        if col == 'Total_Charges':
+            numbers = np.where(np.isnan(numbers), 0.0, numbers)
+        return numbers
+
+    def encode_frame_sparse(self, df: 'pd.DataFrame') -> 'sparse.csr_matrix':
+        """
+        Encode a raw customer frame as CSR, storing only numeric and "on" one-hot cells
+
+        Numeric columns are always stored (missing ones as 0, like the dense
+        path) so that an absent entry always means a one-hot column that is
+        off. Memory scales with ~23 stored values per row instead of 1,177.
+
+        Args:
+            df: Raw customer records
+
+        Returns:
+            Unscaled CSR feature matrix of shape ``(len(df), n_features)``
+        """
+        from scipy import sparse
+
+        n_rows = len(df)
+        rows = np.arange(n_rows)
+        numeric = {idx: np.zeros(n_rows, dtype=np.float64) for idx in self.numeric_columns}
+        row_parts, col_parts = [], []
+
+        for key in df.columns:
+            col = self.column_lookup.get(str(key).strip())
+            if col is None:
+                continue
+            values = df[key]
+            categories = self.category_index.get(col)
+            if categories is not None:
+                column_idx = self._category_columns(values, categories)
+                hit = column_idx >= 0
+                row_parts.append(rows[hit])
+                col_parts.append(column_idx[hit])
+            else:
+                numeric[self.numeric_affine[col][0]] = self._column_numbers(col, values)
+
+        one_hot_rows = np.concatenate(row_parts) if row_parts else np.empty(0, dtype=np.int64)
+        one_hot_cols = np.concatenate(col_parts) if col_parts else np.empty(0, dtype=np.int64)
+
+        all_rows = np.concatenate([np.tile(rows, len(numeric)), one_hot_rows])
+        all_cols = np.concatenate([np.repeat(self.numeric_columns, n_rows), one_hot_cols])
+        all_data = np.concatenate(
+            [np.concatenate([numeric[idx] for idx in self.numeric_columns]) if numeric else np.empty(0),
+             np.ones(len(one_hot_rows), dtype=np.float64)]
+        )
+
+        matrix = sparse.csr_matrix((all_data, (all_rows, all_cols)), shape=(n_rows, self.n_features))
+        matrix.sort_indices()
+        return matrix
+
+    # ---------- scaling ----------
+    def scale(self, features: np.ndarray) -> np.ndarray:
+        """Apply the StandardScaler transform in place and return ``features``"""
+        if self.mean_ is not None:
+            features -= self.mean_
+        if self.scale_ is not None:
+            features /= self.scale_
+        return features
+
+    def scale_sparse(self, features: 'sparse.csr_matrix') -> 'sparse.csr_matrix':
+        """
+        Scale only the stored entries of a CSR matrix in place
+
+        Absent one-hot cells keep their implicit "off" state; the scaled value
+        they stand for is ``off_values()`` and is handled by the sparse
+        booster's default directions (see churn.sparse).
+        """
+        if self.mean_ is not None:
+            features.data -= self.mean_[features.indices]
+        if self.scale_ is not None:
+            features.data /= self.scale_[features.indices]
+        return features
+
+    def off_values(self) -> np.ndarray:
+        """Scaled value of every feature when its raw value is 0"""
+        return self.off_.copy()
+
+    def transform_frame_sparse(self, df: 'pd.DataFrame') -> 'sparse.csr_matrix':
+        """Encode and scale a whole frame as CSR"""
+        return self.scale_sparse(self.encode_frame_sparse(df))
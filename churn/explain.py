@@ -0,0 +1,269 @@
+"""
+Per-prediction explanations
+TreeSHAP contributions from XGBoost (``pred_contribs``), summed from the
+model's 1,177 columns back to the input fields they were encoded from: all
+``City_*`` columns become City, and so on. Contributions are in log-odds and
+add up, with the expected value, to the customer's score.
+
+Everything that does not depend on the customer is prepared once when the
+Explainer is built: the trees are rewritten onto the ~40 columns they
+actually split on (xgboost's TreeSHAP does work per column, and the other
+~1,130 columns contribute exactly 0), the column -> field matrix is built
+and the expected value is computed. A single explanation then costs about
+two predict calls. Exact TreeSHAP is ~0.1 ms per row for the shipped model, so
+large batches can ask for ``approximate=True`` (xgboost's ``approx_contribs``,
+per-path Saabas attributions), which costs about as much as predicting.
+
+Fields are reported as the input spelled them (``Tenure`` for a record that
+sent ``Tenure``, ``Tenure Months`` for a CSV header, see input_names), so a
+client can match each contribution to a field it sent.
+"""
+
+import json
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from churn.encoder import CompiledEncoder
+from churn.features import REQUIRED_FIELDS
+from churn.schema import CATEGORICAL_COLUMNS, COLUMN_ALIASES, NUMERIC_COLUMNS
+
+# Rows encoded and explained at a time; bounds the dense feature matrix
+EXPLAIN_CHUNK_ROWS = 4096
+
+# Contributions listed per customer in batch output
+DEFAULT_TOP_FIELDS = 3
+
+# Training column -> form/API field name, where they differ (Tenure_Months -> Tenure)
+FORM_NAMES: Dict[str, str] = {COLUMN_ALIASES[field]: field for field in REQUIRED_FIELDS if field in COLUMN_ALIASES}
+
+
+def field_groups(encoder: CompiledEncoder) -> Tuple[List[str], np.ndarray]:
+    """
+    Input field of every model column
+
+    Returns:
+        Tuple of (field names, field index per model column)
+    """
+    fields = [col for col in NUMERIC_COLUMNS if col in encoder.numeric_index]
+    fields += [col for col in CATEGORICAL_COLUMNS
+               if col in encoder.value_index or encoder.category_index.get(col)]
+    position = {field: idx for idx, field in enumerate(fields)}
+
+    column_field = np.full(encoder.n_features, -1, dtype=np.int64)
+    for col, idx in [*encoder.numeric_index.items(), *encoder.value_index.items()]:
+        column_field[idx] = position[col]
+    for col, categories in encoder.category_index.items():
+        for idx in categories.values():
+            column_field[idx] = position[col]
+    if (column_field < 0).any():
+        unknown = [encoder.feature_names[idx] for idx in np.flatnonzero(column_field < 0)[:5]]
+        raise ValueError(f"Model columns without an input field: {', '.join(unknown)}")
+    return fields, column_field
+
+
+def input_names(fields: Sequence[str], keys: Iterable, column_lookup: Mapping[str, str]) -> List[str]:
+    """
+    Field names as the input spelled them
+
+    Args:
+        fields: Training column names (``Explainer.fields``)
+        keys: Field names or column headers the input used
+        column_lookup: Raw spelling -> training column name (``encoder.column_lookup``)
+
+    Returns:
+        One name per field: the first key that resolves to it, else its
+        form name (FORM_NAMES), else the training name
+    """
+    spelled = {}
+    for key in keys:
+        col = column_lookup.get(str(key).strip())
+        if col is not None:
+            spelled.setdefault(col, str(key))
+    return [spelled.get(field, FORM_NAMES.get(field, field)) for field in fields]
+
+
+def compact_booster(booster, iteration_range: Tuple[int, int] = (0, 0)) -> Tuple[object, np.ndarray]:
+    """
+    Copy of the booster's trees rewritten onto only the columns they split on
+
+    Args:
+        booster: xgboost Booster
+        iteration_range: Trees to keep, (0, 0) for all
+
+    Returns:
+        Tuple of (compact Booster, original index of each of its columns)
+    """
+    import xgboost as xgb
+
+    start, end = iteration_range
+    if end:
+        booster = booster[start:end]
+    config = json.loads(booster.save_raw(raw_format='json'))
+    learner = config['learner']
+    trees = learner['gradient_booster']['model']['trees']
+
+    used = sorted({feature for tree in trees
+                   for feature, left in zip(tree['split_indices'], tree['left_children']) if left != -1})
+    # A forest of stumps still needs one column
+    used = np.array(used or [0], dtype=np.int64)
+    new_index = {int(old): new for new, old in enumerate(used)}
+
+    for tree in trees:
+        # Leaves carry split index 0, which may not survive; it is never read
+        tree['split_indices'] = [new_index.get(feature, 0) for feature in tree['split_indices']]
+        tree['tree_param']['num_feature'] = str(len(used))
+    learner['learner_model_param']['num_feature'] = str(len(used))
+    for key in ('feature_names', 'feature_types'):
+        if learner.get(key):
+            learner[key] = [learner[key][idx] for idx in used]
+
+    compact = xgb.Booster()
+    compact.load_model(bytearray(json.dumps(config), 'utf-8'))
+    return compact, used
+
+
+def booster_of(model) -> Tuple[object, Tuple[int, int]]:
+    """(xgboost Booster, iteration range) behind an XGBClassifier or a bundle's BoosterClassifier"""
+    if hasattr(model, 'get_booster'):
+        from churn.sparse import iteration_range
+        return model.get_booster(), iteration_range(model)
+    booster = getattr(model, 'booster', None)
+    if booster is not None and hasattr(booster, 'predict'):
+        # Bundles keep only the trees predict_proba uses
+        return booster, (0, 0)
+    raise ValueError("Explanations need an XGBoost model; this one has no booster")
+
+
+class Explainer:
+    """
+    Per-field TreeSHAP contributions for scaled feature rows
+
+    Args:
+        booster: xgboost Booster the model scores with
+        encoder: Compiled encoder the rows come from
+        iteration_range: Trees to explain, as predict_proba uses them
+    """
+
+    def __init__(self, booster, encoder: CompiledEncoder, iteration_range: Tuple[int, int] = (0, 0)):
+        self.encoder = encoder
+        self.booster, self.columns = compact_booster(booster, iteration_range)
+        self.fields, column_field = field_groups(encoder)
+        # Reported when the caller doesn't say how its input spelled them
+        self.names = [FORM_NAMES.get(field, field) for field in self.fields]
+
+        # Summing one-hot columns into fields is one small matrix product
+        self.aggregation = np.zeros((len(self.columns), len(self.fields)), dtype=np.float32)
+        self.aggregation[np.arange(len(self.columns)), column_field[self.columns]] = 1.0
+
+        # The bias column of pred_contribs is the same for every row
+        self.expected_margin = float(self._contributions(encoder.off_[None, :])[0, -1])
+        self.expected_value = float(1.0 / (1.0 + np.exp(-self.expected_margin)))
+
+    @classmethod
+    def from_model(cls, model, encoder: CompiledEncoder) -> 'Explainer':
+        """Explainer for an XGBClassifier or a bundle's BoosterClassifier"""
+        booster, iteration_range = booster_of(model)
+        return cls(booster, encoder, iteration_range)
+
+    def _contributions(self, features: np.ndarray, approximate: bool = False) -> np.ndarray:
+        import xgboost as xgb
+
+        matrix = xgb.DMatrix(np.asarray(features[:, self.columns], dtype=np.float32),
+                             feature_names=self.booster.feature_names)
+        return self.booster.predict(matrix, pred_contribs=True, approx_contribs=approximate)
+
+    def contributions(self, features: np.ndarray, approximate: bool = False) -> np.ndarray:
+        """
+        Log-odds contribution of every input field
+
+        Args:
+            features: One scaled row (1-D) or a matrix of rows (2-D)
+            approximate: Saabas attributions instead of exact TreeSHAP
+
+        Returns:
+            (rows, fields) array; each row plus ``expected_margin`` is the row's margin
+        """
+        features = np.atleast_2d(features)
+        out = np.empty((len(features), len(self.fields)), dtype=np.float64)
+        for start in range(0, len(features), EXPLAIN_CHUNK_ROWS):
+            chunk = self._contributions(features[start:start + EXPLAIN_CHUNK_ROWS], approximate)
+            out[start:start + len(chunk)] = chunk[:, :-1] @ self.aggregation
+        return out
+
+    def contributions_frame(self, df, approximate: bool = False) -> np.ndarray:
+        """Field contributions for a raw customer frame, encoded chunk by chunk"""
+        out = np.empty((len(df), len(self.fields)), dtype=np.float64)
+        for start in range(0, len(df), EXPLAIN_CHUNK_ROWS):
+            features = self.encoder.transform_frame(df.iloc[start:start + EXPLAIN_CHUNK_ROWS])
+            out[start:start + len(features)] = self.contributions(features, approximate)
+        return out
+
+    def explain(self, features: np.ndarray, top: Optional[int] = None,
+                names: Optional[Sequence[str]] = None) -> List[Dict]:
+        """
+        Explanation of every row (exact TreeSHAP), largest contributions first
+
+        Args:
+            features: One scaled row (1-D) or a matrix of rows (2-D)
+            top: Keep only this many fields per row
+            names: Name reported for each field (see input_names); form names when omitted
+
+        Returns:
+            One ``{"expected_value", "contributions": [{"field", "contribution"}, ...]}``
+            dict per row; contributions are log-odds, positive raises churn risk
+        """
+        return [
+            {
+                'expected_value': self.expected_value,
+                'contributions': [
+                    {'field': field, 'contribution': value} for field, value in self.ranked(row, top, names)
+                ],
+            }
+            for row in self.contributions(features)
+        ]
+
+    def ranked(self, contributions: np.ndarray, top: Optional[int] = None,
+               names: Optional[Sequence[str]] = None) -> List[Tuple[str, float]]:
+        """(field name, contribution) pairs of one row by decreasing magnitude"""
+        names = self.names if names is None else names
+        order = np.argsort(-np.abs(contributions), kind='stable')[:top]
+        return [(names[idx], float(contributions[idx])) for idx in order]
+
+    def churn_drivers(self, contributions: np.ndarray, top: int = DEFAULT_TOP_FIELDS,
+                      names: Optional[Sequence[str]] = None) -> List[str]:
+        """
+        The fields pushing each row hardest towards churn, e.g.
+        ``"Contract (+0.82); Tenure Months (+0.41)"``
+        """
+        names = self.names if names is None else names
+        order = np.argsort(-contributions, axis=1, kind='stable')[:, :top]
+        return [
+            '; '.join(f"{names[idx]} ({row[idx]:+.2f})" for idx in row_order if row[idx] > 0)
+            for row, row_order in zip(contributions, order)
+        ]
+
+
+def with_churn_drivers(scored, explainer: Explainer, top: int = DEFAULT_TOP_FIELDS,
+                       approximate: bool = False, column: str = 'Churn_Drivers'):
+    """
+    Copy of a scored frame with each row's top churn drivers appended
+
+    Args:
+        scored: Raw customer records (e.g. churn.batch.score_frame output)
+        explainer: Explainer for the model that scored them
+        top: Drivers listed per row
+        approximate: Saabas attributions instead of exact TreeSHAP (much faster)
+        column: Name of the appended column
+    """
+    result = scored.copy()
+    names = input_names(explainer.fields, scored.columns, explainer.encoder.column_lookup)
+    result[column] = explainer.churn_drivers(explainer.contributions_frame(scored, approximate), top, names)
+    return result
+
+
+def explain_records(explainer: Explainer, records: Sequence[Dict], top: Optional[int] = None) -> List[Dict]:
+    """Explanations for raw customer records, under the field names they were sent with"""
+    names = input_names(explainer.fields, (key for record in records for key in record),
+                        explainer.encoder.column_lookup)
+    return explainer.explain(explainer.encoder.transform_records(records), top, names)
@@ -0,0 +1,93 @@
+"""
+Input feature definitions and validation
+Shared by the Streamlit form and the HTTP prediction service; whole batches
+are validated column-wise by churn.validation with the same rules
+"""
+
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from churn.validation import BatchValidator
+
+
+def get_feature_config() -> Dict:
+    """Define all input features with their types and options"""
+    # Common US cities (representative sample)
+    cities = [
+        "Acampo", "Acton", "Adelanto", "Adin", "Agoura_Hills", "Alameda", "Alamo",
+        "Alderpoint", "Aliso_Viejo", "Altadena", "Amador_City", "Amboy", "Amherst",
+        "Amity", "Amposta", "Andover", "Angel_Fire", "Angleton", "Angwin", "Annapolis",
+        "Annville", "Anselmo", "Anthony", "Antioch", "Antler", "Anton", "Antonia",
+        "Antwine", "Antwerp", "Anvil", "Apalachia", "Apex", "Apline", "Aplington",
+        "Apodaca", "Apollinaire", "Apolo", "Apoloosa", "Apoyo", "Apoyecan", "Appalachian"
+    ]
+    
+    return {
+        "City": {"type": "categorical", "options": cities},
+        "Gender": {"type": "categorical", "options": ["Male", "Female"]},
+        "Senior_Citizen": {"type": "categorical", "options": ["No", "Yes"]},
+        "Partner": {"type": "categorical", "options": ["Yes", "No"]},
+        "Dependents": {"type": "categorical", "options": ["Yes", "No"]},
+        "Tenure": {"type": "numeric", "min": 0, "max": 72, "step": 1, "value": 0},
+        "Phone_Service": {"type": "categorical", "options": ["Yes", "No"]},
+        "Multiple_Lines": {"type": "categorical", "options": ["Yes", "No", "No_phone_service"]},
+        "Internet_Service": {"type": "categorical", "options": ["DSL", "Fiber_optic", "No"]},
+        "Online_Security": {"type": "categorical", "options": ["Yes", "No", "No_internet_service"]},
+        "Online_Backup": {"type": "categorical", "options": ["Yes", "No", "No_internet_service"]},
+        "Device_Protection": {"type": "categorical", "options": ["Yes", "No", "No_internet_service"]},
+        "Tech_Support": {"type": "categorical", "options": ["Yes", "No", "No_internet_service"]},
+        "Streaming_TV": {"type": "categorical", "options": ["Yes", "No", "No_internet_service"]},
+        "Streaming_Movies": {"type": "categorical", "options": ["Yes", "No", "No_internet_service"]},
+        "Contract": {"type": "categorical", "options": ["Month-to-month", "One_year", "Two_year"]},
+        "Paperless_Billing": {"type": "categorical", "options": ["Yes", "No"]},
+        "Payment_Method": {"type": "categorical", "options": ["Electronic_check", "Mailed_check", "Bank_transfer_(automatic)", "Credit_card_(automatic)"]},
+        "Monthly_Charges": {"type": "numeric", "min": 0.0, "max": 150.0, "step": 0.01, "value": 0.0},
+        "Total_Charges": {"type": "numeric", "min": 0.0, "max": 10000.0, "step": 0.01, "value": 0.0},
+    }
+
+
+# Fields every record must have (the form's fields), built once
+REQUIRED_FIELDS: Tuple[str, ...] = tuple(get_feature_config())
+
+# Valid range of each numeric field (None: unbounded), enforced by churn.validation
+NUMERIC_RANGES: Dict[str, Tuple[Optional[float], Optional[float]]] = {
+    "Tenure": (0, 72),
+    "Monthly_Charges": (0, None),
+    "Total_Charges": (0, None),
+}
+
+
+def validate_inputs(user_input: Dict, validator: Optional['BatchValidator'] = None) -> Tuple[bool, str]:
+    """
+    Validate user inputs
+
+    Args:
+        user_input: Raw customer fields (app form or API payload)
+        validator: churn.validation.BatchValidator whose rules the record must
+            pass, e.g. ModelVersion.validator with the model's categories;
+            without one only NUMERIC_RANGES are checked
+
+    Returns:
+        Tuple of (valid, message)
+    """
+    try:
+        # Check if all required fields are provided
+        for field in REQUIRED_FIELDS:
+            if field not in user_input or user_input[field] is None:
+                return False, f"Missing required field: {field}"
+
+        failed = (validator or _range_validator()).validate_record(user_input)
+        if failed:
+            return False, '; '.join(rule.message for rule in failed)
+        return True, "Input validation passed"
+    except Exception as e:
+        return False, f"Validation error: {e}"
+
+
+@lru_cache(maxsize=1)
+def _range_validator() -> 'BatchValidator':
+    # Imported here: churn.validation builds its rules from this module
+    from churn.validation import BatchValidator
+
+    return BatchValidator.from_ranges()
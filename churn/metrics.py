@@ -0,0 +1,223 @@
+"""
+Latency instrumentation and Prometheus metrics
+Times the prediction stages (validate_inputs, encode_and_scale_input,
+make_prediction, load_model) and counts requests and errors, rendered in the
+Prometheus text exposition format without a client library.
+
+Collection is off unless CHURN_METRICS=1 (or ``METRICS.enabled = True``);
+while off, ``METRICS.timer()`` hands back a shared no-op context manager and
+counters return immediately, so instrumented code pays a method call.
+
+Metrics are per process: with several service workers each keeps its own.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Set to 1 to collect metrics from startup
+METRICS_ENV = "CHURN_METRICS"
+
+# Latency buckets (seconds), from a dict lookup to a cold model load
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+STAGE_HISTOGRAM = "churn_stage_duration_seconds"
+
+# Counters and their help text
+COUNTERS = {
+    "churn_requests_total": "Prediction requests by source",
+    "churn_errors_total": "Failed prediction stages (invalid input or exceptions)",
+}
+
+# Shared do-nothing timer handed out while collection is off
+_NO_TIMER = nullcontext()
+
+# (name, type, help, value) produced by a collector at render time
+Sample = Tuple[str, str, str, float]
+
+
+class Histogram:
+    """Fixed-bucket histogram; counts per bucket, rendered cumulatively"""
+
+    def __init__(self, buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (inf past the last bucket)"""
+        if not self.count:
+            return 0.0
+        target, seen = q * self.count, 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+
+class _Timer:
+    """Times one stage; an exception escaping the block also counts as an error"""
+
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics: 'Metrics', stage: str):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+        if exc_type is not None:
+            self.metrics.inc("churn_errors_total", stage=self.stage)
+        return False
+
+
+class Metrics:
+    """
+    Process-wide registry of stage latencies and counters
+
+    Args:
+        enabled: Collect from the start
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.stages: Dict[str, Histogram] = {}
+        self.counters: Dict[str, Dict[Tuple[Tuple[str, str], ...], float]] = {name: {} for name in COUNTERS}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+        self._lock = threading.Lock()
+
+    def timer(self, stage: str):
+        """Context manager timing ``stage``; a shared no-op while disabled"""
+        if not self.enabled:
+            return _NO_TIMER
+        return _Timer(self, stage)
+
+    def observe(self, stage: str, seconds: float):
+        """Record one duration for ``stage``"""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, name: str, amount: float = 1.0, **labels: str):
+        """Add to a counter from COUNTERS"""
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self.counters[name]
+            series[key] = series.get(key, 0.0) + amount
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]):
+        """Register a callable whose samples are read at render time (e.g. cache counters)"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def reset(self):
+        """Drop everything collected so far (collectors stay registered)"""
+        with self._lock:
+            self.stages.clear()
+            for series in self.counters.values():
+                series.clear()
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            stages = {stage: (list(h.counts), h.sum, h.count, h.buckets) for stage, h in self.stages.items()}
+            counters = {name: dict(series) for name, series in self.counters.items()}
+            collectors = list(self._collectors)
+
+        lines = [
+            f"# HELP {STAGE_HISTOGRAM} Time spent in each prediction stage",
+            f"# TYPE {STAGE_HISTOGRAM} histogram",
+        ]
+        for stage, (counts, total, count, buckets) in sorted(stages.items()):
+            label = f'stage="{_escape(stage)}"'
+            cumulative = 0
+            for bound, bucket_count in zip(buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                lines.append(f'{STAGE_HISTOGRAM}_bucket{{{label},le="{_format_bound(bound)}"}} {cumulative}')
+            lines.append(f"{STAGE_HISTOGRAM}_sum{{{label}}} {total!r}")
+            lines.append(f"{STAGE_HISTOGRAM}_count{{{label}}} {count}")
+
+        for name, help_text in COUNTERS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for key, value in sorted(counters[name].items()):
+                lines.append(f"{name}{_format_labels(key)} {value!r}")
+
+        for collector in collectors:
+            for name, kind, help_text, value in collector():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name} {float(value)!r}")
+
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> List[Dict]:
+        """
+        Per-stage count, mean and p50/p99 in milliseconds (for the UI debug panel)
+
+        Percentiles are bucket upper bounds, not exact values.
+        """
+        with self._lock:
+            return [
+                {
+                    "stage": stage,
+                    "count": histogram.count,
+                    "mean_ms": histogram.sum / histogram.count * 1e3 if histogram.count else 0.0,
+                    "p50_ms": histogram.quantile(0.50) * 1e3,
+                    "p99_ms": histogram.quantile(0.99) * 1e3,
+                }
+                for stage, histogram in sorted(self.stages.items())
+            ]
+
+
+def cache_collector(cache) -> Callable[[], Iterable[Sample]]:
+    """Collector exposing a churn.cache.PredictionCache's counters"""
+    def collect() -> Iterable[Sample]:
+        stats = cache.stats()
+        return [
+            ("churn_cache_hits_total", "counter", "Predictions answered from the cache", stats["hits"]),
+            ("churn_cache_misses_total", "counter", "Cache lookups that had to score", stats["misses"]),
+            ("churn_cache_entries", "gauge", "Predictions currently cached in memory", stats["size"]),
+        ]
+    return collect
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(key: Tuple[Tuple[str, str], ...]) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in key) + "}"
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+# Registry shared by the app and the service
+METRICS = Metrics(enabled=os.environ.get(METRICS_ENV, "") not in ("", "0"))
@@ -0,0 +1,103 @@
+"""
+Micro-batching for concurrent single predictions
+Collects single-row requests that arrive within a short window (or until a
+row limit is hit), scores them with one predict_proba call and hands each
+caller its own result.
+"""
+
+import asyncio
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+# Defaults tuned for the ~1,200-column churn model: a 2 ms window adds little
+# to p99 but lets bursts share a single tree walk
+DEFAULT_MAX_WAIT_MS = 2.0
+DEFAULT_MAX_BATCH_SIZE = 64
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single-row predictions into batches
+
+    Args:
+        score_fn: Maps a 2-D feature matrix to a 1-D array of churn probabilities
+        max_wait_ms: How long the first queued row waits for company
+        max_batch_size: Flush as soon as this many rows are queued
+    """
+
+    def __init__(self, score_fn: Callable[[np.ndarray], np.ndarray],
+                 max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+                 max_batch_size: int = DEFAULT_MAX_BATCH_SIZE):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.score_fn = score_fn
+        self.max_wait = max(max_wait_ms, 0.0) / 1000.0
+        self.max_batch_size = max_batch_size
+
+        self._pending: List[Tuple[np.ndarray, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+        # Counters for monitoring
+        self.batches = 0
+        self.rows = 0
+
+    async def submit(self, features: np.ndarray) -> float:
+        """
+        Queue one scaled feature row and wait for its churn probability
+
+        Args:
+            features: 1-D scaled feature row
+
+        Returns:
+            Churn probability for this row
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((features, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """Hand everything queued so far to a scoring task"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._score(batch))
+        # Keep a reference so the task isn't garbage collected mid-flight
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _score(self, batch: List[Tuple[np.ndarray, asyncio.Future]]):
+        """Score a batch off the event loop and fan results back out"""
+        features = np.vstack([row for row, _ in batch])
+        try:
+            # XGBoost releases the GIL, so the loop keeps accepting requests meanwhile
+            probabilities = await asyncio.get_running_loop().run_in_executor(None, self.score_fn, features)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.rows += len(batch)
+        for (_, future), probability in zip(batch, probabilities):
+            if not future.done():
+                future.set_result(float(probability))
+
+    async def close(self):
+        """Flush queued rows and wait for in-flight batches to finish"""
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
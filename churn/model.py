@@ -0,0 +1,142 @@
+"""
+Model artifacts and prediction
+Streamlit-free loading and scoring shared by app.py and the prediction service
+"""
+
+import hashlib
+import json
+import numpy as np
+from pathlib import Path
+from typing import Dict, Tuple, Union
+
+# Directory holding XGBoost_Model.pkl, StandardScaler.pkl and LabelEncoders.pkl
+DEFAULT_ARTIFACT_DIR = Path(__file__).resolve().parent.parent
+
+# Pickled artifacts whose contents decide every prediction
+ARTIFACT_FILES = ("XGBoost_Model.pkl", "StandardScaler.pkl")
+
+# Held-out metrics of the pickled model, published next to it by churn.train
+EVALUATION_FILE = "evaluation.json"
+
+# Probability above which a customer is labelled "Churn" (what model.predict uses)
+DEFAULT_THRESHOLD = 0.5
+
+
+def load_model_and_preprocessing(base_path: Union[str, Path] = None):
+    """
+    Load pre-trained model and preprocessing objects
+
+    Args:
+        base_path: Directory with the pickled artifacts (defaults to the repo root)
+
+    Returns:
+        Tuple of (model, scaler, label_encoders)
+    """
+    # Unpickling imports xgboost and sklearn, so joblib is only pulled in here
+    import joblib
+
+    base_path = Path(base_path) if base_path is not None else DEFAULT_ARTIFACT_DIR
+
+    model = joblib.load(base_path / "XGBoost_Model.pkl")
+    scaler = joblib.load(base_path / "StandardScaler.pkl")
+    label_encoders = joblib.load(base_path / "LabelEncoders.pkl")
+
+    return model, scaler, label_encoders
+
+
+def load_scaler(base_path: Union[str, Path] = None):
+    """Load only the StandardScaler (does not import xgboost)"""
+    import joblib
+
+    base_path = Path(base_path) if base_path is not None else DEFAULT_ARTIFACT_DIR
+    return joblib.load(base_path / "StandardScaler.pkl")
+
+
+def load_evaluation(base_path: Union[str, Path] = None) -> Dict[str, float]:
+    """Held-out metrics published with the pickled model (see churn.train.evaluate); empty when there are none"""
+    base_path = Path(base_path) if base_path is not None else DEFAULT_ARTIFACT_DIR
+    try:
+        with open(base_path / EVALUATION_FILE) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def file_version(*paths: Union[str, Path]) -> str:
+    """Short content hash of a set of files, same format as a bundle version"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def artifact_version(base_path: Union[str, Path] = None) -> str:
+    """Version of the pickled model, scaler and preprocessing, for keying cached predictions"""
+    from churn.preprocessing import PREPROCESSING_FILE
+
+    base_path = Path(base_path) if base_path is not None else DEFAULT_ARTIFACT_DIR
+    paths = [base_path / name for name in ARTIFACT_FILES]
+    if (base_path / PREPROCESSING_FILE).exists():
+        paths.append(base_path / PREPROCESSING_FILE)
+    return file_version(*paths)
+
+
+def predict_churn_probability(model, scaled_features: np.ndarray) -> np.ndarray:
+    """
+    Churn (class 1) probability from a single predict_proba call
+
+    Args:
+        model: Trained XGBoost model
+        scaled_features: One scaled row (1-D) or a matrix of rows (2-D)
+
+    Returns:
+        1-D array with one churn probability per row
+    """
+    features = np.asarray(scaled_features, dtype=np.float64)
+    if features.ndim == 1:
+        features = features.reshape(1, -1)
+    return model.predict_proba(features)[:, 1]
+
+
+def labels_from_probability(churn_probability: np.ndarray,
+                            threshold: float = DEFAULT_THRESHOLD) -> np.ndarray:
+    """
+    Churn labels for an array of probabilities
+
+    A row is "Churn" when its probability is above ``threshold``; at the
+    default of 0.5 this is exactly what ``model.predict`` returns.
+    """
+    return np.where(np.asarray(churn_probability) > threshold, "Churn", "No Churn")
+
+
+def label_from_probability(churn_probability: float, threshold: float = DEFAULT_THRESHOLD) -> str:
+    """Churn label for a single probability"""
+    return "Churn" if churn_probability > threshold else "No Churn"
+
+
+def make_prediction(model, scaled_features: np.ndarray,
+                    threshold: float = DEFAULT_THRESHOLD) -> Tuple[Union[str, np.ndarray], Union[float, np.ndarray]]:
+    """
+    Make churn prediction using the model
+
+    The trees are walked once: the label is derived from the probability
+    instead of a second ``model.predict`` call.
+
+    Args:
+        model: Trained XGBoost model
+        scaled_features: Processed and scaled feature array; 1-D for one
+            customer, 2-D for a batch
+        threshold: Decision threshold on the churn probability
+
+    Returns:
+        Tuple of (prediction_label, probability) for a 1-D input, or
+        (array of labels, array of probabilities) for a 2-D input
+    """
+    churn_probability = predict_churn_probability(model, scaled_features)
+    labels = labels_from_probability(churn_probability, threshold)
+
+    if np.ndim(scaled_features) == 1:
+        return str(labels[0]), float(churn_probability[0])
+    return labels, churn_probability
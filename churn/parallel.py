@@ -0,0 +1,148 @@
+"""
+Multi-process batch scoring
+Splits a customer frame into contiguous row ranges, encodes and scores each
+range in a worker process and stitches the probabilities back together in
+input order.
+
+Workers get the model and encoder once, when the pool starts: on Linux they
+are inherited through fork (nothing is pickled), elsewhere (or once numba has
+been loaded, see _default_start_method) they are pickled once per worker. A
+worker can also open a model bundle itself, in which case every process
+memory-maps the same files. Tasks carry only the raw rows of their range,
+never the model.
+
+Each worker scores single-threaded; the pool is the parallelism.
+"""
+
+import multiprocessing
+import os
+import sys
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from churn.batch import predict_frame
+from churn.encoder import CompiledEncoder
+
+# Row ranges handed out per worker, so a slow range doesn't leave the others idle
+TASKS_PER_WORKER = 4
+
+# (model, encoder, sparse) inside a worker process
+_WORKER_STATE = None
+
+
+def partition_rows(n_rows: int, parts: int) -> List[Tuple[int, int]]:
+    """Split ``range(n_rows)`` into at most ``parts`` contiguous, non-empty (start, stop) ranges"""
+    parts = max(1, min(parts, n_rows))
+    bounds = np.linspace(0, n_rows, parts + 1).astype(np.int64)
+    return [(int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+
+def _init_worker(model, encoder: CompiledEncoder, sparse: bool,
+                 bundle_path: Optional[str], backend: str):
+    """Pool initializer: keep the scoring state in a module global"""
+    global _WORKER_STATE
+    if bundle_path is not None:
+        from churn.bundle import load_bundle
+        bundle = load_bundle(bundle_path, backend=backend)
+        model, encoder = bundle.model, bundle.encoder
+    _single_threaded(model, encoder, sparse)
+    _WORKER_STATE = (model, encoder, sparse)
+
+
+def _single_threaded(model, encoder: CompiledEncoder, sparse: bool):
+    """
+    Pin tree evaluation to one thread per worker
+
+    Besides avoiding oversubscription this keeps forked workers out of the
+    OpenMP thread pool the parent may have started, which does not survive
+    fork (a single-threaded region never touches it).
+    """
+    if hasattr(model, 'get_booster'):
+        model.get_booster().set_param({'nthread': 1})
+        if sparse:
+            from churn.sparse import sparse_booster
+            sparse_booster(model, encoder).set_param({'nthread': 1})
+    elif hasattr(getattr(model, 'booster', None), 'set_param'):
+        model.booster.set_param({'nthread': 1})
+    elif 'numba' not in sys.modules:
+        # Read when the forest's large-batch walk first imports numba
+        os.environ['NUMBA_NUM_THREADS'] = '1'
+
+
+def _default_start_method() -> str:
+    """fork where it is safe, else a fresh interpreter per worker"""
+    methods = multiprocessing.get_all_start_methods()
+    # Once numba has run a parallel loop, its TBB thread pool makes a process
+    # that forks hang at exit
+    if 'fork' in methods and 'numba' not in sys.modules:
+        return 'fork'
+    return 'forkserver' if 'forkserver' in methods else 'spawn'
+
+
+def _score_rows(rows: pd.DataFrame) -> np.ndarray:
+    model, encoder, sparse = _WORKER_STATE
+    return predict_frame(rows, model, encoder, sparse=sparse)
+
+
+class ParallelScorer:
+    """
+    Pool of scoring processes sharing one read-only model
+
+    Args:
+        model: Trained model; ignored when ``bundle_path`` is given
+        encoder: Compiled encoder for the model's scaler
+        workers: Worker processes, defaults to every core
+        sparse: Encode ranges as CSR (XGBoost models only)
+        bundle_path: Let every worker memory-map this model bundle instead
+        backend: Bundle backend, "forest" or "booster"
+        start_method: multiprocessing start method; "fork" where it is safe
+    """
+
+    def __init__(self, model=None, encoder: CompiledEncoder = None, workers: Optional[int] = None,
+                 sparse: bool = False, bundle_path: Union[str, Path] = None, backend: str = "forest",
+                 start_method: Optional[str] = None):
+        if bundle_path is None and (model is None or encoder is None):
+            raise ValueError("Either model and encoder or bundle_path is required")
+        if start_method is None:
+            start_method = _default_start_method()
+
+        self.workers = workers or os.cpu_count() or 1
+        context = multiprocessing.get_context(start_method)
+        if bundle_path is not None:
+            initargs = (None, None, sparse, str(bundle_path), backend)
+        else:
+            initargs = (model, encoder, sparse, None, backend)
+        self._pool = context.Pool(self.workers, initializer=_init_worker, initargs=initargs)
+
+    def predict_frame(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Churn probability for every row of ``df``, in input order
+
+        Args:
+            df: Raw customer records
+
+        Returns:
+            1-D array of churn probabilities
+        """
+        ranges = partition_rows(len(df), self.workers * TASKS_PER_WORKER)
+        # map() returns results in submission order, so concatenating restores the input order
+        results = self._pool.map(_score_rows, [df.iloc[start:stop] for start, stop in ranges], chunksize=1)
+        return np.concatenate(results) if results else np.empty(0, dtype=np.float32)
+
+    def close(self):
+        """Stop the workers"""
+        self._pool.close()
+        self._pool.join()
+
+    def __enter__(self) -> 'ParallelScorer':
+        return self
+
+    def __exit__(self, *exc_info):
+        if exc_info[0] is not None:
+            self._pool.terminate()
+            self._pool.join()
+        else:
+            self.close()
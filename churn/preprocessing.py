@@ -0,0 +1,291 @@
+"""
+Preprocessing that mirrors the training notebook (XGBoost.ipynb)
+Turns raw customer records into the one-hot feature frame the model was fit on.
+
+``Preprocessor`` is the fitted half: the feature names, value tables and
+input scaling a model was trained with, saved next to it as
+preprocessing.json. Training encodes through it and every serving path
+compiles its encoder from it, so they cannot drift apart.
+
+pandas is only imported by the frame functions, so loading a Preprocessor
+needs nothing beyond NumPy.
+"""
+
+import json
+import os
+from functools import cached_property
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from churn.schema import (
+    CATEGORICAL_COLUMNS,
+    COLUMN_ALIASES,
+    NUMERIC_COLUMNS,
+    PHONE_SERVICE_MAP,
+    SENIOR_CITIZEN_MAP,
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from churn.encoder import CompiledEncoder
+
+# Fitted preprocessing, next to the pickled artifacts and inside model bundles
+PREPROCESSING_FILE = 'preprocessing.json'
+
+# Bump when the file layout changes; loaders refuse files they don't understand
+PREPROCESSING_FORMAT_VERSION = 1
+
+# Rows check_parity compares by default
+PARITY_ROWS = 1_000
+
+
+def normalize_frame(df: 'pd.DataFrame') -> 'pd.DataFrame':
+    """
+    Bring a raw customer frame into the training schema
+
+    Column names get their spaces replaced by underscores and known aliases
+    renamed; categorical values get the same space-to-underscore treatment the
+    notebook applied with ``df.replace(' ', '_', regex=True)``. Categorical
+    dtype columns stay categorical.
+
+    Args:
+        df: Raw customer records (app form, CSV/Excel upload, ...)
+
+    Returns:
+        DataFrame with only the categorical and numeric training columns that
+        were present in the input
+    """
+    import pandas as pd
+
+    df = df.rename(columns=lambda c: str(c).strip().replace(' ', '_'))
+    df = df.rename(columns=COLUMN_ALIASES)
+
+    normalized = {}
+    for col in CATEGORICAL_COLUMNS:
+        if col not in df.columns:
+            continue
+        values = df[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Typed frames (churn.ingest): fix the dictionary, not every cell
+            normalized[col] = normalize_categories(col, values)
+            continue
+        if col == 'Senior_Citizen':
+            values = values.replace(SENIOR_CITIZEN_MAP)
+        normalized[col] = values.astype(str).str.replace(' ', '_', regex=False)
+
+    for col in NUMERIC_COLUMNS:
+        if col not in df.columns:
+            continue
+        values = df[col]
+        if col == 'Phone_Service' and not pd.api.types.is_numeric_dtype(values):
+            values = values.map(PHONE_SERVICE_MAP)
+        values = pd.to_numeric(values, errors='coerce')
+        if col == 'Total_Charges':
+            # Blank Total_Charges were set to 0 in the notebook
+            values = values.fillna(0.0)
+        # float32 columns of a typed frame stay float32
+        normalized[col] = values if pd.api.types.is_float_dtype(values) else values.astype(float)
+
+    return pd.DataFrame(normalized, index=df.index)
+
+
+def normalize_categories(col: str, values: 'pd.Series') -> 'pd.Series':
+    """
+    Categorical Series in the training vocabulary, normalized per dictionary entry
+
+    Spaces become underscores and Senior_Citizen's 0/1 become No/Yes, as
+    normalize_frame does cell by cell. Entries that normalize to the same
+    value ("Two words" and "Two_words") are merged and unused ones dropped.
+    Missing cells stay missing.
+    """
+    import pandas as pd
+
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype('category')
+
+    labels = pd.Index([
+        str(SENIOR_CITIZEN_MAP.get(value, value) if col == 'Senior_Citizen' else value).replace(' ', '_')
+        for value in values.cat.categories
+    ])
+    categories = labels.unique().sort_values()
+    remap = categories.get_indexer(labels)
+    codes = values.cat.codes.to_numpy()
+    codes = np.where(codes >= 0, remap[codes], -1)
+    merged = pd.Categorical.from_codes(codes, categories=categories)
+    return pd.Series(merged, index=values.index, name=values.name).cat.remove_unused_categories()
+
+
+def encode_frame(df: 'pd.DataFrame', expected_features: Optional[Sequence[str]] = None) -> 'pd.DataFrame':
+    """
+    One-hot encode a customer frame in a single vectorized pass
+
+    Args:
+        df: Raw customer records
+        expected_features: Feature names the scaler/model were fit on
+            (``scaler.feature_names_in_``); missing columns are filled with 0
+
+    Returns:
+        Float DataFrame with one row per input record
+    """
+    import pandas as pd
+
+    normalized = normalize_frame(df)
+
+    categorical = [col for col in CATEGORICAL_COLUMNS if col in normalized.columns]
+    numeric = [col for col in NUMERIC_COLUMNS if col in normalized.columns]
+
+    encoded = pd.concat(
+        [normalized[numeric], pd.get_dummies(normalized[categorical], dtype=float)],
+        axis=1
+    )
+
+    if expected_features is not None:
+        # Same columns in the same order as training, unseen categories dropped
+        encoded = encoded.reindex(columns=list(expected_features), fill_value=0.0)
+
+    return encoded.astype(np.float64)
+
+
+class Preprocessor:
+    """
+    Fitted preprocessing of one model: raw record -> model input
+
+    Args:
+        feature_names: Model input columns, in order
+        encodings: Value-encoded categorical columns (see CompiledEncoder)
+        mean: Per-feature mean subtracted from the model input; None when the
+            model was fit on unscaled features
+        scale: Per-feature divisor of the model input; None when unscaled
+    """
+
+    def __init__(self, feature_names: Sequence[str], encodings: Optional[Dict[str, Dict]] = None,
+                 mean: Optional[Sequence[float]] = None, scale: Optional[Sequence[float]] = None):
+        self.feature_names: List[str] = [str(name) for name in feature_names]
+        self.encodings: Dict[str, Dict] = dict(encodings or {})
+        self.mean = None if mean is None else np.asarray(mean, dtype=np.float64)
+        self.scale = None if scale is None else np.asarray(scale, dtype=np.float64)
+        for name, values in (('mean', self.mean), ('scale', self.scale)):
+            if values is not None and len(values) != len(self.feature_names):
+                raise ValueError(f"{name} has {len(values)} values for {len(self.feature_names)} features")
+
+    @property
+    def scaled(self) -> bool:
+        """Whether the model input is standardized"""
+        return self.mean is not None or self.scale is not None
+
+    @classmethod
+    def from_scaler(cls, scaler) -> 'Preprocessor':
+        """
+        Preprocessing of a model published before preprocessing.json existed
+
+        The notebook and churn.train fit the model on unscaled features and the
+        StandardScaler next to it, so only the scaler's feature names and value
+        tables describe the model input; its mean and scale do not.
+        """
+        if not hasattr(scaler, 'feature_names_in_'):
+            raise ValueError("Scaler has no feature_names_in_; it must be fit on a DataFrame")
+        return cls(scaler.feature_names_in_, encodings=getattr(scaler, 'feature_encodings_', None))
+
+    @cached_property
+    def encoder(self) -> 'CompiledEncoder':
+        """CompiledEncoder producing exactly the model input"""
+        from churn.encoder import CompiledEncoder
+
+        return CompiledEncoder(self.feature_names, mean=self.mean, scale=self.scale, encodings=self.encodings)
+
+    def to_dict(self) -> Dict:
+        return {
+            'format_version': PREPROCESSING_FORMAT_VERSION,
+            'feature_names': self.feature_names,
+            'encodings': self.encodings,
+            'scaling': None if not self.scaled else {
+                'mean': None if self.mean is None else self.mean.tolist(),
+                'scale': None if self.scale is None else self.scale.tolist(),
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, spec: Dict) -> 'Preprocessor':
+        version = spec.get('format_version')
+        if version != PREPROCESSING_FORMAT_VERSION:
+            raise ValueError(f"Unsupported preprocessing format version {version} "
+                             f"(expected {PREPROCESSING_FORMAT_VERSION})")
+        scaling = spec.get('scaling') or {}
+        return cls(spec['feature_names'], spec.get('encodings'), scaling.get('mean'), scaling.get('scale'))
+
+    def save(self, path: Union[str, Path]) -> Path:
+        """Write as JSON, renamed into place so readers never see half a file"""
+        path = Path(path)
+        tmp_path = path.with_name(f".{path.name}.tmp-{os.getpid()}")
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'Preprocessor':
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def load_preprocessor(base_path: Union[str, Path] = None, scaler=None) -> Preprocessor:
+    """
+    Preprocessing of the pickled model in ``base_path``
+
+    Args:
+        base_path: Directory with the artifacts (defaults to the repo root)
+        scaler: Its StandardScaler, if already loaded; only read when the
+            directory has no preprocessing.json
+
+    Returns:
+        Preprocessor
+    """
+    from churn.model import DEFAULT_ARTIFACT_DIR, load_scaler
+
+    base_path = Path(base_path) if base_path is not None else DEFAULT_ARTIFACT_DIR
+    if (base_path / PREPROCESSING_FILE).exists():
+        return Preprocessor.load(base_path / PREPROCESSING_FILE)
+    return Preprocessor.from_scaler(scaler if scaler is not None else load_scaler(base_path))
+
+
+def check_parity(preprocessor: Preprocessor, raw: 'pd.DataFrame', features, rows: int = PARITY_ROWS):
+    """
+    Check the serving encoders against the features training produced
+
+    The first ``rows`` raw records are encoded through every serving path
+    (whole frame, CSR and record by record) and compared column by column
+    with the matching training rows.
+
+    Args:
+        preprocessor: Preprocessing published with the model
+        raw: Raw customer records, as read from the training file
+        features: Model input training built for those records (dense or CSR)
+        rows: Leading rows to compare
+
+    Raises:
+        ValueError: naming the path and the columns that differ
+    """
+    raw = raw.iloc[:rows]
+    expected = features[:len(raw)]
+    expected = np.asarray(expected.toarray() if hasattr(expected, 'toarray') else expected, dtype=np.float64)
+
+    encoder = preprocessor.encoder
+    paths = {
+        'transform_frame': lambda: encoder.transform_frame(raw),
+        'transform_records': lambda: encoder.transform_records(raw.to_dict('records')),
+    }
+    if not preprocessor.scaled:
+        # Scaled CSR leaves the "off" cells to the booster's default directions
+        paths['transform_frame_sparse'] = lambda: encoder.transform_frame_sparse(raw).toarray()
+    for name, encode in paths.items():
+        actual = encode()
+        if actual.shape != expected.shape:
+            raise ValueError(f"{name} encodes to shape {actual.shape}, training to {expected.shape}")
+        differs = ~np.isclose(actual, expected, equal_nan=True).all(axis=0)
+        if differs.any():
+            columns = [preprocessor.feature_names[idx] for idx in np.flatnonzero(differs)]
+            shown = ', '.join(columns[:10]) + (f" and {len(columns) - 10} more" if len(columns) > 10 else '')
+            raise ValueError(f"{name} does not match the training features in {len(columns)} columns: {shown}")
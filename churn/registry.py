@@ -0,0 +1,394 @@
+"""
+Model registry
+Serves the active model of a versioned artifact directory and swaps in new
+versions while the process keeps running:
+
+    models/
+        CURRENT          name of the version to serve (optional)
+        50ff14b5d447/    a model bundle (churn.bundle) ...
+        2026-10-01/      ... or XGBoost_Model.pkl + StandardScaler.pkl (+ LabelEncoders.pkl)
+
+The active version is the one CURRENT names, or else the most recently
+modified version directory. Publish into the registry with
+
+    python -m churn.registry publish model_bundle --registry models
+
+which copies the directory in under its version and then rewrites CURRENT,
+each with an atomic rename, so a watcher never sees half a version.
+
+A background thread polls the directory. A new version is loaded off the
+request path, checked (bundle checksums, feature names) and scored on a
+canary batch; only then is it swapped in, with a single reference
+assignment. Callers read ``registry.current`` once per request and keep that
+ModelVersion until they are done, so in-flight work finishes on the version
+it started with. A version that fails is logged and not retried until its
+directory changes.
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import threading
+import time
+from functools import cached_property
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from churn.bundle import MANIFEST_FILE, load_bundle
+from churn.features import get_feature_config
+from churn.model import DEFAULT_THRESHOLD, artifact_version, load_evaluation, load_model_and_preprocessing
+
+logger = logging.getLogger(__name__)
+
+# Registry directory the app and the HTTP service serve from, when set
+REGISTRY_ENV = "CHURN_REGISTRY"
+
+# Names the active version when present
+CURRENT_FILE = "CURRENT"
+
+# Seconds between checks for a new version
+DEFAULT_POLL_SECONDS = 5.0
+
+# Synthetic customers every new version must score before it is swapped in
+CANARY_SIZE = 16
+
+
+class ModelVersion:
+    """
+    One loaded model version and everything needed to serve it
+
+    Args:
+        version: Content hash (bundle version or artifact hash)
+        model: Anything with predict_proba
+        encoder: CompiledEncoder the model's inputs come from
+        threshold: Decision threshold published with the model
+        path: Directory it was loaded from
+        scaler: StandardScaler, for versions loaded from pickled artifacts
+        label_encoders: LabelEncoders, for versions loaded from pickled artifacts
+        evaluation: Held-out metrics published with the model (churn.train.evaluate)
+    """
+
+    def __init__(self, version: str, model, encoder, threshold: float = DEFAULT_THRESHOLD,
+                 path: Optional[Union[str, Path]] = None, scaler=None, label_encoders=None,
+                 evaluation: Optional[Dict[str, float]] = None):
+        self.version = version
+        self.model = model
+        self.encoder = encoder
+        self.threshold = threshold
+        self.path = Path(path) if path is not None else None
+        self.scaler = scaler
+        self.label_encoders = label_encoders
+        self.evaluation = dict(evaluation or {})
+        self.loaded_at = time.time()
+
+        if getattr(model, "feature_names", None) and list(model.feature_names) != encoder.feature_names:
+            raise ValueError("Model features do not match the scaler's feature_names_in_")
+
+    @property
+    def name(self) -> str:
+        """Directory name of the version"""
+        return self.path.name if self.path is not None else self.version
+
+    @classmethod
+    def load(cls, path: Union[str, Path], backend: str = "forest", verify: bool = True) -> 'ModelVersion':
+        """
+        Load a model bundle or a directory of pickled artifacts
+
+        Args:
+            path: Version directory
+            backend: How a bundle is scored (see churn.bundle.BACKENDS)
+            verify: Check a bundle's file checksums
+        """
+        from churn.preprocessing import load_preprocessor
+
+        path = Path(path)
+        if (path / MANIFEST_FILE).exists():
+            bundle = load_bundle(path, backend=backend, verify=verify)
+            return cls(bundle.version, bundle.model, bundle.encoder, bundle.threshold, path,
+                       evaluation=bundle.evaluation)
+
+        model, scaler, label_encoders = load_model_and_preprocessing(path)
+        return cls(artifact_version(path), model, load_preprocessor(path, scaler).encoder, DEFAULT_THRESHOLD,
+                   path, scaler=scaler, label_encoders=label_encoders, evaluation=load_evaluation(path))
+
+    @cached_property
+    def explainer(self):
+        """churn.explain.Explainer for this version, or None when it has no XGBoost trees"""
+        from churn.explain import Explainer
+        from churn.trees import FlatForest
+
+        model = self.model
+        if isinstance(model, FlatForest) and self.path is not None and (self.path / MANIFEST_FILE).exists():
+            # TreeSHAP needs the trees in xgboost; the bundle ships them too
+            model = load_bundle(self.path, backend="booster").model
+        try:
+            return Explainer.from_model(model, self.encoder)
+        except ValueError:
+            return None
+
+    @cached_property
+    def validator(self):
+        """churn.validation.BatchValidator for the columns and categories this version was trained on"""
+        from churn.validation import BatchValidator
+
+        return BatchValidator.from_encoder(self.encoder)
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """Churn probability of every scaled feature row"""
+        from churn.model import predict_churn_probability
+
+        return predict_churn_probability(self.model, features)
+
+
+def canary_records(size: int = CANARY_SIZE) -> List[Dict]:
+    """
+    Deterministic synthetic customers covering every form option
+
+    Record ``i`` takes option ``i`` (wrapping around) of every categorical
+    field and spreads the numeric fields over their ranges.
+    """
+    config = get_feature_config()
+    records = []
+    for idx in range(size):
+        record = {}
+        for field, spec in config.items():
+            if spec["type"] == "categorical":
+                record[field] = spec["options"][idx % len(spec["options"])]
+            else:
+                share = idx / max(size - 1, 1)
+                record[field] = spec["min"] + share * (spec["max"] - spec["min"])
+        records.append(record)
+    return records
+
+
+def check_canary(candidate: ModelVersion, records: Sequence[Dict],
+                 active: Optional[ModelVersion] = None, max_shift: Optional[float] = None) -> np.ndarray:
+    """
+    Score the canary batch with a candidate version and raise if it looks broken
+
+    Args:
+        candidate: Version about to be swapped in
+        records: Canary customers
+        active: Version currently served, to compare against
+        max_shift: Largest mean absolute probability change against ``active``; None skips the check
+
+    Returns:
+        The candidate's canary churn probabilities
+    """
+    probabilities = np.asarray(candidate.predict_proba(candidate.encoder.transform_records(records)),
+                               dtype=np.float64)
+    if probabilities.shape != (len(records),):
+        raise ValueError(f"Canary: expected {len(records)} probabilities, got shape {probabilities.shape}")
+    if not np.isfinite(probabilities).all() or (probabilities < 0).any() or (probabilities > 1).any():
+        raise ValueError("Canary: probabilities outside [0, 1]")
+
+    if active is not None and max_shift is not None:
+        baseline = active.predict_proba(active.encoder.transform_records(records))
+        shift = float(np.mean(np.abs(probabilities - baseline)))
+        if shift > max_shift:
+            raise ValueError(f"Canary: mean probability shift {shift:.3f} against {active.name} "
+                             f"exceeds {max_shift:.3f}")
+    return probabilities
+
+
+class ModelRegistry:
+    """
+    The active version of a registry directory, reloaded in the background
+
+    Args:
+        root: Registry directory (see the module docstring)
+        backend: How bundles are scored
+        canary: Records every new version must score; None uses canary_records()
+        max_shift: See check_canary
+        poll_seconds: Interval of the background watcher
+    """
+
+    def __init__(self, root: Union[str, Path], backend: str = "forest",
+                 canary: Optional[Sequence[Dict]] = None, max_shift: Optional[float] = None,
+                 poll_seconds: float = DEFAULT_POLL_SECONDS):
+        self.root = Path(root)
+        self.backend = backend
+        self.canary = list(canary) if canary is not None else canary_records()
+        self.max_shift = max_shift
+        self.poll_seconds = poll_seconds
+
+        self._current: Optional[ModelVersion] = None
+        self._listeners: List[Callable[[ModelVersion], None]] = []
+        # Version directory -> (modification time, error) of candidates that failed
+        self.rejected: Dict[str, tuple] = {}
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def current(self) -> Optional[ModelVersion]:
+        """Version to serve; read it once per request and use that object throughout"""
+        return self._current
+
+    def add_listener(self, listener: Callable[[ModelVersion], None]):
+        """Call ``listener(version)`` with every version about to be swapped in"""
+        self._listeners.append(listener)
+
+    def target(self) -> Optional[Path]:
+        """Directory of the version that should be active"""
+        pointer = self.root / CURRENT_FILE
+        if pointer.exists():
+            name = pointer.read_text().strip()
+            return self.root / name if name else None
+        versions = [entry for entry in self.root.iterdir()
+                    if entry.is_dir() and not entry.name.startswith(".")]
+        return max(versions, key=lambda entry: entry.stat().st_mtime, default=None)
+
+    def refresh(self) -> Optional[ModelVersion]:
+        """
+        Load, check and swap in the target version if it is not active yet
+
+        Returns:
+            The version swapped in, or None when nothing changed or it failed
+        """
+        with self._refresh_lock:
+            path = self.target()
+            if path is None or not path.is_dir():
+                return None
+            active = self._current
+            if active is not None and active.path == path:
+                return None
+            mtime = path.stat().st_mtime
+            if self.rejected.get(path.name, (None,))[0] == mtime:
+                return None
+
+            started = time.perf_counter()
+            try:
+                candidate = ModelVersion.load(path, backend=self.backend)
+                check_canary(candidate, self.canary, active, self.max_shift)
+                for listener in self._listeners:
+                    listener(candidate)
+            except Exception as e:
+                self.rejected[path.name] = (mtime, str(e))
+                logger.error("Rejected model version %s: %s", path.name, e)
+                return None
+
+            self.rejected.pop(path.name, None)
+            self._current = candidate
+            logger.info("Serving model version %s (%s) after %.2fs", candidate.name, candidate.version,
+                        time.perf_counter() - started)
+            return candidate
+
+    def start(self) -> 'ModelRegistry':
+        """Load the active version now and keep watching for new ones in a daemon thread"""
+        self.refresh()
+        if self._current is None:
+            detail = "; ".join(f"{name}: {error}" for name, (_, error) in self.rejected.items())
+            raise RuntimeError(f"No loadable model version in {self.root}" + (f" ({detail})" if detail else ""))
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="model-registry", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the watcher thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.refresh()
+            except OSError as e:
+                logger.warning("Could not read model registry %s: %s", self.root, e)
+
+    def status(self) -> Dict:
+        """Active version and the versions that were rejected"""
+        active = self._current
+        return {
+            "version": active.version if active is not None else None,
+            "name": active.name if active is not None else None,
+            "loaded_at": active.loaded_at if active is not None else None,
+            "rejected": {name: error for name, (_, error) in self.rejected.items()},
+        }
+
+
+def publish(source: Union[str, Path], root: Union[str, Path], name: Optional[str] = None,
+            activate: bool = True) -> Path:
+    """
+    Copy a bundle or artifact directory into a registry
+
+    Args:
+        source: Model bundle or directory with the pickled artifacts
+        root: Registry directory
+        name: Version directory name; defaults to the content version
+        activate: Point CURRENT at the new version
+
+    Returns:
+        Path of the version directory
+    """
+    source, root = Path(source), Path(root)
+    if name is None:
+        if (source / MANIFEST_FILE).exists():
+            name = load_bundle(source).version
+        else:
+            name = artifact_version(source)
+    target = root / name
+
+    if not target.exists():
+        tmp_path = root / f".{name}.tmp-{os.getpid()}"
+        if tmp_path.exists():
+            shutil.rmtree(tmp_path)
+        try:
+            shutil.copytree(source, tmp_path)
+            os.replace(tmp_path, target)
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+    if activate:
+        pointer = root / f".{CURRENT_FILE}.tmp-{os.getpid()}"
+        pointer.write_text(f"{name}\n")
+        os.replace(pointer, root / CURRENT_FILE)
+    return target
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish and inspect model versions in a registry directory")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    publish_parser = subparsers.add_parser("publish", help="Copy a model in and make it the active version")
+    publish_parser.add_argument("source", help="Model bundle or directory with the pickled artifacts")
+    publish_parser.add_argument("--registry", required=True, help="Registry directory")
+    publish_parser.add_argument("--name", default=None, help="Version name (default: its content version)")
+    publish_parser.add_argument("--no-activate", action="store_true", help="Copy in without switching CURRENT")
+
+    activate_parser = subparsers.add_parser("activate", help="Switch CURRENT to an existing version")
+    activate_parser.add_argument("name", help="Version directory name")
+    activate_parser.add_argument("--registry", required=True, help="Registry directory")
+
+    check_parser = subparsers.add_parser("check", help="Load the target version and score the canary batch")
+    check_parser.add_argument("--registry", required=True, help="Registry directory")
+    args = parser.parse_args()
+
+    if args.command == "publish":
+        Path(args.registry).mkdir(parents=True, exist_ok=True)
+        path = publish(args.source, args.registry, name=args.name, activate=not args.no_activate)
+        print(f"Published {path}" + ("" if args.no_activate else " (active)"))
+    elif args.command == "activate":
+        source = Path(args.registry) / args.name
+        if not source.is_dir():
+            raise SystemExit(f"No version {args.name} in {args.registry}")
+        publish(source, args.registry, name=args.name)
+        print(f"Activated {source}")
+    else:
+        registry = ModelRegistry(args.registry)
+        version = registry.refresh()
+        if version is None:
+            raise SystemExit(f"Check failed: {registry.status()['rejected'] or 'no version found'}")
+        print(f"{version.name}: version {version.version}, canary of {len(registry.canary)} customers passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Column schema of the training data
+Plain constants only, so serving code can import them without pandas
+"""
+
+from typing import Dict, List
+
+# Columns that were one-hot encoded during training
+CATEGORICAL_COLUMNS: List[str] = [
+    'City', 'Gender', 'Senior_Citizen', 'Partner', 'Dependents',
+    'Multiple_Lines', 'Internet_Service', 'Online_Security',
+    'Online_Backup', 'Device_Protection', 'Tech_Support',
+    'Streaming_TV', 'Streaming_Movies', 'Contract',
+    'Paperless_Billing', 'Payment_Method'
+]
+
+# Columns that were passed to the model as plain numbers
+NUMERIC_COLUMNS: List[str] = [
+    'Zip_Code', 'Latitude', 'Longitude', 'Tenure_Months',
+    'Phone_Service', 'Monthly_Charges', 'Total_Charges'
+]
+
+# Phone_Service was manually mapped during training
+PHONE_SERVICE_MAP: Dict[str, float] = {'Yes': 1.0, 'No': 0.0}
+
+# Other spellings of the training columns: the app form and its CSV export
+# use "Tenure", and the Kaggle-style TelcoChurnDataset.csv uses CamelCase
+COLUMN_ALIASES: Dict[str, str] = {
+    'Tenure': 'Tenure_Months',
+    'tenure': 'Tenure_Months',
+    'customerID': 'CustomerID',
+    'gender': 'Gender',
+    'SeniorCitizen': 'Senior_Citizen',
+    'PhoneService': 'Phone_Service',
+    'MultipleLines': 'Multiple_Lines',
+    'InternetService': 'Internet_Service',
+    'OnlineSecurity': 'Online_Security',
+    'OnlineBackup': 'Online_Backup',
+    'DeviceProtection': 'Device_Protection',
+    'TechSupport': 'Tech_Support',
+    'StreamingTV': 'Streaming_TV',
+    'StreamingMovies': 'Streaming_Movies',
+    'PaperlessBilling': 'Paperless_Billing',
+    'PaymentMethod': 'Payment_Method',
+    'MonthlyCharges': 'Monthly_Charges',
+    'TotalCharges': 'Total_Charges',
+}
+
+# Senior_Citizen is stored as 0/1 in the Kaggle export
+SENIOR_CITIZEN_MAP: Dict[object, str] = {0: 'No', 1: 'Yes', '0': 'No', '1': 'Yes'}
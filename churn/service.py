@@ -0,0 +1,461 @@
+"""
+Headless HTTP prediction service
+JSON API for the churn model, running alongside the Streamlit UI.
+
+Run locally with N worker processes (each loads the model once on startup):
+
+    python -m churn.service --port 8000 --workers 4
+
+With --bundle, workers load a model bundle (``python -m churn.bundle``):
+memory-mapped arrays, no unpickling, and with the default forest backend
+xgboost is never imported. --forest serves trees exported by
+``python -m churn.trees`` next to the pickled scaler.
+
+Concurrent single-record requests within a worker are coalesced by a
+micro-batcher (--batch-window-ms / --max-batch-size) into one predict_proba call.
+
+Records that were scored before are answered from a per-worker LRU cache
+(--cache-size / --cache-ttl); --cache-dir adds a SQLite file shared by all
+workers. Cached entries are keyed by the model version, so a new bundle
+never serves stale results.
+
+With --metrics (or CHURN_METRICS=1) every stage is timed and /metrics
+serves Prometheus text for the worker that answers the scrape.
+
+/explain adds per-field TreeSHAP contributions (churn.explain) to the
+prediction. With the forest backend the bundle's booster is loaded for it
+on the first /explain request, so workers that only predict never import
+xgboost.
+
+With --registry, workers serve the active version of a registry directory
+(churn.registry) and pick up newly published versions without a restart:
+each is loaded and canary-checked on a background thread, then swapped in
+while requests already running finish on the version they started with.
+Every response names the version that scored it (``model_version``).
+
+Endpoints:
+    GET  /health   liveness/readiness probe, with the served model version
+    GET  /metrics  Prometheus metrics (404 unless metrics are enabled)
+    POST /predict  one record ({...}) or a batch ({"records": [...]} or [...])
+    POST /explain  same payloads; adds each record's churn drivers (?top=N fields)
+"""
+
+import argparse
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from churn.bundle import BACKENDS
+from churn.cache import DEFAULT_CACHE_SIZE, DiskCache, PredictionCache
+from churn.encoder import CompiledEncoder
+from churn.explain import input_names
+from churn.features import validate_inputs
+from churn.metrics import METRICS, METRICS_ENV, cache_collector
+from churn.microbatch import DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_WAIT_MS, MicroBatcher
+from churn.model import (
+    DEFAULT_ARTIFACT_DIR,
+    file_version,
+    label_from_probability,
+    labels_from_probability,
+    load_scaler,
+    predict_churn_probability,
+)
+from churn.preprocessing import PREPROCESSING_FILE, load_preprocessor
+from churn.registry import DEFAULT_POLL_SECONDS, REGISTRY_ENV, ModelRegistry, ModelVersion
+from churn.trees import FlatForest
+
+# Directory with the model artifacts; defaults to the repo root
+ARTIFACT_DIR_ENV = "CHURN_ARTIFACT_DIR"
+
+# Optional model bundle (churn.bundle) and the backend it is served with
+BUNDLE_ENV = "CHURN_BUNDLE"
+BACKEND_ENV = "CHURN_BACKEND"
+
+# Optional flat-array forest (churn.trees) used instead of the pickled model
+FOREST_ENV = "CHURN_FOREST"
+
+# Registry polling interval and canary tolerance (the directory is churn.registry.REGISTRY_ENV)
+REGISTRY_POLL_ENV = "CHURN_REGISTRY_POLL_SECONDS"
+CANARY_MAX_SHIFT_ENV = "CHURN_CANARY_MAX_SHIFT"
+
+# Micro-batching knobs, read by every worker process
+BATCH_WINDOW_ENV = "CHURN_BATCH_WINDOW_MS"
+MAX_BATCH_SIZE_ENV = "CHURN_MAX_BATCH_SIZE"
+
+# Decision threshold on the churn probability
+THRESHOLD_ENV = "CHURN_THRESHOLD"
+
+# Prediction cache: in-memory entries, expiry in seconds, optional shared directory
+CACHE_SIZE_ENV = "CHURN_CACHE_SIZE"
+CACHE_TTL_ENV = "CHURN_CACHE_TTL"
+CACHE_DIR_ENV = "CHURN_CACHE_DIR"
+
+# Largest batch accepted by a single /predict call
+MAX_BATCH_SIZE = 10_000
+
+
+def _load_model() -> ModelVersion:
+    """The configured model, for workers without a registry"""
+    artifact_dir = os.environ.get(ARTIFACT_DIR_ENV)
+    if os.environ.get(BUNDLE_ENV):
+        return ModelVersion.load(os.environ[BUNDLE_ENV], backend=os.environ.get(BACKEND_ENV, "forest"),
+                                 verify=False)
+    if os.environ.get(FOREST_ENV):
+        scaler = load_scaler(artifact_dir)
+        artifact_path = Path(artifact_dir) if artifact_dir else DEFAULT_ARTIFACT_DIR
+        version_files = [artifact_path / "StandardScaler.pkl", artifact_path / PREPROCESSING_FILE]
+        return ModelVersion(
+            file_version(os.environ[FOREST_ENV], *(path for path in version_files if path.exists())),
+            FlatForest.load(os.environ[FOREST_ENV]),
+            load_preprocessor(artifact_path, scaler).encoder,
+            scaler=scaler,
+        )
+    return ModelVersion.load(Path(artifact_dir) if artifact_dir else DEFAULT_ARTIFACT_DIR)
+
+
+class ServedModel:
+    """
+    A model version with its micro-batcher
+
+    Handlers read ``app.state.served`` once and use only that object, so a
+    registry swap never mixes two versions within one request.
+    """
+
+    def __init__(self, version: ModelVersion):
+        self.version = version
+        # An explicit --threshold wins over the one published with the bundle
+        self.threshold = float(os.environ.get(THRESHOLD_ENV, version.threshold))
+        self.batcher = MicroBatcher(
+            lambda features: _predict_timed(version.model, features),
+            max_wait_ms=float(os.environ.get(BATCH_WINDOW_ENV, DEFAULT_MAX_WAIT_MS)),
+            max_batch_size=int(os.environ.get(MAX_BATCH_SIZE_ENV, DEFAULT_MAX_BATCH_SIZE)),
+        )
+
+    @property
+    def model(self):
+        return self.version.model
+
+    @property
+    def encoder(self) -> CompiledEncoder:
+        return self.version.encoder
+
+
+def _predict_timed(model, features):
+    with METRICS.timer("make_prediction"):
+        return predict_churn_probability(model, features)
+
+
+@asynccontextmanager
+async def lifespan(app: Starlette):
+    """Load the model and compile the encoder once per worker process"""
+    app.state.registry = None
+    with METRICS.timer("load_model"):
+        if os.environ.get(REGISTRY_ENV):
+            max_shift = os.environ.get(CANARY_MAX_SHIFT_ENV)
+            registry = ModelRegistry(
+                os.environ[REGISTRY_ENV],
+                backend=os.environ.get(BACKEND_ENV, "forest"),
+                max_shift=float(max_shift) if max_shift else None,
+                poll_seconds=float(os.environ.get(REGISTRY_POLL_ENV, DEFAULT_POLL_SECONDS)),
+            )
+            # Runs on the watcher thread, before the new version takes requests
+            registry.add_listener(lambda version: _serve(app, version))
+            app.state.registry = registry.start()
+        else:
+            _serve(app, _load_model())
+
+    yield
+    if app.state.registry is not None:
+        app.state.registry.stop()
+    await app.state.served.batcher.close()
+
+
+def _serve(app: Starlette, version: ModelVersion):
+    """Make ``version`` the one new requests are scored with"""
+    if not isinstance(version.model, FlatForest):
+        # The NumPy forest stays xgboost-free until something asks for an explanation
+        version.explainer
+    served = ServedModel(version)
+
+    cache = getattr(app.state, "cache", None)
+    if cache is None:
+        cache_dir = os.environ.get(CACHE_DIR_ENV)
+        cache = app.state.cache = PredictionCache(
+            maxsize=int(os.environ.get(CACHE_SIZE_ENV, DEFAULT_CACHE_SIZE)),
+            ttl=float(os.environ[CACHE_TTL_ENV]) if os.environ.get(CACHE_TTL_ENV) else None,
+            version=version.version,
+            column_lookup=version.encoder.column_lookup,
+            disk=DiskCache(Path(cache_dir) / "predictions.sqlite") if cache_dir else None,
+        )
+        METRICS.add_collector(cache_collector(cache))
+
+    # Plain attribute assignments: a request sees the old or the new version, never a mix
+    app.state.served = served
+    cache.set_version(version.version)
+
+
+def _error(message: str, status_code: int = 422) -> JSONResponse:
+    return JSONResponse({"error": message}, status_code=status_code)
+
+
+def _validate_records(records: List[Dict], served: 'ServedModel') -> str:
+    """Return an error message for the first invalid record, or an empty string"""
+    with METRICS.timer("validate_inputs"):
+        for idx, record in enumerate(records):
+            if not isinstance(record, dict):
+                message = f"Record {idx}: expected a JSON object"
+                break
+            is_valid, message = validate_inputs(record, served.version.validator)
+            if not is_valid:
+                message = f"Record {idx}: {message}"
+                break
+        else:
+            return ""
+    METRICS.inc("churn_errors_total", stage="validate_inputs")
+    return message
+
+
+async def health(request: Request) -> JSONResponse:
+    """Report whether this worker has its model loaded, and which version"""
+    served = getattr(request.app.state, "served", None)
+    registry = getattr(request.app.state, "registry", None)
+    cache = getattr(request.app.state, "cache", None)
+    return JSONResponse({
+        "status": "ok" if served is not None else "loading",
+        "pid": os.getpid(),
+        "model_version": served.version.version if served is not None else None,
+        "n_features": served.encoder.n_features if served is not None else None,
+        "registry": registry.status() if registry is not None else None,
+        "cache": cache.stats() if cache is not None else None,
+    })
+
+
+async def metrics(request: Request) -> PlainTextResponse:
+    """Prometheus scrape endpoint for this worker"""
+    if not METRICS.enabled:
+        return PlainTextResponse(f"Metrics are disabled; start with --metrics or {METRICS_ENV}=1\n",
+                                 status_code=404)
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+async def predict(request: Request) -> JSONResponse:
+    """Score one customer record or a batch of them"""
+    try:
+        payload = await request.json()
+    except ValueError:
+        METRICS.inc("churn_errors_total", stage="parse_request")
+        return _error("Request body must be valid JSON", status_code=400)
+
+    # One version for the whole request, even if a new one is swapped in meanwhile
+    served = request.app.state.served
+    version = served.version.version
+    encoder = served.encoder
+    cache = request.app.state.cache
+
+    # Single record: coalesced with other in-flight requests by the micro-batcher
+    if isinstance(payload, dict) and "records" not in payload:
+        METRICS.inc("churn_requests_total", source="api_single")
+        error = _validate_records([payload], served)
+        if error:
+            return _error(error)
+        key = cache.key(payload, version)
+        probability = cache.get(key)
+        if probability is None:
+            with METRICS.timer("encode_and_scale_input"):
+                features = encoder.transform_record(payload)
+            probability = await served.batcher.submit(features)
+            cache.put(key, probability)
+        return JSONResponse({
+            "prediction": label_from_probability(probability, served.threshold),
+            "probability": probability,
+            "model_version": version,
+        })
+
+    METRICS.inc("churn_requests_total", source="api_batch")
+    records, error = _batch_records(payload, served)
+    if error is not None:
+        return error
+
+    # Batch: cached rows are reused, the rest go through one predict_proba call
+    keys = [cache.key(record, version) for record in records]
+    probabilities = [cache.get(key) for key in keys]
+    missing = [idx for idx, probability in enumerate(probabilities) if probability is None]
+    if missing:
+        with METRICS.timer("encode_and_scale_input"):
+            features = encoder.transform_records([records[idx] for idx in missing])
+        scored = _predict_timed(served.model, features)
+        for idx, probability in zip(missing, scored):
+            probabilities[idx] = float(probability)
+            cache.put(keys[idx], probabilities[idx])
+    labels = labels_from_probability(probabilities, served.threshold)
+    return JSONResponse({
+        "predictions": [
+            {"prediction": str(label), "probability": float(probability)}
+            for label, probability in zip(labels, probabilities)
+        ],
+        "model_version": version,
+    })
+
+
+def _batch_records(payload, served: 'ServedModel') -> Tuple[List[Dict], Optional[JSONResponse]]:
+    """Records of a batch payload, or the error response for a malformed or invalid one"""
+    records = payload["records"] if isinstance(payload, dict) else payload
+    if not isinstance(records, list) or not records:
+        METRICS.inc("churn_errors_total", stage="parse_request")
+        return [], _error("Expected a record object, a non-empty list or {\"records\": [...]}")
+    if len(records) > MAX_BATCH_SIZE:
+        METRICS.inc("churn_errors_total", stage="parse_request")
+        return [], _error(f"Batch too large: {len(records)} records (max {MAX_BATCH_SIZE})", status_code=413)
+
+    error = _validate_records(records, served)
+    if error:
+        return [], _error(error)
+    return records, None
+
+
+def _explain_records(served, records: List[Dict], top: Optional[int]) -> Optional[Tuple]:
+    """(probabilities, explanations) of validated records, or None when the model has no explainer"""
+    with METRICS.timer("load_explainer"):
+        # Cached on the version after the first call
+        explainer = served.version.explainer
+    if explainer is None:
+        return None
+    with METRICS.timer("encode_and_scale_input"):
+        features = served.encoder.transform_records(records)
+    probabilities = _predict_timed(served.model, features)
+    with METRICS.timer("explain"):
+        names = input_names(explainer.fields, (key for record in records for key in record),
+                            served.encoder.column_lookup)
+        explanations = explainer.explain(features, top, names)
+    return probabilities, explanations
+
+
+async def explain(request: Request) -> JSONResponse:
+    """Score records and attribute each score to the input fields"""
+    try:
+        payload = await request.json()
+        top = int(request.query_params["top"]) if "top" in request.query_params else None
+    except ValueError:
+        METRICS.inc("churn_errors_total", stage="parse_request")
+        return _error("Request body must be valid JSON and top an integer", status_code=400)
+    if top is not None and top < 0:
+        METRICS.inc("churn_errors_total", stage="parse_request")
+        return _error("top must be 0 or more", status_code=400)
+
+    # One version for validation, scoring and the explanation
+    served = request.app.state.served
+    single = isinstance(payload, dict) and "records" not in payload
+    METRICS.inc("churn_requests_total", source="api_explain")
+    if single:
+        records = [payload]
+        error = _validate_records(records, served)
+        if error:
+            return _error(error)
+    else:
+        records, response = _batch_records(payload, served)
+        if response is not None:
+            return response
+
+    # Encoding, scoring and TreeSHAP take ~1s for a large batch; off the loop,
+    # other requests keep being served meanwhile
+    explained = await asyncio.get_running_loop().run_in_executor(None, _explain_records, served, records, top)
+    if explained is None:
+        return _error("This model can't be explained; serve the pickled model or a bundle", status_code=501)
+    probabilities, explanations = explained
+
+    labels = labels_from_probability(probabilities, served.threshold)
+    version = served.version.version
+    results = [
+        {"prediction": str(label), "probability": float(probability), "model_version": version, **explanation}
+        for label, probability, explanation in zip(labels, probabilities, explanations)
+    ]
+    return JSONResponse(results[0] if single else {"explanations": results, "model_version": version})
+
+
+app = Starlette(
+    routes=[
+        Route("/health", health, methods=["GET"]),
+        Route("/metrics", metrics, methods=["GET"]),
+        Route("/predict", predict, methods=["POST"]),
+        Route("/explain", explain, methods=["POST"]),
+    ],
+    lifespan=lifespan,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the churn prediction HTTP service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes, each with its own model copy")
+    parser.add_argument("--artifact-dir", default=None, help="Directory with the model artifacts")
+    parser.add_argument("--bundle", default=None,
+                        help="Model bundle directory from 'python -m churn.bundle' (fastest startup)")
+    parser.add_argument("--backend", choices=BACKENDS, default="forest",
+                        help="How a bundle is scored: NumPy forest or native xgboost booster")
+    parser.add_argument("--forest", default=None,
+                        help="Flat-array forest from 'python -m churn.trees' (serves without xgboost)")
+    parser.add_argument("--registry", default=None,
+                        help="Registry directory from 'python -m churn.registry'; new versions are hot-swapped")
+    parser.add_argument("--poll-seconds", type=float, default=DEFAULT_POLL_SECONDS,
+                        help="How often workers check the registry for a new version")
+    parser.add_argument("--canary-max-shift", type=float, default=None,
+                        help="Reject a new version whose canary probabilities move more than this on average")
+    parser.add_argument("--batch-window-ms", type=float, default=DEFAULT_MAX_WAIT_MS,
+                        help="How long a single request waits to be batched with others")
+    parser.add_argument("--max-batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE,
+                        help="Rows per micro-batch before it is scored immediately")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE,
+                        help="Predictions cached in memory per worker (0 disables the cache)")
+    parser.add_argument("--cache-ttl", type=float, default=None,
+                        help="Seconds a cached prediction stays valid (default: until the model changes)")
+    parser.add_argument("--cache-dir", default=None,
+                        help="Directory for a prediction cache shared by all workers")
+    parser.add_argument("--metrics", action="store_true",
+                        help="Time every prediction stage and serve Prometheus text on /metrics")
+    parser.add_argument("--threshold", type=float, default=None,
+                        help="Churn probability above which a customer is labelled Churn "
+                             "(default: the bundle's threshold, else 0.5)")
+    args = parser.parse_args()
+
+    # Workers are separate processes, so settings travel through the environment
+    if args.artifact_dir:
+        os.environ[ARTIFACT_DIR_ENV] = args.artifact_dir
+    if args.bundle:
+        os.environ[BUNDLE_ENV] = str(Path(args.bundle).resolve())
+        os.environ[BACKEND_ENV] = args.backend
+    if args.forest:
+        os.environ[FOREST_ENV] = str(Path(args.forest).resolve())
+    if args.registry:
+        os.environ[REGISTRY_ENV] = str(Path(args.registry).resolve())
+        os.environ[BACKEND_ENV] = args.backend
+        os.environ[REGISTRY_POLL_ENV] = str(args.poll_seconds)
+        if args.canary_max_shift is not None:
+            os.environ[CANARY_MAX_SHIFT_ENV] = str(args.canary_max_shift)
+    os.environ[BATCH_WINDOW_ENV] = str(args.batch_window_ms)
+    os.environ[MAX_BATCH_SIZE_ENV] = str(args.max_batch_size)
+    if args.threshold is not None:
+        os.environ[THRESHOLD_ENV] = str(args.threshold)
+    os.environ[CACHE_SIZE_ENV] = str(args.cache_size)
+    if args.metrics:
+        os.environ[METRICS_ENV] = "1"
+        # Already imported in this process (by this module), so the env var alone is too late
+        METRICS.enabled = True
+    if args.cache_ttl is not None:
+        os.environ[CACHE_TTL_ENV] = str(args.cache_ttl)
+    if args.cache_dir:
+        os.environ[CACHE_DIR_ENV] = str(Path(args.cache_dir).resolve())
+
+    import uvicorn
+    uvicorn.run("churn.service:app", host=args.host, port=args.port, workers=args.workers, log_level="info")
+
+
+if __name__ == "__main__":
+    main()
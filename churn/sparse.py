@@ -0,0 +1,149 @@
+"""
+Sparse CSR scoring
+XGBoost treats cells that are absent from a CSR matrix as missing, not as 0.
+To score the one-hot block sparsely we rewrite the booster so that, for every
+split on a one-hot column, the missing-value direction is the direction the
+scaled "off" value would have taken. Dense and sparse scoring then agree.
+"""
+
+import json
+import numpy as np
+import xgboost as xgb
+from functools import lru_cache
+from scipy import sparse
+from typing import Optional, Tuple
+
+from churn.encoder import CompiledEncoder
+
+
+def iteration_range(model) -> Tuple[int, int]:
+    """Trees predict_proba would use (early stopping keeps only up to best_iteration)"""
+    best_iteration = getattr(model, 'best_iteration', None)
+    if best_iteration is None:
+        return 0, 0
+    return 0, int(best_iteration) + 1
+
+
+@lru_cache(maxsize=4)
+def sparse_booster(model, encoder: CompiledEncoder) -> xgb.Booster:
+    """
+    Copy of the model's booster with default directions fixed for one-hot columns
+
+    Args:
+        model: Trained XGBClassifier
+        encoder: Compiled encoder whose scaling the model is fed with
+
+    Returns:
+        Booster to use with CSR input from ``encoder.transform_frame_sparse``
+    """
+    booster = model.get_booster()
+    config = json.loads(booster.save_raw(raw_format='json'))
+
+    # XGBoost compares in float32: go left when value < split_condition
+    off_values = encoder.off_values().astype(np.float32)
+    one_hot_mask = encoder.one_hot_mask
+
+    for tree in config['learner']['gradient_booster']['model']['trees']:
+        split_indices = np.asarray(tree['split_indices'], dtype=np.int64)
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+        is_split = np.asarray(tree['left_children']) != -1
+        fix = is_split & one_hot_mask[split_indices]
+
+        default_left = np.asarray(tree['default_left'], dtype=np.int64)
+        default_left[fix] = off_values[split_indices[fix]] < conditions[fix]
+        tree['default_left'] = default_left.tolist()
+
+    patched = xgb.Booster()
+    patched.load_model(bytearray(json.dumps(config), 'utf-8'))
+    return patched
+
+
+# Per-node arrays of a tree in the booster's JSON dump
+_NODE_FIELDS = (
+    'base_weights', 'default_left', 'left_children', 'loss_changes', 'parents',
+    'right_children', 'split_conditions', 'split_indices', 'split_type', 'sum_hessian',
+)
+
+
+def densify_booster(booster: xgb.Booster, one_hot_mask: np.ndarray) -> xgb.Booster:
+    """
+    Booster fit on CSR input, rewritten to score one-hot columns given as dense 0/1
+
+    Fitting on ``encode_frame_sparse`` output leaves "off" one-hot cells
+    missing, so a learned one-hot split sends 1 to the left and missing to
+    the right. Each such split becomes ``value < 1`` (as a dense fit learns
+    it) with the "off" branch on the left and as the default, so dense 0/1
+    rows and CSR rows get the same predictions and the model behaves like
+    one fit densely.
+
+    Args:
+        booster: Booster trained on unscaled CSR features
+        one_hot_mask: ``encoder.one_hot_mask`` of the training encoder
+
+    Returns:
+        Rewritten copy of the booster
+    """
+    config = json.loads(booster.save_raw(raw_format='json'))
+
+    for tree in config['learner']['gradient_booster']['model']['trees']:
+        left, right = tree['left_children'], tree['right_children']
+        conditions, default_left = tree['split_conditions'], tree['default_left']
+        for node, feature in enumerate(tree['split_indices']):
+            if left[node] == -1 or not one_hot_mask[feature]:
+                continue
+            on_child = left[node] if 1.0 < conditions[node] else right[node]
+            off_child = left[node] if default_left[node] else right[node]
+            if on_child == off_child:
+                continue
+            left[node], right[node] = off_child, on_child
+            conditions[node], default_left[node] = 1.0, 1
+        _renumber_nodes(tree)
+
+    dense = xgb.Booster()
+    dense.load_model(bytearray(json.dumps(config), 'utf-8'))
+    return dense
+
+
+def _renumber_nodes(tree: dict):
+    """
+    Renumber a JSON tree breadth-first, in place
+
+    XGBoost's predictor finds the right child at ``left + 1``, so after
+    children were swapped every sibling pair must be laid out again.
+    """
+    left, right = tree['left_children'], tree['right_children']
+    order = [0]
+    for node in order:
+        if left[node] != -1:
+            order.extend((left[node], right[node]))
+    new_id = {old: new for new, old in enumerate(order)}
+    new_id[-1] = -1
+
+    for field in _NODE_FIELDS:
+        values = tree[field]
+        tree[field] = [values[old] for old in order]
+    for field in ('left_children', 'right_children'):
+        tree[field] = [new_id[child] for child in tree[field]]
+    # The root's parent is a sentinel, not a node
+    tree['parents'] = [new_id.get(parent, parent) for parent in tree['parents']]
+    tree['categories_nodes'] = [new_id[node] for node in tree.get('categories_nodes', [])]
+
+
+def predict_proba_sparse(model, encoder: CompiledEncoder, features: sparse.csr_matrix,
+                         booster: Optional[xgb.Booster] = None) -> np.ndarray:
+    """
+    Churn probability for a scaled CSR matrix
+
+    Args:
+        model: Trained XGBClassifier (for best_iteration and the booster)
+        encoder: Encoder that produced ``features``
+        features: Output of ``encoder.transform_frame_sparse``
+        booster: Precomputed ``sparse_booster(model, encoder)``
+
+    Returns:
+        Array of churn (class 1) probabilities
+    """
+    if booster is None:
+        booster = sparse_booster(model, encoder)
+    dmatrix = xgb.DMatrix(features, missing=np.nan, feature_names=encoder.feature_names)
+    return booster.predict(dmatrix, iteration_range=iteration_range(model))
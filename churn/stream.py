@@ -0,0 +1,311 @@
+"""
+Streaming batch scoring
+Scores customer files that don't fit in memory: the input is read in bounded
+chunks, each chunk goes through the same vectorized encode/scale/predict pass
+as churn.batch.score_frame, and results are appended to the output as soon as
+they are ready. Peak memory depends on the chunk size, not the file size.
+
+    python -m churn.stream customers.csv --output scored.csv --bundle model_bundle
+
+The output format follows the file name (see churn.writers): scored.csv,
+scored.csv.gz, scored.parquet (one row group per chunk) or scored.jsonl.zst.
+
+With --quarantine, every chunk is first checked by churn.validation: rows
+that fail go to that file with their errors instead of stopping the run.
+
+CSV and Parquet are read incrementally; .xlsx sheets are streamed row by row
+through openpyxl's read-only mode. Legacy .xls files have no streaming reader
+and are loaded whole.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Iterator, Optional, Union
+
+import pandas as pd
+
+from churn.batch import predict_frame, with_predictions
+from churn.encoder import CompiledEncoder
+from churn.model import DEFAULT_THRESHOLD
+from churn.preprocessing import Preprocessor, load_preprocessor
+from churn.validation import ERRORS_COLUMN, VALUE_SETS, BatchValidator
+from churn.writers import COMPRESSIONS, OUTPUT_FORMATS, ResultWriter, infer_format, open_writer
+
+# Rows per chunk; a dense chunk of 10k rows x 1,177 features is ~95 MB
+DEFAULT_CHUNK_ROWS = 10_000
+
+# Extensions accepted by iter_customer_chunks
+STREAM_EXTENSIONS = ('.csv', '.parquet', '.pq', '.xlsx', '.xls')
+
+
+class ScoringProgress:
+    """Running totals reported after every chunk"""
+
+    def __init__(self):
+        self.rows = 0
+        self.chunks = 0
+        self.churn = 0
+        self.quarantined = 0
+        self.absent = set()
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_sec(self) -> float:
+        elapsed = self.elapsed
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+    def __str__(self) -> str:
+        quarantined = f", {self.quarantined:,} quarantined" if self.quarantined else ""
+        return (f"{self.rows:,} rows in {self.chunks:,} chunks, {self.churn:,} churn{quarantined}, "
+                f"{self.elapsed:.1f}s ({self.rows_per_sec:,.0f} rows/s)")
+
+
+def iter_customer_chunks(source: Union[str, Path, BinaryIO], chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                         name: str = None) -> Iterator[pd.DataFrame]:
+    """
+    Read a customer file as a sequence of DataFrames of at most ``chunk_rows`` rows
+
+    Args:
+        source: Path or file-like object
+        chunk_rows: Maximum rows per chunk
+        name: File name used to pick the reader when ``source`` is file-like
+
+    Yields:
+        Raw customer DataFrames with a running RangeIndex
+    """
+    if chunk_rows < 1:
+        raise ValueError("chunk_rows must be at least 1")
+
+    name = name or getattr(source, 'name', None) or str(source)
+    suffix = Path(name).suffix.lower()
+
+    if suffix == '.csv':
+        with pd.read_csv(source, chunksize=chunk_rows) as reader:
+            yield from reader
+    elif suffix in ('.parquet', '.pq'):
+        yield from _iter_parquet(source, chunk_rows)
+    elif suffix == '.xlsx':
+        yield from _iter_xlsx(source, chunk_rows)
+    elif suffix == '.xls':
+        frame = pd.read_excel(source)
+        for start in range(0, len(frame), chunk_rows):
+            yield frame.iloc[start:start + chunk_rows]
+    else:
+        raise ValueError(f"Unsupported file type '{suffix}', expected one of {STREAM_EXTENSIONS}")
+
+
+def _iter_parquet(source, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Parquet record batches, converted one at a time"""
+    import pyarrow.parquet as pq
+
+    start = 0
+    for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_rows):
+        chunk = batch.to_pandas()
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        start += len(chunk)
+        yield chunk
+
+
+def _iter_xlsx(source, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """First worksheet of an .xlsx file, read row by row without loading the sheet"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(col) if col is not None else f"Unnamed: {idx}" for idx, col in enumerate(header)]
+
+        start, buffer = 0, []
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) == chunk_rows:
+                yield pd.DataFrame(buffer, columns=columns, index=pd.RangeIndex(start, start + len(buffer)))
+                start, buffer = start + len(buffer), []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns, index=pd.RangeIndex(start, start + len(buffer)))
+    finally:
+        workbook.close()
+
+
+def score_stream(source: Union[str, Path, BinaryIO], output: Union[str, Path, BinaryIO], model,
+                 scaler=None, encoder: CompiledEncoder = None,
+                 chunk_rows: int = DEFAULT_CHUNK_ROWS, sparse: Optional[bool] = None,
+                 threshold: float = DEFAULT_THRESHOLD, name: str = None,
+                 progress: Callable[[ScoringProgress], None] = None,
+                 workers: int = 1, validator: BatchValidator = None,
+                 quarantine: Union[str, Path, BinaryIO] = None, output_format: Optional[str] = None,
+                 compression: Optional[str] = None) -> ScoringProgress:
+    """
+    Score a customer file chunk by chunk and append the results to the output
+
+    Args:
+        source: Customer file (CSV, Parquet, .xlsx/.xls) or file-like object
+        output: Output path or binary file object; written incrementally
+        model: Trained XGBoost model, FlatForest or bundle model
+        scaler: StandardScaler fitted on training data (not needed with ``encoder``)
+        encoder: Compiled encoder; built from ``scaler`` when omitted
+        chunk_rows: Rows scored per chunk, bounds peak memory
+        sparse: Encode chunks as CSR; defaults to True for XGBoost models,
+            which support sparse scoring
+        threshold: Decision threshold on the churn probability
+        name: File name used to pick the reader when ``source`` is file-like
+        progress: Called with the running totals after every chunk
+        workers: Score each chunk's row ranges in this many processes
+            (see churn.parallel); None uses every core
+        validator: Set aside the rows it rejects instead of scoring them
+        quarantine: Path or binary file object for the rejected rows and
+            their errors; they are only counted when omitted
+        output_format: One of churn.writers.OUTPUT_FORMATS; taken from the
+            output path when omitted, otherwise CSV
+        compression: None, 'gzip' or 'zstd'; taken from the output path
+            when omitted
+
+    Returns:
+        Final ScoringProgress
+    """
+    if encoder is None:
+        if scaler is None:
+            raise ValueError("Either scaler or encoder is required")
+        encoder = Preprocessor.from_scaler(scaler).encoder
+    if sparse is None:
+        sparse = hasattr(model, 'get_booster')
+
+    scorer = None
+    if workers != 1:
+        from churn.parallel import ParallelScorer
+        # One pool for the whole file: workers inherit the model once
+        scorer = ParallelScorer(model, encoder, workers=workers, sparse=sparse)
+
+    stats = ScoringProgress()
+    dtypes = output_dtypes(encoder)
+    out = _open_output(output, output_format, compression, dtypes)
+    rejected_out = None
+    try:
+        if quarantine is not None:
+            rejected_out = _open_output(quarantine, None, None, dtypes)
+        for chunk in iter_customer_chunks(source, chunk_rows, name=name):
+            if validator is not None:
+                report = validator.validate(chunk)
+                stats.absent.update(report.absent)
+                chunk, rejected = report.split(chunk)
+                if not rejected.empty:
+                    if rejected_out is not None:
+                        rejected_out.write(rejected)
+                    stats.quarantined += len(rejected)
+            if chunk.empty:
+                continue
+            if scorer is not None:
+                churn_probability = scorer.predict_frame(chunk)
+            else:
+                churn_probability = predict_frame(chunk, model, encoder, sparse=sparse)
+            scored = with_predictions(chunk, churn_probability, threshold)
+            out.write(scored)
+
+            stats.rows += len(scored)
+            stats.chunks += 1
+            stats.churn += int((scored['Prediction'] == 'Churn').sum())
+            if progress is not None:
+                progress(stats)
+    finally:
+        out.close()
+        if rejected_out is not None:
+            rejected_out.close()
+        if scorer is not None:
+            scorer.close()
+
+    if stats.rows == 0:
+        if stats.quarantined:
+            raise ValueError(f"No valid customer records: all {stats.quarantined:,} failed validation")
+        raise ValueError("No customer records to score")
+    return stats
+
+
+def output_dtypes(encoder: CompiledEncoder) -> Dict[str, str]:
+    """
+    Output column types known before the first chunk is read, in every raw spelling
+
+    Chunks are read separately, so pandas may type the same column as numbers
+    in one and as text in the next (the Telco export's blank " " charges).
+    The columns the model reads as numbers are float64; labels are strings.
+    """
+    dtypes = {'Prediction': 'string', 'Probability': 'float64', ERRORS_COLUMN: 'string'}
+    for spelling, col in encoder.column_lookup.items():
+        numeric = col in encoder.numeric_index and col not in VALUE_SETS
+        dtypes[spelling] = 'float64' if numeric else 'string'
+    return dtypes
+
+
+def _open_output(target: Union[str, Path, BinaryIO], output_format: Optional[str],
+                 compression: Optional[str], dtypes: Dict[str, str] = None) -> ResultWriter:
+    """Writer for a path (format from its name unless given) or a file object; CSV when neither says"""
+    if output_format is None:
+        try:
+            output_format, inferred = infer_format(target)
+            compression = compression or inferred
+        except (TypeError, ValueError):
+            output_format = 'csv'
+    return open_writer(target, output_format, compression, dtypes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a customer file of any size in bounded chunks")
+    parser.add_argument("input", help="Customer file (.csv, .parquet, .xlsx, .xls)")
+    parser.add_argument("--output", required=True,
+                        help="Scored file to write: .csv, .parquet or .jsonl, optionally + .gz/.zst")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default=None,
+                        help="Output format when the file name doesn't say")
+    parser.add_argument("--compression", choices=COMPRESSIONS, default=None,
+                        help="Compress the output (Parquet: page codec)")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="Rows scored per chunk")
+    parser.add_argument("--artifact-dir", default=None, help="Directory with the model artifacts")
+    parser.add_argument("--bundle", default=None, help="Model bundle directory from 'python -m churn.bundle'")
+    parser.add_argument("--backend", choices=("forest", "booster"), default="forest",
+                        help="How a bundle is scored: NumPy forest or native xgboost booster")
+    parser.add_argument("--threshold", type=float, default=None,
+                        help="Churn probability above which a customer is labelled Churn")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Scoring processes (0 = one per core)")
+    parser.add_argument("--quarantine", default=None,
+                        help="Validate every row; write the ones that fail to this file instead of scoring them")
+    parser.add_argument("--quiet", action="store_true", help="Don't report progress")
+    args = parser.parse_args()
+
+    if args.bundle:
+        from churn.bundle import load_bundle
+        bundle = load_bundle(args.bundle, backend=args.backend)
+        model, scaler, encoder = bundle.model, None, bundle.encoder
+        threshold = bundle.threshold if args.threshold is None else args.threshold
+    else:
+        from churn.model import load_model_and_preprocessing
+        model, scaler, _ = load_model_and_preprocessing(args.artifact_dir)
+        encoder = load_preprocessor(args.artifact_dir, scaler).encoder
+        threshold = DEFAULT_THRESHOLD if args.threshold is None else args.threshold
+
+    def report(stats: ScoringProgress):
+        print(f"\r{stats}", end="", file=sys.stderr, flush=True)
+
+    stats = score_stream(args.input, args.output, model, scaler, encoder,
+                         chunk_rows=args.chunk_rows, threshold=threshold,
+                         progress=None if args.quiet else report,
+                         workers=args.workers or None,
+                         validator=BatchValidator.from_encoder(encoder) if args.quarantine else None,
+                         quarantine=args.quarantine, output_format=args.format,
+                         compression=args.compression)
+    if not args.quiet:
+        print(file=sys.stderr)
+    if stats.absent:
+        print(f"Warning: no {', '.join(sorted(stats.absent))} column; scored as unknown", file=sys.stderr)
+    print(f"Wrote {args.output}: {stats}")
+
+
+if __name__ == "__main__":
+    main()
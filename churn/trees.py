@@ -0,0 +1,246 @@
+"""
+Flat-array tree inference
+Exports the trained booster to plain NumPy arrays and evaluates it without
+xgboost, so serving workers can skip importing and unpickling the runtime.
+
+Export once (needs xgboost):
+
+    python -m churn.trees --output XGBoost_Model.forest.npz
+
+Serve with ``FlatForest.load(path)``, a drop-in for the model in
+``predict_churn_probability``/``make_prediction``. Large batches are walked
+with numba when it is installed; everything else uses a vectorized NumPy walk.
+"""
+
+import argparse
+import json
+from pathlib import Path
+from typing import Dict, Union
+
+import numpy as np
+
+# File format version stored alongside the arrays
+FOREST_FORMAT_VERSION = 1
+
+# Rows evaluated at once by the NumPy walk, bounds the (rows x trees) work arrays
+CHUNK_ROWS = 65_536
+
+# Batches at least this large use the numba walk (importing and loading the
+# jitted code costs a few hundred ms, not worth it for single requests)
+NUMBA_MIN_ROWS = 1_024
+
+# Array names written by export_forest, in FlatForest constructor order
+FOREST_ARRAYS = ('roots', 'left', 'right', 'feature', 'threshold', 'default_left', 'value')
+
+
+def forest_arrays(model) -> Dict[str, np.ndarray]:
+    """
+    Flatten the trees predict_proba uses into NumPy arrays
+
+    Args:
+        model: Trained XGBClassifier (binary:logistic)
+
+    Returns:
+        Dict with the FOREST_ARRAYS plus ``max_depth``, ``base_margin`` and
+        ``feature_names``
+    """
+    # Imported here so serving code can use FlatForest without xgboost
+    from churn.sparse import iteration_range
+
+    booster = model.get_booster()
+    config = json.loads(booster.save_raw(raw_format='json'))
+    learner = config['learner']
+
+    objective = learner['objective']['name']
+    if objective != 'binary:logistic':
+        raise ValueError(f"Only binary:logistic models can be exported, got {objective}")
+
+    gbtree = learner['gradient_booster']
+    if gbtree.get('name') != 'gbtree':
+        raise ValueError(f"Only gbtree boosters can be exported, got {gbtree.get('name')}")
+    trees = gbtree['model']['trees']
+
+    # Early stopping: keep only the trees predict_proba would use
+    _, end = iteration_range(model)
+    if end:
+        trees = trees[:end]
+
+    roots, left, right, feature, threshold, default_left, value = [], [], [], [], [], [], []
+    offset = 0
+    for tree in trees:
+        left_children = np.asarray(tree['left_children'], dtype=np.int64)
+        right_children = np.asarray(tree['right_children'], dtype=np.int64)
+        is_leaf = left_children == -1
+
+        roots.append(offset)
+        # Leaves point at themselves so a fixed number of steps is always safe
+        own_index = np.arange(len(left_children)) + offset
+        left.append(np.where(is_leaf, own_index, left_children + offset))
+        right.append(np.where(is_leaf, own_index, right_children + offset))
+        feature.append(np.where(is_leaf, 0, tree['split_indices']))
+        # For leaves XGBoost stores the leaf value in split_conditions
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+        threshold.append(np.where(is_leaf, np.float32(0), conditions))
+        value.append(np.where(is_leaf, conditions, np.float32(0)))
+        default_left.append(np.asarray(tree['default_left'], dtype=bool))
+        offset += len(left_children)
+
+    base_score = float(np.asarray(json.loads(learner['learner_model_param']['base_score'])).ravel()[0])
+
+    return {
+        'roots': np.asarray(roots, dtype=np.int32),
+        'left': np.concatenate(left).astype(np.int32),
+        'right': np.concatenate(right).astype(np.int32),
+        'feature': np.concatenate(feature).astype(np.int32),
+        'threshold': np.concatenate(threshold).astype(np.float32),
+        'default_left': np.concatenate(default_left),
+        'value': np.concatenate(value).astype(np.float32),
+        'max_depth': _max_depth(trees),
+        'base_margin': float(np.log(base_score / (1.0 - base_score))),
+        'feature_names': np.asarray(booster.feature_names or [], dtype=str),
+    }
+
+
+def export_forest(model, path: Union[str, Path]) -> Path:
+    """
+    Dump the trees predict_proba uses into a flat ``.npz`` file
+
+    Args:
+        model: Trained XGBClassifier (binary:logistic)
+        path: Output file
+
+    Returns:
+        Path of the written file
+    """
+    arrays = forest_arrays(model)
+    arrays['format_version'] = np.int64(FOREST_FORMAT_VERSION)
+    arrays['max_depth'] = np.int64(arrays['max_depth'])
+    arrays['base_margin'] = np.float64(arrays['base_margin'])
+
+    path = Path(path)
+    np.savez(path, **arrays)
+    # np.savez appends .npz when it is missing
+    return path if path.suffix == '.npz' else path.with_name(path.name + '.npz')
+
+
+def _max_depth(trees) -> int:
+    """Deepest root-to-leaf path over all trees"""
+    deepest = 0
+    for tree in trees:
+        left_children, right_children = tree['left_children'], tree['right_children']
+        stack = [(0, 0)]
+        while stack:
+            node, depth = stack.pop()
+            if left_children[node] == -1:
+                deepest = max(deepest, depth)
+            else:
+                stack.append((left_children[node], depth + 1))
+                stack.append((right_children[node], depth + 1))
+    return deepest
+
+
+class FlatForest:
+    """
+    Tree ensemble evaluated from flat arrays
+
+    Mirrors XGBoost's routing: features are compared in float32, a row goes
+    left when ``value < threshold`` and NaN follows the default direction.
+    """
+
+    def __init__(self, roots, left, right, feature, threshold, default_left, value,
+                 max_depth: int, base_margin: float, feature_names=()):
+        self.roots = np.ascontiguousarray(roots, dtype=np.int32)
+        self.left = np.ascontiguousarray(left, dtype=np.int32)
+        self.right = np.ascontiguousarray(right, dtype=np.int32)
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float32)
+        self.default_left = np.ascontiguousarray(default_left, dtype=bool)
+        self.value = np.ascontiguousarray(value, dtype=np.float32)
+        self.max_depth = int(max_depth)
+        self.base_margin = float(base_margin)
+        self.feature_names = [str(name) for name in feature_names]
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'FlatForest':
+        """Load a forest written by export_forest"""
+        with np.load(path) as data:
+            version = int(data['format_version'])
+            if version != FOREST_FORMAT_VERSION:
+                raise ValueError(f"Unsupported forest format version {version}")
+            return cls(
+                *(data[name] for name in FOREST_ARRAYS),
+                max_depth=int(data['max_depth']),
+                base_margin=float(data['base_margin']),
+                feature_names=data['feature_names'],
+            )
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def predict_margin(self, features: np.ndarray) -> np.ndarray:
+        """Raw log-odds for each row of a dense feature matrix"""
+        features = np.ascontiguousarray(np.atleast_2d(features), dtype=np.float32)
+        walk = _numba_walk() if len(features) >= NUMBA_MIN_ROWS else None
+        if walk is not None:
+            leaf_sum = walk(features, self.roots, self.left, self.right, self.feature,
+                            self.threshold, self.default_left, self.value, self.max_depth)
+        else:
+            leaf_sum = np.concatenate([
+                self._walk_numpy(features[start:start + CHUNK_ROWS])
+                for start in range(0, len(features), CHUNK_ROWS)
+            ]) if len(features) else np.empty(0, dtype=np.float64)
+        return self.base_margin + leaf_sum
+
+    def _walk_numpy(self, features: np.ndarray) -> np.ndarray:
+        """Advance every (row, tree) pair one level per step, all at once"""
+        rows = np.arange(len(features))[:, None]
+        node = np.broadcast_to(self.roots, (len(features), self.n_trees)).copy()
+        for _ in range(self.max_depth):
+            values = features[rows, self.feature[node]]
+            go_left = np.where(np.isnan(values), self.default_left[node], values < self.threshold[node])
+            node = np.where(go_left, self.left[node], self.right[node])
+        return self.value[node].sum(axis=1, dtype=np.float64)
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """Class probabilities, shaped like XGBClassifier.predict_proba"""
+        churn_probability = 1.0 / (1.0 + np.exp(-self.predict_margin(features)))
+        churn_probability = churn_probability.astype(np.float32)
+        return np.column_stack([1.0 - churn_probability, churn_probability])
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """Class labels, like XGBClassifier.predict"""
+        return (self.predict_proba(features)[:, 1] > 0.5).astype(np.int64)
+
+
+# Jitted walk, loaded on first large batch; False when numba isn't installed
+_NUMBA_WALK = None
+
+
+def _numba_walk():
+    """The numba tree walk, or None when numba is unavailable"""
+    global _NUMBA_WALK
+    if _NUMBA_WALK is None:
+        try:
+            from churn._trees_numba import walk_rows
+        except ImportError:  # numba is optional
+            _NUMBA_WALK = False
+        else:
+            _NUMBA_WALK = walk_rows
+    return _NUMBA_WALK or None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export XGBoost_Model.pkl to a flat-array forest")
+    parser.add_argument("--artifact-dir", default=None, help="Directory with the model artifacts")
+    parser.add_argument("--output", default="XGBoost_Model.forest.npz", help="Forest file to write")
+    args = parser.parse_args()
+
+    from churn.model import load_model_and_preprocessing
+    model, _, _ = load_model_and_preprocessing(args.artifact_dir)
+    path = export_forest(model, args.output)
+    print(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
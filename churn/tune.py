@@ -0,0 +1,360 @@
+"""
+Hyperparameter search
+Random search or successive halving over max_depth, learning_rate and
+scale_pos_weight, with trials run in parallel processes and early stopping
+inside every trial.
+
+    python -m churn.tune Telco_customer_churn.csv --trials 27 --output-dir . --bundle model_bundle
+
+Successive halving starts every sampled configuration on a small round
+budget and only lets the best third continue on three times the budget, up
+to ``--max-rounds``; random search gives every trial the full budget. Trials
+are scored on a validation split carved out of the training rows, so the
+test rows stay untouched until the winner is refit and published through
+churn.train.
+
+Every finished trial is appended to ``trials.jsonl`` in the study directory.
+Rerunning the same command resumes an interrupted search where it stopped.
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from churn.model import DEFAULT_ARTIFACT_DIR, DEFAULT_THRESHOLD, file_version
+from churn.train import (
+    CITY_ENCODINGS,
+    DEFAULT_CACHE_DIR,
+    DEFAULT_PARAMS,
+    TrainingData,
+    booster_params,
+    load_training_data,
+    split_rows,
+    train,
+    training_matrices,
+)
+
+# Trials, one JSON line each, and the settings they were run with
+DEFAULT_STUDY_DIR = DEFAULT_ARTIFACT_DIR / '.tuning'
+TRIALS_FILE = 'trials.jsonl'
+STUDY_FILE = 'study.json'
+
+STRATEGIES = ('halving', 'random')
+
+# Sampled ranges; learning_rate is drawn log-uniformly and scale_pos_weight
+# up to 1.5x the negative/positive ratio of the training rows
+MAX_DEPTH_RANGE = (3, 10)
+LEARNING_RATE_RANGE = (0.01, 0.3)
+SCALE_POS_WEIGHT_MAX = 1.5
+
+# Budget growth (and survivor share) between successive halving rungs
+HALVING_FACTOR = 3
+
+# Share of the training rows held out to score trials
+VALIDATION_SIZE = 0.2
+
+# (dtrain, dvalid) inside a worker process
+_WORKER_STATE = None
+
+
+def sample_params(n_trials: int, target: np.ndarray, seed: int = 0) -> List[Dict]:
+    """
+    Draw ``n_trials`` configurations; the same seed and labels always give the same list
+
+    Args:
+        n_trials: Configurations to draw
+        target: Training labels, for the scale_pos_weight range
+        seed: Random seed
+
+    Returns:
+        XGBClassifier parameter dicts
+    """
+    rng = np.random.default_rng(seed)
+    positives = max(int(target.sum()), 1)
+    pos_weight_max = SCALE_POS_WEIGHT_MAX * (len(target) - positives) / positives
+
+    low, high = np.log(LEARNING_RATE_RANGE[0]), np.log(LEARNING_RATE_RANGE[1])
+    return [
+        {
+            'max_depth': int(rng.integers(MAX_DEPTH_RANGE[0], MAX_DEPTH_RANGE[1] + 1)),
+            'learning_rate': round(float(np.exp(rng.uniform(low, high))), 4),
+            'scale_pos_weight': round(float(rng.uniform(1.0, max(pos_weight_max, 1.0))), 3),
+        }
+        for _ in range(n_trials)
+    ]
+
+
+def round_budgets(strategy: str, min_rounds: int, max_rounds: int) -> List[int]:
+    """Boosting rounds allowed at each rung, e.g. [30, 90, 270, 810]"""
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{strategy}', expected one of {STRATEGIES}")
+    if strategy == 'random' or min_rounds >= max_rounds:
+        return [max_rounds]
+    budgets = [min_rounds]
+    while budgets[-1] < max_rounds:
+        budgets.append(min(budgets[-1] * HALVING_FACTOR, max_rounds))
+    return budgets
+
+
+class Study:
+    """
+    Trials of one search, persisted as JSON lines
+
+    Args:
+        path: Study directory
+        settings: What the trials depend on (data version, seed, budgets, ...);
+            a directory holding trials run with other settings is refused
+        fresh: Drop any trials already in the directory
+    """
+
+    def __init__(self, path: Union[str, Path], settings: Dict, fresh: bool = False):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.settings = settings
+
+        study_file, trials_file = self.path / STUDY_FILE, self.path / TRIALS_FILE
+        if fresh:
+            for stale in (study_file, trials_file):
+                if stale.exists():
+                    stale.unlink()
+        if study_file.exists():
+            with open(study_file) as f:
+                previous = json.load(f)
+            if previous != settings:
+                raise ValueError(f"{self.path} holds a search with different settings; "
+                                 "pass --fresh or use another --study-dir")
+        else:
+            with open(study_file, 'w') as f:
+                json.dump(settings, f, indent=2)
+
+        self.results: Dict[Tuple[int, int], Dict] = {}
+        if trials_file.exists():
+            text = trials_file.read_text()
+            lines = text.splitlines()
+            if not text.endswith('\n') and lines:
+                # A crash mid-write leaves a partial last line; drop it before appending
+                lines.pop()
+                trials_file.write_text(''.join(line + '\n' for line in lines))
+            for line in lines:
+                result = json.loads(line)
+                self.results[(result['trial'], result['rung'])] = result
+
+    def record(self, result: Dict):
+        """Append one finished trial, flushed before the next one is started"""
+        self.results[(result['trial'], result['rung'])] = result
+        with open(self.path / TRIALS_FILE, 'a') as f:
+            f.write(json.dumps(result) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def rung(self, rung: int) -> List[Dict]:
+        return sorted((r for (_, level), r in self.results.items() if level == rung),
+                      key=lambda r: r['trial'])
+
+    def best(self) -> Dict:
+        """Best trial of the highest rung that has any"""
+        top = max(level for _, level in self.results)
+        return _ranked(self.rung(top))[0]
+
+
+def _ranked(results: List[Dict]) -> List[Dict]:
+    """Best validation score first, ties broken by trial number"""
+    return sorted(results, key=lambda r: (-r['score'], r['trial']))
+
+
+def _init_worker(data: TrainingData, fit_rows: np.ndarray, valid_rows: np.ndarray):
+    """Pool initializer: build the trial matrices once per process"""
+    global _WORKER_STATE
+    _WORKER_STATE = training_matrices(data, fit_rows, valid_rows, DEFAULT_PARAMS['tree_method'])
+
+
+def _run_trial(task: Tuple[int, int, int, Dict, int]) -> Dict:
+    import xgboost as xgb
+
+    trial, rung, rounds, params, n_jobs = task
+    dtrain, dvalid = _WORKER_STATE
+    model = xgb.XGBClassifier(**{**DEFAULT_PARAMS, **params, 'n_jobs': n_jobs})
+
+    started = time.perf_counter()
+    booster = xgb.train(
+        booster_params(model),
+        dtrain,
+        num_boost_round=rounds,
+        evals=[(dvalid, 'validation')],
+        early_stopping_rounds=model.early_stopping_rounds,
+        verbose_eval=False,
+    )
+    return {
+        'trial': trial,
+        'rung': rung,
+        'rounds': rounds,
+        'params': params,
+        'score': float(booster.best_score),
+        'best_iteration': int(booster.best_iteration),
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def search(data: TrainingData, study_dir: Union[str, Path] = DEFAULT_STUDY_DIR,
+           n_trials: int = 27, strategy: str = 'halving', min_rounds: int = 30,
+           max_rounds: int = 810, workers: Optional[int] = None, seed: int = 0,
+           data_version: str = '', fresh: bool = False,
+           progress=None) -> Study:
+    """
+    Run (or resume) a search
+
+    Args:
+        data: Encoded training set
+        study_dir: Where trials are persisted
+        n_trials: Configurations sampled
+        strategy: "halving" or "random"
+        min_rounds: Round budget of the first halving rung
+        max_rounds: Round budget of the last rung (every trial for "random")
+        workers: Trials run at once, defaults to every core; the cores are
+            split evenly between them
+        seed: Sampling seed
+        data_version: Identifies ``data`` in the study settings
+        fresh: Discard trials from an earlier run
+        progress: Called with every finished trial
+
+    Returns:
+        The Study with every result
+    """
+    global _WORKER_STATE
+
+    train_rows, _ = split_rows(data.target)
+    fit_idx, valid_idx = split_rows(data.target[train_rows], test_size=VALIDATION_SIZE)
+    fit_rows, valid_rows = train_rows[fit_idx], train_rows[valid_idx]
+
+    candidates = sample_params(n_trials, data.target[fit_rows], seed)
+    budgets = round_budgets(strategy, min_rounds, max_rounds)
+    settings = {
+        'data_version': data_version,
+        'strategy': strategy,
+        'n_trials': n_trials,
+        'budgets': budgets,
+        'seed': seed,
+        'base_params': dict(DEFAULT_PARAMS),
+    }
+    study = Study(study_dir, settings, fresh=fresh)
+
+    cores = os.cpu_count() or 1
+    workers = max(1, min(workers or cores, n_trials))
+    n_jobs = max(1, cores // workers)
+
+    pool = None
+    if workers > 1:
+        # Workers inherit the training set through fork where available
+        method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+        pool = multiprocessing.get_context(method).Pool(
+            workers, initializer=_init_worker, initargs=(data, fit_rows, valid_rows))
+    try:
+        survivors = list(range(n_trials))
+        for rung, rounds in enumerate(budgets):
+            if rung > 0:
+                keep = max(1, math.ceil(len(survivors) / HALVING_FACTOR))
+                survivors = [r['trial'] for r in _ranked(study.rung(rung - 1))[:keep]]
+
+            tasks = [(trial, rung, rounds, candidates[trial], n_jobs)
+                     for trial in survivors if (trial, rung) not in study.results]
+            if not tasks:
+                continue
+            if pool is None:
+                if _WORKER_STATE is None:
+                    _init_worker(data, fit_rows, valid_rows)
+                results = map(_run_trial, tasks)
+            else:
+                results = pool.imap_unordered(_run_trial, tasks)
+            for result in results:
+                study.record(result)
+                if progress is not None:
+                    progress(result)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        _WORKER_STATE = None
+
+    return study
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune the churn model and publish the best configuration")
+    parser.add_argument("data", help="Raw customer file with the churn label (.csv, .parquet, .xlsx)")
+    parser.add_argument("--strategy", choices=STRATEGIES, default="halving", help="Search strategy")
+    parser.add_argument("--trials", type=int, default=27, help="Configurations to sample")
+    parser.add_argument("--min-rounds", type=int, default=30, help="Round budget of the first halving rung")
+    parser.add_argument("--max-rounds", type=int, default=810, help="Round budget of the last rung")
+    parser.add_argument("--workers", type=int, default=0, help="Trials run at once (0 = one per core)")
+    parser.add_argument("--seed", type=int, default=0, help="Sampling seed")
+    parser.add_argument("--study-dir", default=str(DEFAULT_STUDY_DIR), help="Where trials are persisted")
+    parser.add_argument("--fresh", action="store_true", help="Discard trials from an earlier run")
+    parser.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR), help="Preprocessing cache directory")
+    parser.add_argument("--output-dir", default=None,
+                        help="Directory for the best model's pickled artifacts ('.' replaces the ones app.py serves)")
+    parser.add_argument("--no-artifacts", action="store_true", help="Don't write the pickled artifacts")
+    parser.add_argument("--bundle", default=None, help="Also write a model bundle to this directory")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Decision threshold to publish with the bundle")
+    parser.add_argument("--city-encoding", choices=CITY_ENCODINGS, default="onehot",
+                        help="One-hot City columns, or a single frequency/target-encoded column")
+    args = parser.parse_args()
+    if args.output_dir is None and not args.no_artifacts:
+        # No default: the repo root holds the artifacts app.py serves
+        parser.error("--output-dir is required unless --no-artifacts is given")
+
+    data, _ = load_training_data(args.data, args.cache_dir, args.city_encoding)
+    # Trials on differently encoded features are not comparable
+    data_version = file_version(args.data)
+    if args.city_encoding != 'onehot':
+        data_version = f"{data_version}-{args.city_encoding}"
+
+    def report(result: Dict):
+        print(f"rung {result['rung']} trial {result['trial']:>3}: {result['score']:.4f} "
+              f"({result['best_iteration'] + 1}/{result['rounds']} rounds, {result['seconds']:.1f}s) "
+              f"{result['params']}")
+
+    study = search(
+        data,
+        study_dir=args.study_dir,
+        n_trials=args.trials,
+        strategy=args.strategy,
+        min_rounds=args.min_rounds,
+        max_rounds=args.max_rounds,
+        workers=args.workers or None,
+        seed=args.seed,
+        data_version=data_version,
+        fresh=args.fresh,
+        progress=report,
+    )
+    best = study.best()
+    metric = DEFAULT_PARAMS['eval_metric']
+    print(f"Best trial {best['trial']}: validation {metric} {best['score']:.4f} with {best['params']}")
+    with open(Path(args.study_dir) / 'best.json', 'w') as f:
+        json.dump(best, f, indent=2)
+
+    # Refit on all training rows with the winning configuration and its round budget
+    result = train(
+        args.data,
+        output_dir=None if args.no_artifacts else args.output_dir,
+        bundle=args.bundle,
+        cache_dir=args.cache_dir,
+        params={**best['params'], 'n_estimators': best['rounds']},
+        threshold=args.threshold,
+        city_encoding=args.city_encoding,
+    )
+    print(f"Refit {result['best_iteration'] + 1} trees: balanced accuracy {result['balanced_accuracy']:.4f}, "
+          f"ROC AUC {result['roc_auc']:.4f} on the test rows")
+    if 'bundle_version' in result:
+        print(f"Wrote bundle {args.bundle} (version {result['bundle_version']})")
+
+
+if __name__ == "__main__":
+    main()
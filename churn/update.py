@@ -0,0 +1,370 @@
+"""
+Incremental model updates
+Refreshes the published model with a new slice of labelled outcomes (e.g.
+last month's churn) without retraining on the full history:
+
+    python -m churn.update new_outcomes.csv --output-dir . --bundle model_bundle
+
+Only the new file is read and encoded, with the published model's features
+and value tables, and the published booster is the starting point:
+
+    boost    add trees fit to the new rows (``xgb.train(..., xgb_model=...)``)
+    refresh  keep every tree and re-fit its leaf values and statistics on the
+             new rows (``process_type: update``, the ``refresh`` updater)
+
+so the cost grows with the new rows, not with the total history. A stratified
+share of the new rows (or a separate ``--holdout`` file) is held back; the
+updated model must score at least as well as the published one there, within
+``--max-auc-drop``, or nothing is written. Boost mode picks its number of
+trees by early stopping on another share of the rows it trains on, never on
+the holdout. Artifacts are then published with churn.train's atomic renames;
+a bundle is written to a new version directory and switched to in one rename,
+and ``--registry`` publishes it as a new registry version instead:
+
+    python -m churn.update new_outcomes.csv --no-artifacts --registry models
+
+The scaler, label encoders and preprocessing.json are kept as published: the
+existing trees were fit against them, and a new City that was not in the training data still
+encodes as all-off, exactly as in serving.
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+
+from churn.model import DEFAULT_ARTIFACT_DIR, load_model_and_preprocessing
+from churn.preprocessing import Preprocessor, load_preprocessor, normalize_frame
+from churn.schema import CATEGORICAL_COLUMNS, NUMERIC_COLUMNS
+from churn.train import (
+    DEFAULT_CACHE_DIR,
+    TARGET_COLUMN,
+    TrainingData,
+    booster_params,
+    evaluate,
+    publish_artifacts,
+    read_training_file,
+    split_rows,
+    typed_cache_dir,
+)
+
+UPDATE_MODES = ('boost', 'refresh')
+
+# Trees added per update at most (boost mode), with early stopping on rows held out of the fit
+DEFAULT_UPDATE_ROUNDS = 20
+EARLY_STOPPING_ROUNDS = 5
+
+# Smaller steps than the full fit, so a month of data nudges rather than
+# overrides what was learned from the history
+UPDATE_LEARNING_RATE = 0.05
+
+# Largest holdout ROC AUC loss against the published model that still publishes
+DEFAULT_MAX_AUC_DROP = 0.0
+
+
+def encode_new_data(path: Union[str, Path], preprocessor: Preprocessor,
+                    cache_dir: Optional[Union[str, Path]] = None) -> TrainingData:
+    """
+    Encode a labelled file into the published model's unscaled features
+
+    Unlike churn.train.build_training_data, the columns and City value tables
+    come from the published preprocessing rather than from the file, so the
+    rows line up with the existing trees. The typed frame is cached under
+    ``cache_dir`` like churn.train's (None never caches).
+    """
+    if preprocessor.scaled:
+        raise ValueError("The published model was fit on scaled features; retrain it with churn.train")
+    raw = read_training_file(path, typed_cache_dir(cache_dir))
+    if TARGET_COLUMN not in raw.columns:
+        raise ValueError(f"Update data has no '{TARGET_COLUMN}' column")
+    target = raw[TARGET_COLUMN].to_numpy(dtype=np.int8)
+
+    normalized = normalize_frame(raw)
+    missing = [col for col in NUMERIC_COLUMNS + CATEGORICAL_COLUMNS if col not in normalized.columns]
+    if missing:
+        raise ValueError(f"Update data is missing columns: {', '.join(missing)}")
+
+    features = preprocessor.encoder.encode_frame_sparse(normalized)
+    categories = {col: sorted(normalized[col].astype(str).unique().tolist()) for col in CATEGORICAL_COLUMNS}
+    return TrainingData(features, target, preprocessor.feature_names, categories, preprocessor.encodings)
+
+
+def sparse_safe_booster(model, one_hot_mask: np.ndarray):
+    """
+    The trees predict_proba uses, rewritten to score unscaled CSR rows
+
+    A model fit densely (like the notebook's) sends absent one-hot cells down
+    whatever default branch it happened to learn. Each one-hot split's default
+    becomes the branch a 0 takes, and the booster is then laid out as
+    churn.sparse.densify_booster would (a no-op for models from churn.train),
+    so it scores dense and CSR rows the same and can be trained further on CSR.
+    """
+    import xgboost as xgb
+
+    from churn.sparse import densify_booster, iteration_range
+
+    booster = model.get_booster()
+    _, end = iteration_range(model)
+    if end and end < booster.num_boosted_rounds():
+        booster = booster[:end]
+
+    config = json.loads(booster.save_raw(raw_format='json'))
+    for tree in config['learner']['gradient_booster']['model']['trees']:
+        for node, feature in enumerate(tree['split_indices']):
+            if tree['left_children'][node] != -1 and one_hot_mask[feature]:
+                # XGBoost compares in float32: go left when value < split_condition
+                tree['default_left'][node] = int(np.float32(0.0) < np.float32(tree['split_conditions'][node]))
+
+    patched = xgb.Booster()
+    patched.load_model(bytearray(json.dumps(config), 'utf-8'))
+    return densify_booster(patched, one_hot_mask)
+
+
+def classifier_from_booster(booster, params: Dict):
+    """XGBClassifier around a booster, as churn.train.fit_model returns it"""
+    import xgboost as xgb
+
+    model = xgb.XGBClassifier(**params)
+    model.load_model(bytearray(booster.save_raw(raw_format='json')))
+    return model
+
+
+def update_model(model, data: TrainingData, stopping: Optional[TrainingData] = None, mode: str = 'boost',
+                 rounds: int = DEFAULT_UPDATE_ROUNDS, learning_rate: float = UPDATE_LEARNING_RATE,
+                 n_jobs: Optional[int] = None) -> Tuple:
+    """
+    Continue training a published model on new rows
+
+    Args:
+        model: Published XGBClassifier
+        data: New rows to train on, from encode_new_data
+        stopping: Rows that pick the number of added trees (boost mode);
+            keep them apart from the rows the update is judged on
+        mode: One of UPDATE_MODES
+        rounds: Trees to add at most (boost mode)
+        learning_rate: Step size of the added trees (boost mode)
+        n_jobs: Threads for tree construction, None for every core
+
+    Returns:
+        Tuple of (published model as scored on CSR rows, updated XGBClassifier)
+    """
+    import xgboost as xgb
+
+    from churn.sparse import densify_booster
+
+    if mode not in UPDATE_MODES:
+        raise ValueError(f"Unknown update mode '{mode}', expected one of {', '.join(UPDATE_MODES)}")
+
+    one_hot_mask = data.one_hot_mask
+    base = sparse_safe_booster(model, one_hot_mask)
+    params = {key: value for key, value in {**booster_params(model), 'nthread': n_jobs}.items()
+              if value is not None}
+
+    if mode == 'boost':
+        params['learning_rate'] = learning_rate
+        if params.get('tree_method') == 'hist':
+            dtrain = xgb.QuantileDMatrix(data.features, data.target, feature_names=data.feature_names)
+        else:
+            dtrain = xgb.DMatrix(data.features, data.target, feature_names=data.feature_names)
+        if stopping is None:
+            raise ValueError("Boost mode needs rows for early stopping")
+        dstopping = xgb.DMatrix(stopping.features, stopping.target, feature_names=stopping.feature_names)
+        booster = xgb.train(params, dtrain, num_boost_round=rounds, xgb_model=base,
+                            evals=[(dstopping, 'stopping')], early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+                            verbose_eval=False)
+        # Drop the rounds early stopping rejected, so the next update starts from the kept trees
+        booster = booster[:booster.best_iteration + 1]
+    else:
+        dtrain = xgb.DMatrix(data.features, data.target, feature_names=data.feature_names)
+        # Refreshed leaves are scaled by the learning rate again, so it stays the model's own
+        refresh = {**params, 'process_type': 'update', 'updater': 'refresh', 'refresh_leaf': True}
+        booster = xgb.train(refresh, dtrain, num_boost_round=base.num_boosted_rounds(), xgb_model=base)
+
+    booster = densify_booster(booster, one_hot_mask)
+    booster.feature_names = data.feature_names
+    sklearn_params = {key: value for key, value in model.get_params().items() if value is not None}
+    return classifier_from_booster(base, sklearn_params), classifier_from_booster(booster, sklearn_params)
+
+
+def update(path: Union[str, Path], base_dir: Optional[Union[str, Path]] = DEFAULT_ARTIFACT_DIR,
+           output_dir: Optional[Union[str, Path]] = None,
+           bundle: Optional[Union[str, Path]] = None, holdout: Optional[Union[str, Path]] = None,
+           mode: str = 'boost', rounds: int = DEFAULT_UPDATE_ROUNDS,
+           learning_rate: float = UPDATE_LEARNING_RATE, max_auc_drop: float = DEFAULT_MAX_AUC_DROP,
+           n_jobs: Optional[int] = None, registry: Optional[Union[str, Path]] = None,
+           cache_dir: Optional[Union[str, Path]] = DEFAULT_CACHE_DIR) -> Dict:
+    """
+    Update the published model with new outcomes, validate, and publish
+
+    Args:
+        path: Labelled file with only the new customers
+        base_dir: Directory with the published pickled artifacts
+        output_dir: Where the updated artifacts go; None skips them
+        bundle: Model bundle path to publish to; the update lands in a new
+            version directory that the path is switched to (see write_bundle)
+        holdout: Labelled file to validate on; None holds back part of ``path``
+        mode: One of UPDATE_MODES
+        rounds: Trees to add at most (boost mode)
+        learning_rate: Step size of the added trees (boost mode)
+        max_auc_drop: Holdout ROC AUC the update may lose and still be published
+        n_jobs: Threads for tree construction, None for every core
+        registry: Model registry directory (churn.registry) to publish the
+            updated bundle into as a new version and activate
+        cache_dir: Preprocessing cache the typed frames go in; None never caches
+
+    Returns:
+        Report with row counts, tree counts, holdout metrics before and after,
+        whether the update was published, and stage timings
+    """
+    started = time.perf_counter()
+    model, scaler, label_encoders = load_model_and_preprocessing(base_dir)
+    preprocessor = load_preprocessor(base_dir, scaler)
+    data = encode_new_data(path, preprocessor, cache_dir)
+    if holdout is None:
+        update_rows, holdout_rows = split_rows(data.target)
+        data, validation = _subset(data, update_rows), _subset(data, holdout_rows)
+    else:
+        validation = encode_new_data(holdout, preprocessor, cache_dir)
+    stopping = None
+    if mode == 'boost':
+        # Early stopping picks the trees on its own rows; judged on them, the
+        # update would look better than it is
+        fit_rows, stopping_rows = split_rows(data.target)
+        data, stopping = _subset(data, fit_rows), _subset(data, stopping_rows)
+    preprocess_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    base_model, updated_model = update_model(model, data, stopping, mode, rounds, learning_rate, n_jobs)
+    fit_seconds = time.perf_counter() - started
+
+    holdout_rows = np.arange(len(validation))
+    before = evaluate(base_model, validation, holdout_rows)
+    after = evaluate(updated_model, validation, holdout_rows)
+    report = {
+        'mode': mode,
+        'update_rows': len(data),
+        'stopping_rows': 0 if stopping is None else len(stopping),
+        'holdout_rows': len(holdout_rows),
+        'trees_before': base_model.get_booster().num_boosted_rounds(),
+        'trees_after': updated_model.get_booster().num_boosted_rounds(),
+        'before': before,
+        'after': after,
+        'published': after['roc_auc'] >= before['roc_auc'] - max_auc_drop,
+        'preprocess_seconds': preprocess_seconds,
+        'fit_seconds': fit_seconds,
+    }
+    if not report['published']:
+        return report
+
+    if output_dir is not None:
+        publish_artifacts(updated_model, scaler, label_encoders, output_dir, preprocessor, after)
+    if bundle is None and registry is None:
+        return report
+
+    from churn.bundle import load_bundle, write_bundle
+
+    # Keep the decision threshold the model was published with
+    threshold = _published_threshold(bundle, registry)
+    if bundle is not None:
+        write_bundle(updated_model, scaler, bundle, threshold=threshold, overwrite=True,
+                     preprocessor=preprocessor, evaluation=after)
+        report['bundle_version'] = load_bundle(bundle).version
+    if registry is not None:
+        from churn.registry import publish
+
+        Path(registry).mkdir(parents=True, exist_ok=True)
+        # Hidden, so the registry never mistakes the staging copy for a version
+        with tempfile.TemporaryDirectory(prefix='.update-', dir=registry) as staging:
+            staged = write_bundle(updated_model, scaler, Path(staging) / 'bundle', threshold=threshold,
+                                  preprocessor=preprocessor, evaluation=after)
+            report['registry_version'] = publish(staged, registry).name
+    return report
+
+
+def _published_threshold(bundle: Optional[Union[str, Path]],
+                         registry: Optional[Union[str, Path]]) -> Optional[float]:
+    """Decision threshold of the bundle being replaced, else of the registry's active bundle"""
+    from churn.bundle import MANIFEST_FILE, load_bundle
+    from churn.registry import ModelRegistry
+
+    candidates = [Path(bundle)] if bundle is not None else []
+    if registry is not None and Path(registry).is_dir():
+        target = ModelRegistry(registry).target()
+        if target is not None:
+            candidates.append(target)
+    for path in candidates:
+        if (path / MANIFEST_FILE).exists():
+            return load_bundle(path).threshold
+    return None
+
+
+def _subset(data: TrainingData, rows: np.ndarray) -> TrainingData:
+    return TrainingData(data.features[rows], data.target[rows], data.feature_names, data.categories,
+                        data.encodings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Update the published churn model with new outcomes")
+    parser.add_argument("data", help="Labelled file with only the new customers (.csv, .parquet, .xlsx)")
+    parser.add_argument("--base-dir", default=str(DEFAULT_ARTIFACT_DIR),
+                        help="Directory with the published XGBoost_Model.pkl and StandardScaler.pkl")
+    parser.add_argument("--output-dir", default=None,
+                        help="Where the updated artifacts go ('.' replaces the ones app.py serves)")
+    parser.add_argument("--no-artifacts", action="store_true", help="Don't write the pickled artifacts")
+    parser.add_argument("--bundle", default=None,
+                        help="Also publish a model bundle at this path (switched over to a new version directory)")
+    parser.add_argument("--registry", default=None,
+                        help="Also publish the updated bundle into this model registry as its active version")
+    parser.add_argument("--holdout", default=None,
+                        help="Labelled file to validate on (default: hold back a quarter of the new rows)")
+    parser.add_argument("--mode", choices=UPDATE_MODES, default="boost",
+                        help="Add trees fit to the new rows, or refresh the existing trees' leaves")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_UPDATE_ROUNDS, help="Trees to add at most")
+    parser.add_argument("--learning-rate", type=float, default=UPDATE_LEARNING_RATE,
+                        help="Step size of the added trees")
+    parser.add_argument("--max-auc-drop", type=float, default=DEFAULT_MAX_AUC_DROP,
+                        help="Holdout ROC AUC the update may lose and still be published")
+    parser.add_argument("--n-jobs", type=int, default=None, help="Training threads (default: every core)")
+    parser.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR), help="Preprocessing cache directory")
+    parser.add_argument("--no-cache", action="store_true", help="Parse the files even if they were seen before")
+    args = parser.parse_args()
+    if args.output_dir is None and not args.no_artifacts:
+        # No default: the repo root holds the artifacts app.py serves
+        parser.error("--output-dir is required unless --no-artifacts is given")
+
+    report = update(
+        args.data,
+        base_dir=args.base_dir,
+        output_dir=None if args.no_artifacts else args.output_dir,
+        bundle=args.bundle,
+        holdout=args.holdout,
+        mode=args.mode,
+        rounds=args.rounds,
+        learning_rate=args.learning_rate,
+        max_auc_drop=args.max_auc_drop,
+        n_jobs=args.n_jobs,
+        registry=args.registry,
+        cache_dir=None if args.no_cache else args.cache_dir,
+    )
+    print(f"Encoded {report['update_rows']:,} new rows to fit, {report['stopping_rows']:,} for early stopping, "
+          f"{report['holdout_rows']:,} held out in {report['preprocess_seconds']:.1f}s")
+    print(f"{report['mode'].capitalize()}: {report['trees_before']} -> {report['trees_after']} trees "
+          f"in {report['fit_seconds']:.2f}s")
+    print(f"Holdout ROC AUC: {report['before']['roc_auc']:.4f} -> {report['after']['roc_auc']:.4f}, "
+          f"balanced accuracy: {report['before']['balanced_accuracy']:.4f} -> "
+          f"{report['after']['balanced_accuracy']:.4f}")
+    if not report['published']:
+        print("Not published: the update scores worse on the holdout than the published model")
+        raise SystemExit(1)
+    if 'bundle_version' in report:
+        print(f"Wrote bundle {args.bundle} (version {report['bundle_version']})")
+    if 'registry_version' in report:
+        print(f"Published {report['registry_version']} to registry {args.registry}")
+
+
+if __name__ == "__main__":
+    main()
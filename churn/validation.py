@@ -0,0 +1,326 @@
+"""
+Vectorized validation of customer batches
+Checks whole columns at once (missing values, numeric ranges and category
+sets) and records every failed column as one bit of a per-row mask, so bad
+rows are quarantined while the rest of the batch is scored.
+
+The rules are the required form fields and NUMERIC_RANGES plus the
+categories the model was trained on, taken from its encoder:
+
+    validator = BatchValidator.from_encoder(encoder)
+    report = validator.validate(customers)
+    valid, quarantined = report.split(customers)
+
+A single record (the form, one API request) is checked against the same
+rules with ``validator.validate_record(record)``, see validate_inputs.
+
+Each column costs one pass over its values: numbers are compared as arrays,
+and categorical columns are factorized (or read as category codes) so only
+their distinct values are looked up in the allowed set.
+"""
+
+from typing import TYPE_CHECKING, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from churn.features import NUMERIC_RANGES, REQUIRED_FIELDS
+from churn.schema import COLUMN_ALIASES, PHONE_SERVICE_MAP
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from churn.encoder import CompiledEncoder
+
+# Column added to quarantined rows, naming the rules they broke
+ERRORS_COLUMN = 'Validation_Errors'
+
+# Categorical columns whose unseen values are expected (new cities) and
+# scored like any other, as all-off one-hots or the value table's default.
+# A file without the column at all (the Kaggle-style export has no City) is
+# scored the same way and reported in ValidationReport.absent
+OPEN_COLUMNS = ('City',)
+
+# Columns that may be blank: a blank Total_Charges is a new customer, encoded as 0
+NULLABLE_COLUMNS = ('Total_Charges',)
+
+# Columns encoded as numbers but given as a closed set of values
+VALUE_SETS: Dict[str, Tuple] = {
+    'Phone_Service': (*PHONE_SERVICE_MAP, *PHONE_SERVICE_MAP.values()),
+}
+
+
+class Rule:
+    """
+    What one column must satisfy
+
+    Args:
+        column: Training column name
+        categorical: Values are labels (checked against ``allowed``) rather than numbers
+        required: Rows fail when the value (or the whole column) is missing
+        bounds: (min, max) of a numeric column, either may be None
+        allowed: Accepted values of a categorical column; None accepts any
+    """
+
+    def __init__(self, column: str, categorical: bool = False, required: bool = True,
+                 bounds: Tuple[Optional[float], Optional[float]] = (None, None),
+                 allowed: Optional[Iterable] = None):
+        self.column = column
+        self.categorical = categorical
+        self.required = required
+        self.bounds = bounds
+        self.allowed = None if allowed is None else frozenset(allowed)
+
+    @property
+    def message(self) -> str:
+        """What a failing row is told"""
+        if self.categorical and self.allowed is None:
+            return f"{self.column} is missing"
+        if self.allowed is not None:
+            # Only the training spellings, not the raw-spelling aliases
+            shown = sorted({str(value) for value in self.allowed if isinstance(value, str) and ' ' not in value})
+            listed = ', '.join(shown[:8]) + (', ...' if len(shown) > 8 else '')
+            return f"{self.column} must be one of {listed}"
+        low, high = self.bounds
+        if low is not None and high is not None:
+            return f"{self.column} must be a number in [{low:g}, {high:g}]"
+        if low is not None:
+            return f"{self.column} must be a number >= {low:g}"
+        if high is not None:
+            return f"{self.column} must be a number <= {high:g}"
+        return f"{self.column} must be a number"
+
+
+class ValidationReport:
+    """
+    Result of validating a batch
+
+    Args:
+        rules: Rules in bit order
+        errors: One mask per row; bit ``i`` is set when ``rules[i]`` failed
+        absent: Open columns missing from the whole batch; rows are scored
+            without them, so they are a warning about the file rather than row errors
+    """
+
+    def __init__(self, rules: Sequence[Rule], errors: np.ndarray, absent: Sequence[str] = ()):
+        self.rules = list(rules)
+        self.errors = errors
+        self.absent = list(absent)
+
+    def __len__(self) -> int:
+        return len(self.errors)
+
+    @property
+    def valid(self) -> np.ndarray:
+        """Boolean mask of the rows that passed every rule"""
+        return self.errors == 0
+
+    @property
+    def n_invalid(self) -> int:
+        return int(np.count_nonzero(self.errors))
+
+    def counts(self) -> Dict[str, int]:
+        """Failed rows per column, for the columns with any"""
+        counts = {}
+        for bit, rule in enumerate(self.rules):
+            failed = int(np.count_nonzero(self.errors & (1 << bit)))
+            if failed:
+                counts[rule.column] = failed
+        return counts
+
+    def messages(self) -> np.ndarray:
+        """Error text per row ('' when valid), built once per distinct mask"""
+        masks, inverse = np.unique(self.errors, return_inverse=True)
+        texts = np.array([
+            '; '.join(rule.message for bit, rule in enumerate(self.rules) if mask & (1 << bit))
+            for mask in masks.tolist()
+        ], dtype=object)
+        return texts[inverse]
+
+    def split(self, df: 'pd.DataFrame') -> Tuple['pd.DataFrame', 'pd.DataFrame']:
+        """
+        Separate a validated frame into its valid and quarantined rows
+
+        Returns:
+            Tuple of (valid rows, invalid rows with an ERRORS_COLUMN column)
+        """
+        valid = self.valid
+        if valid.all():
+            return df, df.iloc[:0].assign(**{ERRORS_COLUMN: []})
+        quarantined = df[~valid].copy()
+        quarantined[ERRORS_COLUMN] = ValidationReport(self.rules, self.errors[~valid]).messages()
+        return df[valid], quarantined
+
+
+class BatchValidator:
+    """
+    Column-wise checks of raw customer frames
+
+    Args:
+        rules: One Rule per checked column (at most 64)
+        column_lookup: Raw spelling -> training column name (``encoder.column_lookup``)
+    """
+
+    def __init__(self, rules: Sequence[Rule], column_lookup: Dict[str, str]):
+        if len(rules) > 64:
+            raise ValueError(f"At most 64 rules fit a row mask, got {len(rules)}")
+        self.rules = list(rules)
+        self.column_lookup = column_lookup
+        self.mask_dtype = np.uint32 if len(self.rules) <= 32 else np.uint64
+
+    @classmethod
+    def from_encoder(cls, encoder: 'CompiledEncoder', open_columns: Sequence[str] = OPEN_COLUMNS) -> 'BatchValidator':
+        """
+        Rules for the columns a model's encoder reads
+
+        Categorical columns accept the values the model was trained on, in
+        training or raw spelling; ``open_columns`` are only checked for blanks.
+        """
+        lookup = encoder.column_lookup
+        required = {lookup[field] for field in REQUIRED_FIELDS if field in lookup}
+        bounds = {lookup[field]: limits for field, limits in NUMERIC_RANGES.items() if field in lookup}
+
+        rules = []
+        for col in encoder.numeric_index:
+            rules.append(Rule(col, categorical=col in VALUE_SETS,
+                              required=col in required and col not in NULLABLE_COLUMNS,
+                              bounds=bounds.get(col, (None, None)), allowed=VALUE_SETS.get(col)))
+        for col, values in {**encoder.category_index, **encoder.value_maps}.items():
+            if values:
+                rules.append(Rule(col, categorical=True, required=col in required,
+                                  allowed=None if col in open_columns else values.keys()))
+        return cls(rules, lookup)
+
+    @classmethod
+    def from_ranges(cls) -> 'BatchValidator':
+        """Rules for the NUMERIC_RANGES fields alone, for callers without a model's encoder"""
+        lookup, rules = {}, []
+        for field, bounds in NUMERIC_RANGES.items():
+            col = COLUMN_ALIASES.get(field, field)
+            lookup.update({field: col, col: col, col.replace('_', ' '): col})
+            rules.append(Rule(col, required=field in REQUIRED_FIELDS and col not in NULLABLE_COLUMNS,
+                              bounds=bounds))
+        return cls(rules, lookup)
+
+    def validate(self, df: 'pd.DataFrame') -> ValidationReport:
+        """Check every rule against its whole column and return the per-row masks"""
+        errors = np.zeros(len(df), dtype=self.mask_dtype)
+        absent = []
+        columns = {}
+        for key in df.columns:
+            col = self.column_lookup.get(str(key).strip())
+            if col is not None:
+                columns[col] = key
+
+        for bit, rule in enumerate(self.rules):
+            flag = self.mask_dtype(1 << bit)
+            key = columns.get(rule.column)
+            if key is None:
+                if rule.categorical and rule.allowed is None:
+                    # An open column encodes unseen values as all-off, a missing one too
+                    absent.append(rule.column)
+                elif rule.required:
+                    errors |= flag
+                continue
+            failed = self._failed(rule, df[key])
+            errors[failed] |= flag
+        return ValidationReport(self.rules, errors, absent)
+
+    def validate_record(self, record: Mapping) -> List[Rule]:
+        """
+        Rules one raw record breaks
+
+        The same checks validate applies to a one-row batch, on plain Python
+        values, so the form and single API requests don't build a frame.
+        """
+        values = {}
+        for key, value in record.items():
+            col = self.column_lookup.get(str(key).strip())
+            if col is not None:
+                values[col] = value
+
+        failed = []
+        for rule in self.rules:
+            if rule.column not in values:
+                if rule.required and not (rule.categorical and rule.allowed is None):
+                    failed.append(rule)
+            elif self._value_failed(rule, values[rule.column]):
+                failed.append(rule)
+        return failed
+
+    @staticmethod
+    def _value_failed(rule: Rule, value) -> bool:
+        """Whether one value breaks its rule, as _failed decides for a column"""
+        missing = value is None or (isinstance(value, float) and np.isnan(value))
+        if rule.categorical:
+            if missing:
+                return rule.required
+            return rule.allowed is not None and not _accepts(rule.allowed, value)
+
+        if isinstance(value, str):
+            # Blank cells are missing, not malformed
+            missing = not value.strip()
+            if not missing:
+                try:
+                    value = float(value)
+                except ValueError:
+                    return True
+        if not missing:
+            value = float(value)
+            missing = np.isnan(value)
+        if missing:
+            return rule.required
+
+        low, high = rule.bounds
+        return (low is not None and value < low) or (high is not None and value > high)
+
+    @staticmethod
+    def _failed(rule: Rule, values: 'pd.Series') -> np.ndarray:
+        """Rows of one column that break its rule"""
+        import pandas as pd
+
+        if rule.categorical:
+            if rule.allowed is None:
+                # Open column: only blanks can fail
+                if rule.required:
+                    return values.isna().to_numpy()
+                return np.zeros(len(values), dtype=bool)
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+            else:
+                codes, uniques = pd.factorize(values)
+            accepted = np.array([_accepts(rule.allowed, value) for value in uniques] + [not rule.required],
+                                dtype=bool)
+            # Missing values get code -1, which lands on the trailing slot
+            return ~accepted[codes]
+
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            numbers = values.to_numpy(dtype=np.float64, na_value=np.nan)
+            missing = np.isnan(numbers)
+            failed = np.zeros(len(values), dtype=bool)
+        else:
+            # Parsed once per distinct value: text columns repeat theirs a lot
+            codes, uniques = pd.factorize(values)
+            parsed = pd.to_numeric(pd.Series(uniques, dtype=object), errors='coerce').to_numpy(
+                dtype=np.float64, na_value=np.nan)
+            # Blank cells (the Telco export's " " Total Charges) are missing, not malformed
+            blank = np.array([isinstance(value, str) and not value.strip() for value in uniques] + [True], dtype=bool)
+            numbers = np.append(parsed, np.nan)[codes]
+            missing = blank[codes]
+            failed = np.isnan(numbers) & ~missing
+
+        low, high = rule.bounds
+        with np.errstate(invalid='ignore'):
+            if low is not None:
+                failed |= numbers < low
+            if high is not None:
+                failed |= numbers > high
+        if rule.required:
+            failed |= missing
+        return failed
+
+
+def _accepts(allowed: frozenset, value) -> bool:
+    """Whether a value is in the set as is or, like the encoder reads it, with spaces as underscores"""
+    if value in allowed:
+        return True
+    return isinstance(value, str) and value.replace(' ', '_') in allowed
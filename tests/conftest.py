@@ -0,0 +1,29 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+# Rows of Telco_customer_churn.csv the parity tests encode
+SAMPLE_ROWS = 300
+
+
+@pytest.fixture(scope="session")
+def telco_sample() -> pd.DataFrame:
+    """Leading rows of the Telco export, read as raw text like an upload, with the awkward cases mixed in"""
+    raw = pd.read_csv(REPO_ROOT / "Telco_customer_churn.csv", nrows=SAMPLE_ROWS, dtype={"Total Charges": str})
+    # New customers have a blank Total Charges; the first rows of the file have none
+    raw.loc[[3, 40, 41], "Total Charges"] = " "
+    raw.loc[[5, 120], "City"] = "Atlantis"
+    return raw
+
+
+@pytest.fixture(scope="session")
+def published():
+    """(model, scaler, preprocessor) shipped at the repo root"""
+    from churn.model import load_model_and_preprocessing
+    from churn.preprocessing import load_preprocessor
+
+    model, scaler, _ = load_model_and_preprocessing(REPO_ROOT)
+    return model, scaler, load_preprocessor(REPO_ROOT, scaler)
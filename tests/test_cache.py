@@ -0,0 +1,66 @@
+from churn.cache import DiskCache, PredictionCache
+
+LOOKUP = {"Tenure": "Tenure_Months", "Tenure_Months": "Tenure_Months", "Contract": "Contract"}
+
+
+def test_aliases_and_number_types_share_a_key():
+    cache = PredictionCache(version="v1", column_lookup=LOOKUP)
+
+    key = cache.key({"Tenure": 12, "Contract": "Month-to-month", "Name": "ignored"})
+
+    assert key == cache.key({"Tenure_Months": 12.0, "Contract": "Month-to-month"})
+    assert key != cache.key({"Tenure_Months": 13, "Contract": "Month-to-month"})
+
+
+def test_version_is_part_of_the_key():
+    cache = PredictionCache(version="v1", column_lookup=LOOKUP)
+    record = {"Tenure": 12, "Contract": "Two_year"}
+
+    assert cache.key(record) != cache.key(record, version="v2")
+    assert cache.key(record, version="v1") == cache.key(record)
+
+
+def test_set_version_drops_entries_and_old_keys_miss():
+    cache = PredictionCache(version="v1", column_lookup=LOOKUP)
+    record = {"Tenure": 12, "Contract": "Two_year"}
+    old_key = cache.key(record)
+    cache.put(old_key, 0.25)
+    assert cache.get(old_key) == 0.25
+
+    cache.set_version("v2")
+
+    assert cache.stats()["size"] == 0
+    assert cache.get(old_key) is None
+    assert cache.key(record) != old_key
+
+    # Same version again keeps what was cached under it
+    cache.put(cache.key(record), 0.5)
+    cache.set_version("v2")
+    assert cache.get(cache.key(record)) == 0.5
+
+
+def test_disk_entries_of_an_old_version_are_not_hit(tmp_path):
+    disk = DiskCache(tmp_path / "predictions.sqlite")
+    record = {"Tenure": 12, "Contract": "Two_year"}
+    writer = PredictionCache(version="v1", column_lookup=LOOKUP, disk=disk)
+    writer.put(writer.key(record), 0.25)
+
+    reader = PredictionCache(version="v1", column_lookup=LOOKUP, disk=disk)
+    assert reader.get(reader.key(record)) == 0.25
+    reader.set_version("v2")
+    assert reader.get(reader.key(record)) is None
+
+
+def test_lru_eviction_and_disabled_cache():
+    cache = PredictionCache(maxsize=2)
+    for key, probability in (("a", 0.1), ("b", 0.2)):
+        cache.put(key, probability)
+    cache.get("a")
+    cache.put("c", 0.3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 0.1
+
+    disabled = PredictionCache(maxsize=0)
+    disabled.put("a", 0.1)
+    assert disabled.get("a") is None
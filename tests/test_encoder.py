@@ -0,0 +1,37 @@
+import numpy as np
+
+from churn.encoder import CompiledEncoder
+from churn.preprocessing import encode_frame
+
+
+def test_folded_scaling_matches_encode_then_scale(telco_sample, published):
+    _, scaler, _ = published
+    encoder = CompiledEncoder.from_scaler(scaler)
+
+    expected = scaler.transform(encode_frame(telco_sample, scaler.feature_names_in_))
+
+    np.testing.assert_allclose(encoder.transform_frame(telco_sample), expected, rtol=0, atol=1e-9)
+    np.testing.assert_allclose(encoder.transform_records(telco_sample.to_dict("records")), expected,
+                               rtol=0, atol=1e-9)
+
+
+def test_unscaled_encoder_matches_get_dummies(telco_sample, published):
+    _, _, preprocessor = published
+    encoder = preprocessor.encoder
+
+    expected = encode_frame(telco_sample, preprocessor.feature_names).to_numpy()
+
+    assert np.array_equal(encoder.encode_frame(telco_sample), expected, equal_nan=True)
+    assert np.array_equal(encoder.encode_frame_sparse(telco_sample).toarray(), expected, equal_nan=True)
+
+
+def test_unseen_city_encodes_as_all_off(telco_sample, published):
+    _, _, preprocessor = published
+    encoder = preprocessor.encoder
+    city_columns = [idx for idx, name in enumerate(encoder.feature_names) if name.startswith("City_")]
+
+    row = encoder.encode_record(telco_sample.iloc[5].to_dict())
+
+    assert telco_sample["City"].iloc[5] == "Atlantis"
+    assert not row[city_columns].any()
+    assert row[encoder.one_hot_mask].sum() == len(encoder.category_index) - 1
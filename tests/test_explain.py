@@ -0,0 +1,33 @@
+import pytest
+
+pytest.importorskip("xgboost")
+
+from churn.encoder import CompiledEncoder
+from churn.explain import Explainer, explain_records, with_churn_drivers
+from churn.registry import canary_records
+
+
+@pytest.fixture
+def explainer(published):
+    model, scaler, _ = published
+    return Explainer.from_model(model, CompiledEncoder.from_scaler(scaler))
+
+
+def test_fields_are_reported_as_the_record_sent_them(explainer):
+    record = canary_records(1)[0]
+    assert "Tenure" in record
+
+    fields = [item["field"] for item in explain_records(explainer, [record])[0]["contributions"]]
+
+    assert "Tenure" in fields and "Tenure_Months" not in fields
+    renamed = {("Tenure_Months" if key == "Tenure" else key): value for key, value in record.items()}
+    fields = [item["field"] for item in explain_records(explainer, [renamed])[0]["contributions"]]
+    assert "Tenure_Months" in fields and "Tenure" not in fields
+
+
+def test_churn_drivers_use_the_csv_headers(explainer, telco_sample):
+    scored = with_churn_drivers(telco_sample.head(50), explainer, top=len(explainer.fields))
+
+    drivers = " ".join(scored["Churn_Drivers"])
+    assert "Tenure Months (+" in drivers
+    assert "Tenure_Months" not in drivers
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from churn.preprocessing import Preprocessor, check_parity
+from churn.train import build_training_data
+
+
+@pytest.mark.parametrize("city_encoding", ["onehot", "frequency"])
+def test_training_features_pass_the_serving_parity_check(telco_sample, city_encoding):
+    data = build_training_data(telco_sample, city_encoding)
+
+    check_parity(data.preprocessor, telco_sample, data.features)
+
+
+def test_parity_check_names_the_columns_that_differ(telco_sample):
+    data = build_training_data(telco_sample)
+    features = data.features.toarray()
+    features[:, data.feature_names.index("Tenure_Months")] += 1.0
+
+    with pytest.raises(ValueError, match="Tenure_Months"):
+        check_parity(data.preprocessor, telco_sample, features)
+
+
+def test_saved_preprocessor_encodes_the_same(tmp_path, telco_sample):
+    data = build_training_data(telco_sample, "frequency")
+
+    loaded = Preprocessor.load(data.preprocessor.save(tmp_path / "preprocessing.json"))
+
+    assert loaded.feature_names == data.feature_names
+    assert np.array_equal(loaded.encoder.encode_frame(telco_sample), data.features.toarray())
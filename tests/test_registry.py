@@ -0,0 +1,90 @@
+import shutil
+
+import numpy as np
+import pytest
+
+pytest.importorskip("xgboost")
+
+from churn.bundle import write_bundle
+from churn.registry import CURRENT_FILE, ModelRegistry, ModelVersion, canary_records, check_canary, publish
+
+
+class ConstantModel:
+    def __init__(self, probability):
+        self.probability = probability
+
+    def predict_proba(self, features):
+        churn_probability = np.full(len(features), self.probability)
+        return np.column_stack([1.0 - churn_probability, churn_probability])
+
+
+@pytest.fixture
+def registry_root(tmp_path, published):
+    model, scaler, preprocessor = published
+    bundle = write_bundle(model, scaler, tmp_path / "bundle", preprocessor=preprocessor,
+                          evaluation={"balanced_accuracy": 0.72, "roc_auc": 0.86})
+    root = tmp_path / "models"
+    root.mkdir()
+    publish(bundle, root, name="good")
+    return root
+
+
+def test_refresh_serves_the_version_current_names(registry_root):
+    registry = ModelRegistry(registry_root)
+
+    assert registry.refresh().name == "good"
+    assert registry.current.evaluation == {"balanced_accuracy": 0.72, "roc_auc": 0.86}
+    assert (registry_root / CURRENT_FILE).read_text().strip() == "good"
+    # Nothing new to load
+    assert registry.refresh() is None
+
+
+def test_corrupt_version_is_rejected_and_the_active_one_kept(registry_root):
+    registry = ModelRegistry(registry_root)
+    registry.refresh()
+    broken = registry_root / "broken"
+    shutil.copytree(registry_root / "good", broken)
+    forest = next(broken.glob("forest_*.npy"))
+    forest.write_bytes(forest.read_bytes()[:-8] + b"\0" * 8)
+    publish(broken, registry_root, name="broken")
+
+    assert registry.refresh() is None
+    assert registry.current.name == "good"
+    assert "corrupt" in registry.status()["rejected"]["broken"]
+
+    # Not retried until the directory changes
+    registry._current = None
+    assert registry.refresh() is None
+
+
+def test_current_naming_a_missing_directory_keeps_the_active_version(registry_root):
+    registry = ModelRegistry(registry_root)
+    registry.refresh()
+    (registry_root / CURRENT_FILE).write_text("missing\n")
+
+    assert registry.refresh() is None
+    assert registry.current.name == "good"
+
+
+def test_listener_failure_rejects_the_version(registry_root):
+    registry = ModelRegistry(registry_root)
+
+    def refuse(version):
+        raise RuntimeError("not today")
+
+    registry.add_listener(refuse)
+
+    assert registry.refresh() is None
+    assert registry.current is None
+    assert registry.status()["rejected"] == {"good": "not today"}
+
+
+def test_canary_rejects_broken_and_shifted_probabilities(registry_root):
+    active = ModelVersion.load(registry_root / "good")
+    records = canary_records()
+
+    assert check_canary(active, records, active, max_shift=0.0).shape == (len(records),)
+    with pytest.raises(ValueError, match="outside"):
+        check_canary(ModelVersion("nan", ConstantModel(np.nan), active.encoder), records)
+    with pytest.raises(ValueError, match="shift"):
+        check_canary(ModelVersion("flat", ConstantModel(0.99), active.encoder), records, active, max_shift=0.2)
@@ -0,0 +1,53 @@
+import json
+
+import numpy as np
+import pytest
+
+xgb = pytest.importorskip("xgboost")
+
+from churn.encoder import CompiledEncoder
+from churn.sparse import densify_booster, iteration_range, predict_proba_sparse, sparse_booster
+
+
+def test_sparse_booster_matches_dense_scaled_input(telco_sample, published):
+    model, scaler, _ = published
+    # Scaled input is where absent one-hot cells stand for a nonzero "off" value
+    encoder = CompiledEncoder.from_scaler(scaler)
+
+    dense = model.get_booster().inplace_predict(encoder.transform_frame(telco_sample),
+                                                iteration_range=iteration_range(model))
+    sparse = predict_proba_sparse(model, encoder, encoder.transform_frame_sparse(telco_sample))
+
+    np.testing.assert_allclose(sparse, dense, rtol=0, atol=1e-6)
+
+
+def test_sparse_booster_only_moves_one_hot_defaults(published):
+    model, scaler, _ = published
+    encoder = CompiledEncoder.from_scaler(scaler)
+
+    before = json_trees(model.get_booster())
+    after = json_trees(sparse_booster(model, encoder))
+
+    for old, new in zip(before, after):
+        assert new["split_conditions"] == old["split_conditions"]
+        numeric = ~encoder.one_hot_mask[np.asarray(old["split_indices"])]
+        assert np.array_equal(np.asarray(new["default_left"])[numeric], np.asarray(old["default_left"])[numeric])
+
+
+def test_densify_booster_scores_dense_rows_like_csr(telco_sample, published):
+    _, _, preprocessor = published
+    encoder = preprocessor.encoder
+    features = encoder.encode_frame_sparse(telco_sample)
+    target = (telco_sample["Churn Value"].to_numpy() == 1).astype(np.float32)
+    booster = xgb.train({"objective": "binary:logistic", "max_depth": 4, "tree_method": "hist"},
+                        xgb.DMatrix(features, label=target), num_boost_round=10)
+
+    dense = densify_booster(booster, encoder.one_hot_mask)
+
+    expected = booster.predict(xgb.DMatrix(features))
+    np.testing.assert_allclose(dense.inplace_predict(encoder.encode_frame(telco_sample)), expected, atol=1e-6)
+    np.testing.assert_allclose(dense.predict(xgb.DMatrix(features)), expected, atol=1e-6)
+
+
+def json_trees(booster):
+    return json.loads(booster.save_raw(raw_format="json"))["learner"]["gradient_booster"]["model"]["trees"]
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("xgboost")
+
+from churn.trees import FOREST_ARRAYS, FlatForest, export_forest, forest_arrays
+
+
+def flat_forest(model) -> FlatForest:
+    arrays = forest_arrays(model)
+    return FlatForest(*(arrays[name] for name in FOREST_ARRAYS), max_depth=arrays["max_depth"],
+                      base_margin=arrays["base_margin"], feature_names=arrays["feature_names"])
+
+
+def test_flat_forest_matches_xgboost(telco_sample, published):
+    model, _, preprocessor = published
+    features = preprocessor.encoder.encode_frame(telco_sample)
+
+    np.testing.assert_allclose(flat_forest(model).predict_proba(features), model.predict_proba(features),
+                               rtol=0, atol=1e-6)
+
+
+def test_flat_forest_sends_missing_values_down_the_default_branch(telco_sample, published):
+    model, _, preprocessor = published
+    features = preprocessor.encoder.encode_frame(telco_sample)
+    # A NaN in every numeric column exercises each split's default direction
+    features[::3, preprocessor.encoder.numeric_columns] = np.nan
+
+    np.testing.assert_allclose(flat_forest(model).predict_proba(features), model.predict_proba(features),
+                               rtol=0, atol=1e-6)
+
+
+def test_exported_forest_loads_back(tmp_path, telco_sample, published):
+    model, _, preprocessor = published
+    features = preprocessor.encoder.encode_frame(telco_sample.head(20))
+
+    forest = FlatForest.load(export_forest(model, tmp_path / "forest.npz"))
+
+    assert forest.n_trees == flat_forest(model).n_trees
+    assert np.array_equal(forest.predict(features), model.predict(features))
+
+
+def test_numba_walk_matches_numpy_walk(telco_sample, published):
+    pytest.importorskip("numba")
+    from churn.trees import NUMBA_MIN_ROWS
+
+    model, _, preprocessor = published
+    features = preprocessor.encoder.encode_frame(telco_sample)
+    features = np.tile(features, (NUMBA_MIN_ROWS // len(features) + 1, 1))
+    features[::7, preprocessor.encoder.numeric_columns] = np.nan
+    forest = flat_forest(model)
+
+    jitted = forest.predict_margin(features)
+    by_numpy = forest.base_margin + forest._walk_numpy(features.astype(np.float32))
+
+    np.testing.assert_allclose(jitted, by_numpy, rtol=0, atol=1e-9)
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from churn.validation import ERRORS_COLUMN, BatchValidator
+
+
+@pytest.fixture
+def validator(published):
+    return BatchValidator.from_encoder(published[2].encoder)
+
+
+@pytest.fixture
+def customers(telco_sample):
+    customers = telco_sample.head(20).copy()
+    # Text in a number column, as in a CSV where one cell is not a number
+    customers["Monthly Charges"] = customers["Monthly Charges"].astype(object)
+    customers.loc[1, "Tenure Months"] = -1
+    customers.loc[2, "Contract"] = "Weekly"
+    customers.loc[2, "Monthly Charges"] = "abc"
+    customers.loc[4, "Gender"] = np.nan
+    return customers
+
+
+def bit(validator, column):
+    return 1 << [rule.column for rule in validator.rules].index(column)
+
+
+def test_each_failed_column_sets_its_own_bit(validator, customers):
+    report = validator.validate(customers)
+
+    assert report.errors[1] == bit(validator, "Tenure_Months")
+    assert report.errors[2] == bit(validator, "Contract") | bit(validator, "Monthly_Charges")
+    assert report.errors[4] == bit(validator, "Gender")
+    assert report.counts() == {"Tenure_Months": 1, "Monthly_Charges": 1, "Gender": 1, "Contract": 1}
+    # Blank Total Charges (row 3) and an unseen City (row 5) are scored, not quarantined
+    assert report.valid[[0, 3, 5]].all()
+    assert report.n_invalid == 3
+
+
+def test_split_quarantines_failed_rows_with_their_messages(validator, customers):
+    valid, quarantined = validator.validate(customers).split(customers)
+
+    assert len(valid) == 17
+    assert quarantined.index.tolist() == [1, 2, 4]
+    messages = quarantined[ERRORS_COLUMN].tolist()
+    assert messages[0] == "Tenure_Months must be a number in [0, 72]"
+    assert "Contract must be one of" in messages[1] and "Monthly_Charges must be a number" in messages[1]
+    assert ERRORS_COLUMN not in valid.columns
+
+
+def test_clean_batch_has_an_empty_quarantine(validator, telco_sample):
+    valid, quarantined = validator.validate(telco_sample).split(telco_sample)
+
+    assert len(valid) == len(telco_sample)
+    assert quarantined.empty and ERRORS_COLUMN in quarantined.columns
+
+
+def test_missing_columns(validator, customers):
+    report = validator.validate(customers.drop(columns=["City", "Contract"]))
+
+    # A file without City is scored without it; without Contract no row can be
+    assert report.absent == ["City"]
+    assert (report.errors & bit(validator, "Contract")).all()
+    assert not (report.errors & bit(validator, "City")).any()
+
+
+def test_categorical_dtype_columns_are_checked_by_category(validator, customers):
+    typed = customers.assign(Contract=pd.Categorical(customers["Contract"]))
+
+    assert np.array_equal(validator.validate(typed).errors, validator.validate(customers).errors)
+
+
+def test_single_record_breaks_the_same_rules_as_its_batch_row(validator, customers):
+    errors = validator.validate(customers).errors
+
+    for (_, row), mask in zip(customers.iterrows(), errors):
+        failed = validator.validate_record(row.to_dict())
+        assert sum(bit(validator, rule.column) for rule in failed) == mask
+
+
+def test_validate_inputs_checks_categories_with_the_models_validator(validator):
+    from churn.features import validate_inputs
+    from churn.registry import canary_records
+
+    record = canary_records(1)[0]
+
+    assert validate_inputs(record, validator) == (True, "Input validation passed")
+    assert validate_inputs({**record, "Tenure": 73}) == (False, "Tenure_Months must be a number in [0, 72]")
+    is_valid, message = validate_inputs({**record, "Contract": "Weekly"}, validator)
+    assert not is_valid and message.startswith("Contract must be one of")
+    # Without a validator only the numeric ranges are known
+    assert validate_inputs({**record, "Contract": "Weekly"})[0]
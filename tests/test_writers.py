@@ -0,0 +1,65 @@
+import io
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+from churn.writers import open_writer
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def write_parquet(chunks, dtypes=None):
+    buffer = io.BytesIO()
+    with open_writer(buffer, "parquet", dtypes=dtypes) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+    return pd.read_parquet(io.BytesIO(buffer.getvalue()))
+
+
+def test_parquet_column_types_differ_between_chunks():
+    # Chunk 0 reads Total Charges as numbers, chunk 1 as text because of a blank
+    first = pd.DataFrame({"Total Charges": [29.85, 1889.5], "Churn Reason": [np.nan, np.nan]})
+    second = pd.DataFrame({"Total Charges": ["108.15", " "], "Churn Reason": ["Competitor", np.nan]})
+
+    result = write_parquet([first, second])
+
+    assert result["Total Charges"].tolist()[:3] == [29.85, 1889.5, 108.15]
+    assert np.isnan(result["Total Charges"].iloc[3])
+    assert result["Churn Reason"].tolist()[2] == "Competitor"
+
+
+def test_parquet_all_missing_first_chunk_takes_later_numbers():
+    first = pd.DataFrame({"Score": [np.nan, np.nan]})
+    second = pd.DataFrame({"Score": [1.5, 2.0]})
+
+    assert write_parquet([first, second], {"Score": "float64"})["Score"].tolist()[2:] == [1.5, 2.0]
+    # Without a type the column is text, and numbers are written as text
+    assert write_parquet([first, second])["Score"].tolist()[2:] == ["1.5", "2.0"]
+
+
+def test_parquet_text_first_chunk_takes_later_numbers():
+    first = pd.DataFrame({"Zip": ["90001", "90002"]})
+    second = pd.DataFrame({"Zip": [90003, 90004]})
+
+    assert write_parquet([first, second])["Zip"].tolist() == ["90001", "90002", "90003", "90004"]
+
+
+def test_stream_parquet_with_blank_charges_in_later_chunk(tmp_path):
+    from churn.model import load_model_and_preprocessing
+    from churn.preprocessing import load_preprocessor
+    from churn.stream import score_stream
+
+    model, scaler, _ = load_model_and_preprocessing()
+    encoder = load_preprocessor(scaler=scaler).encoder
+
+    stats = score_stream(REPO_ROOT / "Telco_customer_churn.csv", tmp_path / "scored.parquet", model,
+                         encoder=encoder, chunk_rows=2000)
+    scored = pd.read_parquet(tmp_path / "scored.parquet")
+
+    assert len(scored) == stats.rows == 7043
+    assert scored["Total Charges"].dtype == np.float64
+    assert scored["Total Charges"].isna().sum() == 11